@@ -96,12 +96,12 @@ import matplotlib.pyplot
 
 # Import main kafe components
 from .dataset import Dataset
-from .dataset_tools import build_dataset
+from .dataset_tools import build_dataset, build_histogram_dataset
 from .fit import Fit, chi2
 from .plot import Plot, PlotStyle
 from .file_tools import (parse_column_data,
                          buildDataset_fromFile, buildFit_fromFile)
 from .numeric_tools import cov_to_cor, cor_to_cov
-from .function_tools import FitFunction, LaTeX, ASCII
+from .function_tools import FitFunction, LaTeX, ASCII, Linear
 from .multifit import Multifit
 from .multiplot import Multiplot
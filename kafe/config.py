@@ -132,6 +132,8 @@ M_MAX_ITERATIONS = cp.getint('Minuit', 'max_iterations')
 M_MAX_X_FIT_ITERATIONS = cp.getint('Minuit', 'max_x_fit_iterations')
 
 F_SIGNIFICANCE_LEVEL = cp.getfloat('Fit', 'hyptest_significance')
+F_LINEAR_CLOSED_FORM = cp.getboolean('Fit', 'linear_closed_form')
+F_COVARIANCE_METHOD = cp.get('Fit', 'covariance_method')
 
 FORMAT_ERROR_SIGNIFICANT_PLACES = cp.getint('Formatting', 'significant_error_places')
 
@@ -13,21 +13,66 @@
 # Changes:
 # GQ 140724: fixed output format: uncor -> total
 # DS 150610: add ErrorSource object
+# 261018: add binary file format with memory-mapped loading
+# 261018: format whole rows at once, stream formatted output
+# 261018: append data points, growing data and covariance matrices in place
 # ---------------------------------------------
 
 import numpy as np
 from scipy.linalg import LinAlgError
 import os
+import re
+import json
+import struct
 
-from .numeric_tools import cov_to_cor, cor_to_cov, extract_statistical_errors, \
-    zero_pad_lower_triangle, make_symmetric_lower
+from .numeric_tools import cor_to_cov, extract_statistical_errors, \
+    zero_pad_lower_triangle, make_symmetric_lower, cholesky_extend
+from .stream import open_text_input, strip_compression_extension
 
 NUMBER_OF_AXES = 2
 
+# signature and version of the binary file format
+BINARY_FORMAT_SIGNATURE = b'KAFE-DS\n'
+BINARY_FORMAT_VERSION = 1
+# alignment of the header and the arrays in the binary format, in bytes
+BINARY_FORMAT_ALIGNMENT = 64
+# factor by which the capacity of the buffers for appended data grows
+BUFFER_GROWTH_FACTOR = 1.5
+
 # import main logger for kafe
 import logging
 logger = logging.getLogger('kafe')
 
+def _reserve(buffer, size, ndim=1):
+    '''
+    Returns `buffer` if it can hold `size` entries along each of its `ndim`
+    axes, or a larger zero-filled copy of it otherwise. The capacity grows
+    geometrically, so that appending entries one at a time has amortized
+    constant cost per entry.
+    '''
+    if buffer is not None and buffer.shape[0] >= size:
+        return buffer
+    _capacity = size
+    if buffer is not None:
+        _capacity = max(size, int(BUFFER_GROWTH_FACTOR * buffer.shape[0]))
+    _new_buffer = np.zeros((_capacity,) * ndim)
+    if buffer is not None:
+        _new_buffer[tuple(slice(0, _dim) for _dim in buffer.shape)] = buffer
+    return _new_buffer
+
+
+def _printf_format(format_string):
+    '''
+    Returns the printf-style format equivalent to a format specification for
+    numbers, e.g. ``'%.06e'`` for ``'.06e'``, or ``None`` if there is none.
+    '''
+    _match = re.match(r'^([+ ]?)(#?)(0?)(\d*)(\.\d+)?([eEfFgG])$',
+                      format_string)
+    if _match is None:
+        return None
+    return '%' + ''.join(_group or '' for _group in _match.groups())
+
+
 class ErrorSource(object):
     '''
     This object stores the error information for a :py:obj:`Dataset` as a
@@ -52,6 +97,9 @@ class ErrorSource(object):
         # Boolean flags
         self.has_correlations = False  # assume no correlations
 
+        # buffer for appended error values and the view of it in use
+        self._value_buffer = (None, None)
+
     def make_from_matrix(self, cov_mat, check_singular=False):
         """
         Sets the covariance matrix manually.
@@ -127,6 +175,38 @@ class ErrorSource(object):
 
         self.error_value = err_val  # float or sequence of floats
 
+    def append_values(self, err_val):
+        """
+        Appends the uncertainties of new data points to an error source made
+        from a sequence of floats. The values are stored in a buffer whose
+        capacity grows geometrically.
+
+        Parameters
+        ----------
+
+        **err_val** : float or sequence of floats
+            The uncertainties of the new data points.
+        """
+        if self.error_type != 'simple' or self.size is None:
+            raise ValueError("Can only append values to a `simple' error "
+                             "source made from a sequence of floats.")
+
+        _values = np.atleast_1d(np.asarray(err_val, dtype=np.float64))
+        _size = self.size + len(_values)
+
+        _buffer, _view = self._value_buffer
+        if _view is not self.error_value:
+            # values were set directly: copy them to a new buffer
+            _buffer = _reserve(None, _size)
+            _buffer[:self.size] = self.error_value
+        else:
+            _buffer = _reserve(_buffer, _size)
+        _buffer[self.size:_size] = _values
+
+        self.error_value = _buffer[:_size]
+        self.size = _size
+        self._value_buffer = (_buffer, self.error_value)
+
 
     ## GET Methods ##
 
@@ -286,6 +366,14 @@ class Dataset(object):
         self.cov_mats = [None, None]             #: covariance matrices for axes
         self.__cov_mat_up_to_date = False        # flag need to compute matrix
 
+        # buffers for appended data and covariance matrices and the views of
+        # them in use, for each axis
+        self.__data_buffers = [(None, None), (None, None)]
+        self.__cov_mat_buffers = [(None, None), (None, None)]
+        # lower Cholesky factors of the covariance matrices: buffer and size
+        # of the factor, for each axis
+        self.__cov_mat_cholesky = [(None, 0), (None, 0)]
+
         self.err_src = [[], []]                  #: lists of ErrorSource objects
         self.__query_err_src_enabled = [[], []]  # ErrorSource objects enabled?
         self.__query_err_src_relative = [[], []] # ErrorSources relative?
@@ -436,6 +524,171 @@ class Dataset(object):
                                      "Size mismatch: expected %d, got %d."
                                      % (axis, self.n_datapoints, len(_da)))
 
+    def append_data(self, xdata, ydata, x_errors=None, y_errors=None):
+        '''
+        Append one or several data points to the `Dataset`, e.g. when
+        measurements arrive one at a time.
+
+        The data and covariance matrices grow in place: they are stored in
+        buffers whose capacity grows geometrically, and only the rows and
+        columns for the new points are calculated from the error sources.
+        The Cholesky factors of regular covariance matrices are extended
+        instead of being recomputed (see
+        :py:meth:`~kafe.dataset.Dataset.get_cov_mat_cholesky`).
+
+        Error sources given as a single float apply to the new points as
+        well. For error sources given as a list of floats, the uncertainties
+        of the new points must be provided. ``'matrix'`` error sources have a
+        fixed size, so no data can be appended to an axis which has one.
+
+        >>> my_dataset.add_error_source('y', 'simple', [0.1, 0.2, 0.1])
+        0
+        >>> my_dataset.append_data(3., 7.71, y_errors={0: 0.2})
+
+        Parameters
+        ----------
+
+        **xdata** : float or iterable
+            `x` coordinate(s) of the new data point(s).
+
+        **ydata** : float or iterable
+            `y` coordinate(s) of the new data point(s).
+
+        Keyword Arguments
+        -----------------
+
+        x_errors : dict, optional
+            uncertainties of the new data points for the `x` error sources
+            given as a list of floats, with the error source IDs as keys.
+
+        y_errors : dict, optional
+            uncertainties of the new data points for the `y` error sources
+            given as a list of floats, with the error source IDs as keys.
+        '''
+
+        _new_data = [np.atleast_1d(np.asarray(xdata, dtype=np.float64)),
+                     np.atleast_1d(np.asarray(ydata, dtype=np.float64))]
+        if _new_data[0].ndim != 1 or _new_data[0].shape != _new_data[1].shape:
+            raise ValueError("Cannot append data. Expected the same number "
+                             "of `x` and `y` values, got shapes %s and %s."
+                             % (_new_data[0].shape, _new_data[1].shape))
+        _n_new = len(_new_data[0])
+
+        # check that all error sources can be extended before changing anything
+        _error_values = [dict(x_errors or {}), dict(y_errors or {})]
+        for _axis in range(self.__n_axes):
+            for _idx, _es in enumerate(self.err_src[_axis]):
+                if _es is None:
+                    continue
+                if _es.error_type == 'matrix':
+                    raise ValueError("Cannot append data. The `matrix' error "
+                                     "source %d for axis %d has a fixed size."
+                                     % (_idx, _axis))
+                if _es.size is not None and _idx not in _error_values[_axis]:
+                    raise ValueError("Cannot append data. Uncertainties of "
+                                     "the new data points are required for "
+                                     "error source %d for axis %d."
+                                     % (_idx, _axis))
+            for _idx, _values in _error_values[_axis].items():
+                if _idx >= len(self.err_src[_axis]) or \
+                        self.err_src[_axis][_idx] is None or \
+                        self.err_src[_axis][_idx].size is None:
+                    raise ValueError("Cannot append data. Error source %r for "
+                                     "axis %d is not a list of uncertainties."
+                                     % (_idx, _axis))
+                _error_values[_axis][_idx] = np.broadcast_to(
+                    np.asarray(_values, dtype=np.float64), (_n_new,))
+
+        _size = self.get_size()
+        _new_size = _size + _n_new
+        for _axis in range(self.__n_axes):
+            _buffer, _view = self.__data_buffers[_axis]
+            if _view is None or _view is not self.data[_axis]:
+                # data were set directly: copy them to a new buffer
+                _buffer = _reserve(None, _new_size)
+                _buffer[:_size] = self.data[_axis] if _size else 0.
+            else:
+                _buffer = _reserve(_buffer, _new_size)
+            _buffer[_size:_new_size] = _new_data[_axis]
+            self.data[_axis] = _buffer[:_new_size]
+            self.__data_buffers[_axis] = (_buffer, self.data[_axis])
+
+            for _idx, _values in _error_values[_axis].items():
+                self.err_src[_axis][_idx].append_values(_values)
+
+        self.n_datapoints = _new_size
+        for _axis in range(self.__n_axes):
+            self._append_cov_mat_rows(_axis, _size)
+
+    def _append_cov_mat_rows(self, axis, size):
+        '''
+        Extends the covariance matrix for an axis by the rows and columns of
+        the data points appended after the first `size` points, and updates
+        the flags describing the matrix.
+        '''
+        _new_size = self.n_datapoints
+        _n_new = _new_size - size
+        _data = self.data[axis]
+
+        # variances of the new points and, for correlated error sources,
+        # covariances of the new points with all points
+        _diagonal = np.zeros(_n_new)
+        _rows = None
+        for _idx, _es in enumerate(self.err_src[axis]):
+            if _es is None or not self.__query_err_src_enabled[axis][_idx]:
+                continue
+
+            _first = 0 if _es.has_correlations else size
+            if _es.size is None:
+                _err = np.full(_new_size - _first, float(_es.error_value))
+            else:
+                _err = np.asarray(_es.error_value, dtype=np.float64)[_first:]
+            if self.__query_err_src_relative[axis][_idx]:
+                _err = _err * _data[_first:]
+
+            if _es.has_correlations:
+                if _rows is None:
+                    _rows = np.zeros((_n_new, _new_size))
+                _rows += np.outer(_err[size:], _err)
+            else:
+                _diagonal += _err ** 2
+
+        _buffer, _view = self.__cov_mat_buffers[axis]
+        if _view is None or _view is not self.cov_mats[axis]:
+            # matrix was set directly: copy it to a new buffer
+            _buffer = _reserve(None, _new_size, ndim=2)
+            if size and self.cov_mats[axis] is not None:
+                _buffer[:size, :size] = self.cov_mats[axis]
+        else:
+            _buffer = _reserve(_buffer, _new_size, ndim=2)
+
+        # entries outside of the view in use are zero
+        if _rows is not None:
+            _buffer[size:_new_size, :_new_size] = _rows
+            _buffer[:size, size:_new_size] = _rows[:, :size].T
+        _new_ids = np.arange(size, _new_size)
+        _buffer[_new_ids, _new_ids] += _diagonal
+
+        self.cov_mats[axis] = np.asmatrix(_buffer[:_new_size, :_new_size])
+        self.__cov_mat_buffers[axis] = (_buffer, self.cov_mats[axis])
+
+        # update the flags
+        if np.any(_diagonal) or (_rows is not None and np.any(_rows)):
+            self.__query_has_errors[axis] = True
+        if _rows is not None:
+            _rows[np.arange(_n_new), _new_ids] = 0.
+            if np.any(_rows):
+                self.__query_has_correlations[axis] = True
+
+        # a matrix with a singular block is singular, else extend the factor
+        if size == 0 or self.__query_cov_mats_regular[axis]:
+            try:
+                self.get_cov_mat_cholesky(axis)
+            except LinAlgError:
+                self.__query_cov_mats_regular[axis] = False
+            else:
+                self.__query_cov_mats_regular[axis] = True
+
 
     # Uncertainties
     ################
@@ -618,55 +871,58 @@ class Dataset(object):
             either ``0`` or ``'x'`` for the `x`-axis (id 0). If ``'all'`` is given,
             (re-)calculates the covariance matrix for all axes.
         """
-        _size = self.n_datapoints
-        _mats = [np.matrix(np.zeros((_size, _size))),
-                 np.matrix(np.zeros((_size, _size)))]
-
         if axis is 'all':
             _axes_list = list(range(self.__n_axes))
         else:
             _axes_list = [self.get_axis(axis)]
 
-        #print _axes_list
-
+        # set cov mats for all axes
         for _axis in _axes_list:  # go through the axes
-            for _idx, _es in enumerate(self.err_src[_axis]):  # go through the ErrorSources
-                # skip removed error sources
-                if _es is None:
-                    continue
+            self.set_cov_mat(_axis, self._sum_error_sources(_axis))
 
-                # skip disabled error sources
-                if not self.__query_err_src_enabled[_axis][_idx]:
-                    continue
+        self.__cov_mat_up_to_date = True
 
-                if _es.size is not None:
-                    # if ErrorSource size fixed
-                    if _es.size == _size:
-                        # if ErrorSource size matches Dataset size
-                        _mat = _es.get_matrix()  # OK to get matrix
-                    else:
-                        # shouldn't happen for ErrorSources added with
-                        # add_error_source(), but still...
-                        raise ValueError("ErrorSource fixed size %d doesn't "
-                                         "match Dataset size %d"
-                                         % (_es.size, _size))
+    def _sum_error_sources(self, axis):
+        '''
+        Returns the sum of the covariance matrices of the enabled error
+        sources for an axis.
+        '''
+        _size = self.n_datapoints
+        _sum = np.matrix(np.zeros((_size, _size)))
+
+        for _idx, _es in enumerate(self.err_src[axis]):  # go through the ErrorSources
+            # skip removed error sources
+            if _es is None:
+                continue
+
+            # skip disabled error sources
+            if not self.__query_err_src_enabled[axis][_idx]:
+                continue
+
+            if _es.size is not None:
+                # if ErrorSource size fixed
+                if _es.size == _size:
+                    # if ErrorSource size matches Dataset size
+                    _mat = _es.get_matrix()  # OK to get matrix
                 else:
-                    # get cov mat with specified size
-                    _mat = _es.get_matrix(size=_size)
+                    # shouldn't happen for ErrorSources added with
+                    # add_error_source(), but still...
+                    raise ValueError("ErrorSource fixed size %d doesn't "
+                                     "match Dataset size %d"
+                                     % (_es.size, _size))
+            else:
+                # get cov mat with specified size
+                _mat = _es.get_matrix(size=_size)
 
-                if self.__query_err_src_relative[_axis][_idx]:
-                    # for relative errors, "multiply" covariance matrix by data
-                    _data = self.get_data(_axis)
-                    _mat = np.asmatrix(np.asarray(_mat) *
-                                       np.outer(_data, _data))
+            if self.__query_err_src_relative[axis][_idx]:
+                # for relative errors, "multiply" covariance matrix by data
+                _data = self.get_data(axis)
+                _mat = np.asmatrix(np.asarray(_mat) *
+                                   np.outer(_data, _data))
 
-                _mats[_axis] += _mat  # add covariance matrix
+            _sum += _mat  # add covariance matrix
 
-        # set cov mats for all axes
-        for _axis in _axes_list:  # go through the axes
-            self.set_cov_mat(_axis, _mats[_axis])
-
-        self.__cov_mat_up_to_date = True
+        return _sum
 
     def set_cov_mat(self, axis, mat):
         '''
@@ -729,6 +985,7 @@ class Dataset(object):
             )
         else:
             self.cov_mats[axis] = mat
+        self.__cov_mat_cholesky[axis] = (None, 0)
 
         # forced matrices considered not up to date
         self.__cov_mat_up_to_date = False
@@ -929,6 +1186,53 @@ class Dataset(object):
                 # if not, return the (regular) matrix itself
                 return _mat
 
+    def get_cov_mat_cholesky(self, axis):
+        r'''
+        Get the lower Cholesky factor :math:`L` of the covariance matrix
+        :math:`C = LL^T` for an axis.
+
+        The factor is cached until the covariance matrix is set again. When
+        data points are appended using
+        :py:meth:`~kafe.dataset.Dataset.append_data`, only the rows for the
+        new points are calculated.
+
+        Parameters
+        ----------
+
+        **axis** :  string or int
+            Axis for which to get the factor. This is for example
+            either ``0`` or ``'x'`` for the `x`-axis (id 0).
+
+        Returns
+        -------
+
+        *numpy.ndarray*
+            the lower triangular factor. Raises
+            `numpy.linalg.LinAlgError` if the covariance matrix is not
+            positive definite.
+        '''
+
+        # get axis id from an alias
+        axis = self.get_axis(axis)
+        _size = self.get_size()
+
+        _buffer, _factor_size = self.__cov_mat_cholesky[axis]
+        if _buffer is None or _factor_size > _size:
+            _buffer, _factor_size = np.zeros((0, 0)), 0
+
+        if _factor_size < _size:
+            _cov_mat = np.asarray(self.get_cov_mat(axis))
+            _cross_factor, _new_factor = cholesky_extend(
+                _buffer[:_factor_size, :_factor_size],
+                _cov_mat[_factor_size:_size, :_factor_size],
+                _cov_mat[_factor_size:_size, _factor_size:_size])
+            _buffer = _reserve(_buffer, _size, ndim=2)
+            _buffer[_factor_size:_size, :_factor_size] = _cross_factor
+            _buffer[_factor_size:_size, _factor_size:_size] = _new_factor
+            self.__cov_mat_cholesky[axis] = (_buffer, _size)
+
+        return _buffer[:_size, :_size]
+
     # Other methods
     ################
 
@@ -1082,88 +1386,97 @@ class Dataset(object):
 
         '''
 
-        output_list = []
+        return ''.join(self._iter_formatted_lines(format_string, delimiter))
+
+    def _iter_formatted_lines(self, format_string, delimiter):
+        '''
+        Generates the lines of the plain-text representation of the dataset
+        returned by :py:meth:`~kafe.dataset.Dataset.get_formatted`. Each row
+        is formatted at once, and only one row of the correlation matrix is
+        computed at a time.
+        '''
+
+        _printf_format_string = _printf_format(format_string)
 
         # go through the axes
         for axis in range(self.__n_axes):
-            # define a helper list which we will fill out
-            helper_list = []
-
+            _cov_mat = np.asarray(self.get_cov_mat(axis))
             # get the statistical errors of the data
-            stat_errs = extract_statistical_errors(self.get_cov_mat(axis))
+            stat_errs = extract_statistical_errors(_cov_mat)
             data = self.get_data(axis)
-            # try to get a correlation matrix
-            try:
-                cor_mat = cov_to_cor(self.get_cov_mat(axis))
-            except ZeroDivisionError:
-                # if it fails, this means there are no
-                # errors for the axis, so return
-                # a zero matrix
-                sz = self.get_size()
-                cor_mat = np.asmatrix(np.zeros((sz, sz)))
-
+            _has_errors = self.__query_has_errors[axis]
+            _has_correlations = _has_errors and \
+                self.__query_has_correlations[axis]
+            _n_columns = 1 + _has_errors + _has_correlations * (len(data) - 1)
+
+            if _printf_format_string is not None:
+                # row template for the longest row; shorter rows use the
+                # beginning of it
+                _format_length = len(_printf_format_string)
+                _delimiter = delimiter.replace('%', '%%')
+                _template = _delimiter.join([_printf_format_string] * _n_columns)
+
+                def format_row(values):
+                    _length = len(values) * (_format_length + len(_delimiter)) \
+                        - len(_delimiter)
+                    return _template[:_length] % tuple(values)
+            else:
+                def format_row(values):
+                    return delimiter.join([format(val, format_string)
+                                           for val in values])
 
             # add section title as a comment
-            helper_list.append([
-                '# axis %d: %s'
-                % (axis, self.axis_labels[axis])
-            ])
+            yield '# axis %d: %s\n' % (axis, self.axis_labels[axis])
             # add a row for headings
-            helper_list.append(['# datapoints'])
-
+            _headings = ['# datapoints']
             # if the dataset has stat errors
-            if self.__query_has_errors[axis]:
+            if _has_errors:
                 # add a heading for second column
                 # if there are also correlations (syst errors)
-                if self.__query_has_correlations[axis]:
+                if _has_correlations:
                     # add a heading for the correlation matrix
-                    helper_list[-1].append('total err.')
-                    helper_list[-1].append('correlation coefficients')
+                    _headings.append('total err.')
+                    _headings.append('correlation coefficients')
                 else:
-                    helper_list[-1].append('uncor. err.')
-
-            for idx, val in enumerate(data):
-                # append a new "row" to the helper list
-                helper_list.append([])
-                # append the coordinate of the data point
-                helper_list[-1].append(format(val, format_string))
-                # if the dataset has stat errors
-                if self.__query_has_errors[axis]:
-                    # append the stat error of the data point
-                    helper_list[-1].append(
-                        format(stat_errs[idx], format_string)
-                    )
-                    # if there are also correlations (syst errors)
-                    if self.__query_has_correlations[axis]:
-                        # go through the columns of the correlation matrix
-                        for col in range(idx):
-                            # append corr. coefficients to the helper list
-                            helper_list[-1].append(
-                                format(cor_mat[idx, col], format_string)
-                            )
-
-            helper_list.append([])  # append an empty list -> blank line
-            output_list.append(helper_list)
-
-        # turn the list into a string
-        tmp_string = ''
-        for row in output_list:
-            for entry in row:
-                tmp_string += delimiter.join(entry) + '\n'
-
-        return tmp_string
+                    _headings.append('uncor. err.')
+            yield delimiter.join(_headings) + '\n'
+
+            # a zero error makes the correlation matrix undefined: in this
+            # case, the correlation coefficients are written as zeros
+            _zero_errors = 0 in stat_errs
+
+            _values = data.tolist()
+            if _has_errors:
+                _errors = stat_errs.tolist()
+            for idx, val in enumerate(_values):
+                if not _has_errors:
+                    yield format_row([val]) + '\n'
+                elif not _has_correlations:
+                    yield format_row([val, _errors[idx]]) + '\n'
+                else:
+                    # row of the correlation matrix below the diagonal
+                    if _zero_errors:
+                        _cor_row = np.zeros(idx)
+                    else:
+                        _cor_row = _cov_mat[idx, :idx] / \
+                            (stat_errs[idx] * stat_errs[:idx])
+                    yield format_row([val, _errors[idx]]
+                                     + _cor_row.tolist()) + '\n'
+
+            yield '\n'  # blank line
 
     def write_formatted(self, file_path, format_string=".06e", delimiter='\t'):
         '''
         Writes the dataset to a plain-text file. For details on the format, see
-        :py:meth:`~kafe.dataset.Dataset.read_from_file`.
+        :py:meth:`~kafe.dataset.Dataset.read_from_file`. The output is
+        written row by row, without building it in memory first.
 
         Parameters
         ----------
 
-        **file_path** : string
-            Path of the file object to write. **WARNING**: *overwrites existing
-            files*!
+        **file_path** : string or file-like object
+            Path of the file to write, or a file object to write to.
+            **WARNING**: *overwrites existing files*!
 
         Keyword Arguments
         -----------------
@@ -1178,10 +1491,14 @@ class Dataset(object):
 
         '''
 
-        # write the output of self.get_formatted to the file
-        with open(file_path, 'w') as my_file:
-            my_file.write(self.get_formatted(format_string))
-            my_file.close()
+        _lines = self._iter_formatted_lines(format_string, delimiter)
+        if hasattr(file_path, 'write'):
+            # only `write' is required, e.g. for `kafe.stream.StreamDup'
+            for _line in _lines:
+                file_path.write(_line)
+        else:
+            with open(file_path, 'w') as my_file:
+                my_file.writelines(_lines)
 
     def read_from_file(self, input_file):
         '''
@@ -1196,6 +1513,9 @@ class Dataset(object):
 
         >>> my_dataset.read_from_file(my_file_object)
 
+        Files compressed with `gzip`, `bzip2` or `xz` are decompressed while
+        being read.
+
         For details on the format, see
         :py:meth:`~kafe.dataset.Dataset.get_formatted`
 
@@ -1211,20 +1531,16 @@ class Dataset(object):
         boolean
             ``True`` if the read succeeded, ``False`` if not.
         '''
-        try:
-            # try to read the lines of the file
-            tmp_lines = input_file.readlines()
-        # this will fail if a file path string was passed, so alternatively:
-        except AttributeError:
-            # if not basename was provided in the arguments
-            if self.basename is None:
-                # get the basename from the path
-                _basename = os.path.basename(input_file)
-                # remove the last extension (usually '.dat')
-                self.basename = '.'.join(_basename.split('.')[:-1])
-            # open the file pointed to by the path
-            tmp_file = open(input_file, 'r')
-            # and then read the lines of the file
+        # if a file path was passed and no basename was provided
+        if not hasattr(input_file, 'read') and self.basename is None:
+            # get the basename from the path
+            _basename = strip_compression_extension(
+                os.path.basename(input_file))
+            # remove the last extension (usually '.dat')
+            self.basename = '.'.join(_basename.split('.')[:-1])
+
+        # read the lines of the file, decompressing it if needed
+        with open_text_input(input_file) as tmp_file:
             tmp_lines = tmp_file.readlines()
 
         # Parse the file
@@ -1393,3 +1709,235 @@ class Dataset(object):
                                 "of Dataset" % (axis,))
 
         return True
+
+    def write_binary(self, file_path):
+        '''
+        Writes the dataset to a binary file, which can be read back with
+        :py:meth:`~kafe.dataset.Dataset.read_binary`.
+
+        Unlike the plain-text format, the binary format stores the error
+        model itself, i.e. all error sources, at full precision, and needs no
+        parsing when read. The file consists of
+
+        * the 8-byte signature ``KAFE-DS\\n``,
+        * the size of the header in bytes as an unsigned 64-bit little-endian
+          integer,
+        * a JSON header containing the metadata, the description of the
+          error sources and the offsets and shapes of all arrays, padded with
+          spaces to a multiple of 64 bytes,
+        * the arrays as little-endian 64-bit floats in C order, each starting
+          at a multiple of 64 bytes. The offsets in the header are counted
+          from the end of the header.
+
+        The total covariance matrix of each axis is stored along with its
+        properties (e.g. whether it is regular), so that reading the file
+        needs no matrix operations. If it is the matrix of the only enabled
+        error source, that array is not stored twice.
+
+        Parameters
+        ----------
+
+        **file_path** : string
+            Path of the file to write. **WARNING**: *overwrites existing
+            files*!
+        '''
+
+        _arrays = []  # arrays to write, in order
+
+        def _add_array(name, array):
+            _arrays.append((name, np.ascontiguousarray(array, dtype='<f8')))
+            return name
+
+        _axes = []
+        for axis in range(self.__n_axes):
+            _error_sources = []
+            _enabled_arrays = []  # array names of the enabled error sources
+            for _idx, _es in enumerate(self.err_src[axis]):
+                if _es is None:
+                    # keep the place of removed error sources, so that the
+                    # error source IDs stay valid
+                    _error_sources.append(None)
+                    continue
+                if _es.error_type == 'simple' and np.ndim(_es.error_value) == 0:
+                    _value = float(_es.error_value)
+                else:
+                    _value = _add_array('error_source_%d_%d' % (axis, _idx),
+                                        _es.error_value)
+                _error_sources.append({
+                    'type': _es.error_type,
+                    'value': _value,
+                    'correlated': bool(_es.has_correlations),
+                    'relative': bool(self.__query_err_src_relative[axis][_idx]),
+                    'enabled': bool(self.__query_err_src_enabled[axis][_idx])})
+                if self.__query_err_src_enabled[axis][_idx]:
+                    _enabled_arrays.append(
+                        _value if _es.error_type == 'matrix' and
+                        not self.__query_err_src_relative[axis][_idx] else None)
+
+            _data = self.get_data(axis)
+            _axis_info = {'data': None, 'cov_mat': None,
+                          'error_sources': _error_sources}
+            if _data is not None:
+                _axis_info['data'] = _add_array('data_%d' % (axis,), _data)
+                _cov_mat = self.get_cov_mat(axis)
+                if len(_enabled_arrays) == 1 and \
+                        _enabled_arrays[0] is not None and \
+                        np.array_equal(_cov_mat, dict(_arrays)[_enabled_arrays[0]]):
+                    # reuse the matrix of the error source
+                    _axis_info['cov_mat'] = _enabled_arrays[0]
+                else:
+                    _axis_info['cov_mat'] = _add_array('cov_mat_%d' % (axis,),
+                                                       _cov_mat)
+                _axis_info['forced'] = not np.array_equal(
+                    _cov_mat, self._sum_error_sources(axis))
+                _axis_info['regular'] = bool(self.__query_cov_mats_regular[axis])
+                _axis_info['has_errors'] = bool(self.__query_has_errors[axis])
+                _axis_info['has_correlations'] = bool(
+                    self.__query_has_correlations[axis])
+            _axes.append(_axis_info)
+
+        # place the arrays in the data section
+        _arrays_info = {}
+        _offset = 0
+        for _name, _array in _arrays:
+            _arrays_info[_name] = {'offset': _offset,
+                                   'shape': list(_array.shape)}
+            _offset += _array.nbytes + (-_array.nbytes % BINARY_FORMAT_ALIGNMENT)
+
+        _header = json.dumps({
+            'version': BINARY_FORMAT_VERSION,
+            'title': self.data_label,
+            'basename': self.basename,
+            'axis_labels': self.axis_labels,
+            'axis_units': self.axis_units,
+            'axes': _axes,
+            'arrays': _arrays_info}).encode('utf-8')
+        _header += b' ' * (-(len(_header) + 16) % BINARY_FORMAT_ALIGNMENT)
+
+        with open(file_path, 'wb') as my_file:
+            my_file.write(BINARY_FORMAT_SIGNATURE)
+            my_file.write(struct.pack('<Q', len(_header)))
+            my_file.write(_header)
+            for _name, _array in _arrays:
+                _array.tofile(my_file)
+                my_file.write(b'\0' * (-_array.nbytes % BINARY_FORMAT_ALIGNMENT))
+
+    def read_binary(self, input_file, mmap_mode='r'):
+        '''
+        Reads the `Dataset` from a binary file written by
+        :py:meth:`~kafe.dataset.Dataset.write_binary`. The measurement data,
+        the error model and the metadata of the `Dataset` are replaced.
+
+        By default, the arrays are memory-mapped instead of being read, so
+        that large covariance matrices are only loaded from disk when they
+        are accessed. The stored total covariance matrices are used as they
+        are, i.e. opening a file only reads its header. The file must
+        therefore not be modified while the `Dataset` is in use.
+
+        Parameters
+        ----------
+
+        **input_file** : str
+            path to the file
+
+        Keyword Arguments
+        -----------------
+
+        mmap_mode : ``'r'``, ``'c'`` or ``None``, optional
+            ``'r'`` (default) maps the arrays read-only, ``'c'`` maps them
+            copy-on-write, so that they can be modified in memory. If
+            ``None``, the arrays are read into memory.
+
+        Returns
+        -------
+
+        boolean
+            ``True`` if the read succeeded.
+        '''
+
+        with open(input_file, 'rb') as tmp_file:
+            if tmp_file.read(len(BINARY_FORMAT_SIGNATURE)) != BINARY_FORMAT_SIGNATURE:
+                raise ValueError("File `%s' is not a kafe binary dataset file."
+                                 % (input_file,))
+            _header_size, = struct.unpack('<Q', tmp_file.read(8))
+            _header = json.loads(tmp_file.read(_header_size).decode('utf-8'))
+        if _header['version'] > BINARY_FORMAT_VERSION:
+            raise ValueError("Unsupported version %d of the binary dataset "
+                             "format." % (_header['version'],))
+        _data_section_offset = len(BINARY_FORMAT_SIGNATURE) + 8 + _header_size
+
+        def _load_array(name):
+            _info = _header['arrays'][name]
+            _shape = tuple(_info['shape'])
+            _offset = _data_section_offset + _info['offset']
+            if mmap_mode is None or not np.prod(_shape):
+                # empty arrays cannot be mapped
+                return np.fromfile(input_file, dtype='<f8',
+                                   count=int(np.prod(_shape)),
+                                   offset=_offset).reshape(_shape)
+            return np.memmap(input_file, dtype='<f8', mode=mmap_mode,
+                             offset=_offset, shape=_shape)
+
+        # Metadata
+        self.data_label = _header['title']
+        self.basename = _header['basename']
+        self.axis_labels = list(_header['axis_labels'])
+        self.axis_units = list(_header['axis_units'])
+
+        _any_forced = False
+        for axis, _axis_info in enumerate(_header['axes']):
+            if _axis_info['data'] is not None:
+                self.set_axis_data(axis, _load_array(_axis_info['data']))
+
+            # replace the error model
+            self.err_src[axis] = []
+            self.__query_err_src_enabled[axis] = []
+            self.__query_err_src_relative[axis] = []
+            for _es_info in _axis_info['error_sources']:
+                if _es_info is None:
+                    # removed error source
+                    self.err_src[axis].append(None)
+                    self.__query_err_src_enabled[axis].append(False)
+                    self.__query_err_src_relative[axis].append(False)
+                    continue
+
+                # the stored error sources have been validated before, so the
+                # arrays are not touched here
+                _es = ErrorSource()
+                _es.error_type = _es_info['type']
+                _es.has_correlations = _es_info['correlated']
+                if _es.error_type == 'matrix':
+                    _es.error_value = np.asmatrix(_load_array(_es_info['value']))
+                    _es.size = _es.error_value.shape[0]
+                elif isinstance(_es_info['value'], float):
+                    _es.error_value = _es_info['value']
+                    _es.size = None
+                else:
+                    _es.error_value = _load_array(_es_info['value'])
+                    _es.size = len(_es.error_value)
+                self.err_src[axis].append(_es)
+                self.__query_err_src_enabled[axis].append(_es_info['enabled'])
+                self.__query_err_src_relative[axis].append(_es_info['relative'])
+
+            if _axis_info['cov_mat'] is not None and 'regular' in _axis_info:
+                # use the stored matrix and its properties, without touching
+                # the matrix
+                self.cov_mats[axis] = np.asmatrix(
+                    _load_array(_axis_info['cov_mat']))
+                self.__cov_mat_cholesky[axis] = (None, 0)
+                self.__query_cov_mats_regular[axis] = _axis_info['regular']
+                self.__query_has_errors[axis] = _axis_info['has_errors']
+                self.__query_has_correlations[axis] = \
+                    _axis_info['has_correlations']
+                _any_forced = _any_forced or _axis_info['forced']
+            else:
+                # files written without the matrix properties
+                self.calc_cov_mats(axis)
+                if _axis_info['cov_mat'] is not None:
+                    self.set_cov_mat(axis, _load_array(_axis_info['cov_mat']))
+                    _any_forced = True
+
+        # forced matrices considered not up to date
+        self.__cov_mat_up_to_date = not _any_forced
+
+        return True
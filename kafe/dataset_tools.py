@@ -11,14 +11,21 @@
 # Changes:
 # GQ 140724: fixed output format: uncor -> total
 # DS 150610: add ErrorSource object
+# 261018: add HistogramBuilder for histograms of large event streams
 # ---------------------------------------------
 
 from .dataset import Dataset
 
 import numpy as np
+import multiprocessing
+from collections import deque
+from multiprocessing.pool import ThreadPool
 
 NUMBER_OF_AXES = 2
 
+# default number of events binned at once by a `HistogramBuilder`
+HISTOGRAM_CHUNK_SIZE = 2 ** 20
+
 # import main logger for kafe
 import logging
 logger = logging.getLogger('kafe')
@@ -227,3 +234,241 @@ correlated error for the axis is then set to that.
     _dataset.add_error_source('y', 'matrix', cov_mats[1])
 
     return _dataset
+
+
+class HistogramBuilder(object):
+    '''
+    Accumulates the bin counts of a histogram from chunks of raw events, so
+    that event samples which do not fit into memory can be histogrammed, and
+    builds a `Dataset` from the counts.
+
+    >>> my_hb = HistogramBuilder(50, range=(-3., 3.))
+    >>> my_hb.fill_chunks(np.load('events.npy', mmap_mode='r'))
+    >>> my_dataset = my_hb.build_dataset()
+
+    The counts are the same as the ones calculated by `numpy.histogram`: the
+    last bin includes its upper edge, and events outside of the bins are not
+    counted.
+
+    Parameters
+    ----------
+
+    **bins** : int or sequence of floats
+        the number of bins of equal width in *range* or, for bins of variable
+        width, the monotonically increasing bin edges.
+
+    Keyword Arguments
+    -----------------
+
+    range : 2-tuple of floats, optional
+        the lower edge of the first bin and the upper edge of the last bin.
+        Required if *bins* is a number.
+    '''
+
+    def __init__(self, bins, range=None):
+        if np.ndim(bins) == 0:
+            if range is None:
+                raise ValueError("The histogram range is required for a "
+                                 "number of bins.")
+            _low, _high = float(range[0]), float(range[1])
+            if not int(bins) > 0 or not _high > _low:
+                raise ValueError("Cannot make %r bins in range %r."
+                                 % (bins, range))
+            self._uniform_bins = (int(bins), (_low, _high))
+            #: the bin edges
+            self.bin_edges = np.linspace(_low, _high, int(bins) + 1)
+        else:
+            self._uniform_bins = None
+            self.bin_edges = np.asarray(bins, dtype=np.float64)
+            if self.bin_edges.ndim != 1 or len(self.bin_edges) < 2 or \
+                    np.any(np.diff(self.bin_edges) <= 0):
+                raise ValueError("Bin edges must increase monotonically.")
+
+        #: the number of entries in each bin
+        self.counts = np.zeros(len(self.bin_edges) - 1, dtype=np.int64)
+        #: the number of events, including the ones outside of the bins
+        self.number_of_events = 0
+
+    def _count(self, events):
+        '''Returns the bin counts for an array of events.'''
+        events = np.asarray(events).ravel()
+        if self._uniform_bins is not None:
+            # numpy computes the bin of each event for equal-width bins
+            _counts = np.histogram(events, bins=self._uniform_bins[0],
+                                   range=self._uniform_bins[1])[0]
+        else:
+            _counts = np.histogram(events, bins=self.bin_edges)[0]
+        return _counts, len(events)
+
+    def _add(self, counts_and_size):
+        '''Adds the result of :py:meth:`_count` to the histogram.'''
+        _counts, _size = counts_and_size
+        self.counts += _counts
+        self.number_of_events += _size
+
+    def fill(self, events):
+        '''
+        Adds events to the histogram.
+
+        Parameters
+        ----------
+
+        **events** : iterable of floats
+            the values of the events.
+        '''
+        self._add(self._count(events))
+
+    def fill_chunks(self, chunks, threads=None,
+                    chunk_size=HISTOGRAM_CHUNK_SIZE):
+        '''
+        Adds events to the histogram, chunk by chunk. The chunks are binned
+        in a pool of threads, which run in parallel, since NumPy releases the
+        global interpreter lock while binning. Only a few chunks are read
+        ahead, so the memory used is bounded.
+
+        Parameters
+        ----------
+
+        **chunks** : iterable of arrays or `numpy.ndarray`
+            the chunks of events, e.g. read one after another from a file. An
+            array, e.g. a memory-mapped one (see `numpy.memmap` and
+            `numpy.load`), is split into chunks of *chunk_size* events.
+
+        Keyword Arguments
+        -----------------
+
+        threads : int, optional
+            the number of threads. Defaults to the number of CPUs.
+
+        chunk_size : int, optional
+            the number of events per chunk if *chunks* is an array.
+        '''
+        if isinstance(chunks, np.ndarray):
+            _events = chunks.reshape(-1)
+            chunks = (_events[_start:_start + chunk_size]
+                      for _start in range(0, len(_events), chunk_size))
+
+        if threads is None:
+            threads = multiprocessing.cpu_count()
+        if threads <= 1:
+            for _chunk in chunks:
+                self.fill(_chunk)
+            return
+
+        _pool = ThreadPool(threads)
+        try:
+            _pending = deque()
+            for _chunk in chunks:
+                _pending.append(_pool.apply_async(self._count, (_chunk,)))
+                # limit the number of chunks held in memory
+                if len(_pending) >= 2 * threads:
+                    self._add(_pending.popleft().get())
+            while _pending:
+                self._add(_pending.popleft().get())
+        finally:
+            _pool.close()
+            _pool.join()
+
+    def get_bin_centers(self):
+        '''
+        Returns the centers of the bins.
+        '''
+        return 0.5 * (self.bin_edges[:-1] + self.bin_edges[1:])
+
+    def build_dataset(self, error_model='poisson', expected_counts=None,
+                      **kwargs):
+        r'''
+        Creates a `Dataset` with the bin centers as `x` data and the bin
+        counts as `y` data.
+
+        Keyword Arguments
+        -----------------
+
+        error_model : ``'poisson'`` or ``'pearson'``, optional
+            for ``'poisson'`` (default), the uncertainty of each count
+            :math:`n_i` is :math:`\sqrt{n_i}`, or 1 for empty bins. For
+            ``'pearson'``, it is the square root of the expected count
+            :math:`\mu_i`, which makes the :math:`\chi^2` of a fit
+            Pearson's :math:`\chi^2`. The expected counts are usually taken
+            from a fit with the ``'poisson'`` error model.
+
+        expected_counts : iterable of floats, optional
+            the expected counts :math:`\mu_i`. Required for the
+            ``'pearson'`` error model.
+
+        Other keyword arguments (e.g. *title*, *axis_labels*, *axis_units*
+        or *basename*) are passed on to the `Dataset`.
+
+        Returns
+        -------
+
+        ::py:class:`~kafe.dataset.Dataset`
+            `Dataset` object constructed from the histogram
+        '''
+        _counts = self.counts.astype(np.float64)
+        if error_model == 'poisson':
+            # errors of empty bins are set to 1
+            _errors = np.sqrt(np.maximum(_counts, 1.))
+        elif error_model == 'pearson':
+            if expected_counts is None:
+                raise ValueError("The expected counts are required for the "
+                                 "`pearson' error model.")
+            _expected = np.asarray(expected_counts, dtype=np.float64)
+            if _expected.shape != _counts.shape or np.any(_expected <= 0):
+                raise ValueError("Expected %d positive expected counts."
+                                 % (len(_counts),))
+            _errors = np.sqrt(_expected)
+        else:
+            raise ValueError("Unknown error model `%s'. Expected `poisson' "
+                             "or `pearson'." % (error_model,))
+
+        _dataset = Dataset(data=(self.get_bin_centers(), _counts), **kwargs)
+        _dataset.add_error_source('y', 'simple', _errors)
+        return _dataset
+
+
+def build_histogram_dataset(events, bins, range=None, error_model='poisson',
+                            expected_counts=None, threads=None,
+                            chunk_size=HISTOGRAM_CHUNK_SIZE, **kwargs):
+    '''
+    This helper function histograms raw events and creates a `Dataset` from
+    the bin counts, using a :py:class:`~kafe.dataset_tools.HistogramBuilder`.
+
+    >>> my_dataset = build_histogram_dataset(
+    ...     np.memmap('events.bin', dtype=np.float32, mode='r'),
+    ...     50, range=(-3., 3.), title="Histogram")
+
+    Parameters
+    ----------
+
+    **events** : `numpy.ndarray` or iterable of arrays
+        the events, e.g. a memory-mapped array, or chunks of events.
+
+    **bins** : int or sequence of floats
+        the number of bins of equal width in *range* or the bin edges.
+
+    Keyword Arguments
+    -----------------
+
+    range : 2-tuple of floats, optional
+        the histogram range. Required if *bins* is a number.
+
+    error_model, expected_counts : optional
+        the error model of the bin counts, see
+        :py:meth:`~kafe.dataset_tools.HistogramBuilder.build_dataset`.
+
+    threads, chunk_size : int, optional
+        see :py:meth:`~kafe.dataset_tools.HistogramBuilder.fill_chunks`.
+
+    Other keyword arguments are passed on to the `Dataset`.
+
+    Returns
+    -------
+
+    ::py:class:`~kafe.dataset.Dataset`
+        `Dataset` object constructed from the histogram
+    '''
+    _builder = HistogramBuilder(bins, range=range)
+    _builder.fill_chunks(events, threads=threads, chunk_size=chunk_size)
+    return _builder.build_dataset(error_model=error_model,
+                                  expected_counts=expected_counts, **kwargs)
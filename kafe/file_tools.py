@@ -10,8 +10,14 @@
 
 import numpy as np
 import os, sys
+import copy
+import warnings
+from collections import OrderedDict
+from itertools import chain, islice
 
 from .dataset import Dataset
+from .stream import detect_compression, open_text_input, \
+    strip_compression_extension
 from .dataset_tools import build_dataset
 from .fit import build_fit
 
@@ -19,6 +25,251 @@ from .fit import build_fit
 import logging
 logger = logging.getLogger('kafe')
 
+#: number of lines parsed at once by :py:func:`parse_float_columns`
+PARSE_CHUNK_LINES = 100000
+
+#: maximum number of entries in each cache of
+#: :py:func:`parse_general_inputfile`
+PARSE_CACHE_SIZE = 64
+
+# results of parse_general_inputfile by (file path, mtime, size)
+_parse_cache = OrderedDict()
+# sanitized fit function code by fit function code
+_fitf_code_cache = OrderedDict()
+
+
+def _cache_lookup(cache, key):
+    '''
+    Returns the cached value for a key, or ``None``. A value found is marked
+    as most recently used.
+    '''
+    if key is None or key not in cache:
+        return None
+    cache[key] = cache.pop(key)
+    return cache[key]
+
+
+def _cache_store(cache, key, value):
+    '''
+    Stores a value in a cache, dropping the least recently used values
+    beyond :py:data:`PARSE_CACHE_SIZE`.
+    '''
+    cache[key] = value
+    while len(cache) > PARSE_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def _copy_parse_result(result):
+    '''
+    Copies a result of :py:func:`parse_general_inputfile`, so that the
+    arrays of a cached result are not modified by the caller. The fit
+    function itself is shared.
+    '''
+    dataset_kwargs, fit_kwargs = result
+    if fit_kwargs is not None:
+        fit_kwargs = dict(fit_kwargs, **copy.deepcopy(
+            {key: val for key, val in fit_kwargs.items()
+             if key != 'fit_function'}))
+    return copy.deepcopy(dataset_kwargs), fit_kwargs
+
+
+def clear_parse_cache():
+    '''
+    Empties the caches of :py:func:`parse_general_inputfile`.
+    '''
+    _parse_cache.clear()
+    _fitf_code_cache.clear()
+
+
+def _count_lines(file_path):
+    '''
+    Returns an upper bound on the number of lines in a file by counting the
+    newline characters in binary blocks, or ``None`` for compressed files.
+    '''
+    _n_lines = 1
+    with open(file_path, 'rb') as _file:
+        _block = _file.read(1 << 20)
+        if detect_compression(_block, file_path) is not None:
+            return None
+        while _block:
+            _n_lines += _block.count(b'\n')
+            _block = _file.read(1 << 20)
+    return _n_lines
+
+
+def _parse_line_fields(lines, n_columns=None, delimiter=None):
+    '''
+    Parses lines of delimited floats one by one. This is the reference
+    behavior of :py:func:`parse_float_columns`, used for lines which NumPy's
+    tokenizer cannot handle.
+    '''
+    result = []
+    for line in lines:  # go through the lines of the file
+        if '#' in line:
+            # ignore anything after a comment sign (#)
+            line = line.split('#')[0]
+
+        # ignore empty lines
+        if (not line) or (line.isspace()):
+            continue
+
+        # get field contents by splitting lines
+        if delimiter is None:
+            tmp_fields = line.split()
+        else:
+            tmp_fields = line.split(delimiter)
+
+        # turn them into floats
+        tmp_values = list(map(float, tmp_fields[:n_columns]))
+        if n_columns is not None and len(tmp_values) < n_columns:
+            raise IndexError("Line `%s' has %d fields, expected at least %d."
+                             % (line.strip(), len(tmp_values), n_columns))
+
+        result.append(tmp_values)
+
+    return result
+
+
+def parse_float_columns(lines, n_columns=None, delimiter=None,
+                        max_rows=None, chunk_lines=PARSE_CHUNK_LINES):
+    '''
+    Parses lines of delimited floating point numbers into a two-dimensional
+    array with one row per line. Anything after a comment sign (#) is
+    ignored, as are empty lines.
+
+    The lines are consumed lazily and converted in chunks by NumPy's
+    tokenizer (:py:func:`numpy.loadtxt`), so that the memory needed besides
+    the result is bounded by the chunk size. A chunk which the tokenizer
+    rejects (e.g. because of a delimiter longer than one character) is parsed
+    line by line instead.
+
+    Parameters
+    ----------
+
+    **lines** : iterable of strings
+        The lines to parse, e.g. a file object.
+
+    *n_columns* : int or ``None``, optional
+        If given, only the first `n_columns` fields of every line are read.
+        Otherwise, all lines must have the same number of fields.
+
+    *delimiter* : ``None`` or string, optional
+        The field delimiter. Defaults to ``None``, meaning any whitespace.
+
+    *max_rows* : int or ``None``, optional
+        An upper bound on the number of rows. If given, the result is filled
+        into a preallocated array.
+
+    *chunk_lines* : int, optional
+        The number of lines parsed at once.
+
+    Returns
+    -------
+
+    *numpy.ndarray*
+        Array of shape (number of rows, number of columns).
+    '''
+    _use_loadtxt = delimiter is None or len(delimiter) == 1
+    _usecols = None if n_columns is None else range(n_columns)
+
+    _lines = iter(lines)
+    _result, _chunks, _n_rows = None, [], 0
+    while True:
+        _chunk = list(islice(_lines, chunk_lines))
+        if not _chunk:
+            break
+
+        _array = None
+        if _use_loadtxt:
+            try:
+                with warnings.catch_warnings():
+                    # chunks with only comments are no error
+                    warnings.simplefilter('ignore', UserWarning)
+                    _array = np.loadtxt(_chunk, dtype=np.float64,
+                                        comments='#', delimiter=delimiter,
+                                        usecols=_usecols, ndmin=2)
+            except (ValueError, TypeError):
+                pass
+        if _array is None:
+            _rows = _parse_line_fields(_chunk, n_columns, delimiter)
+            if not _rows:
+                continue
+            _array = np.array(_rows, dtype=np.float64)
+            if _array.ndim != 2:
+                raise ValueError("Lines have differing numbers of fields.")
+        if not len(_array):
+            continue
+
+        if _result is None and not _chunks:
+            _n_columns = _array.shape[1]
+            if max_rows is not None:
+                # column-major, so that the columns are contiguous
+                _result = np.empty((max_rows, _n_columns), order='F')
+        elif _array.shape[1] != _n_columns:
+            raise ValueError("Lines have differing numbers of fields.")
+
+        if _result is not None:
+            _result[_n_rows:_n_rows + len(_array)] = _array
+        else:
+            _chunks.append(_array)
+        _n_rows += len(_array)
+
+    if _result is not None:
+        return _result[:_n_rows]
+    elif _chunks:
+        return np.concatenate(_chunks)
+    return np.zeros((0, n_columns or 0))
+
+
+def is_npy_file(file_path):
+    '''
+    Returns ``True`` if the file at the given path starts with the signature
+    of the binary NumPy format (``.npy``).
+    '''
+    _signature = np.lib.format.MAGIC_PREFIX
+    with open(file_path, 'rb') as _file:
+        return _file.read(len(_signature)) == _signature
+
+
+def sum_matrices(matrices, block_size=1 << 22):
+    '''
+    Sums matrices of equal shape into a new matrix. The matrices are added
+    block of rows by block of rows, so that of memory-mapped matrices only
+    one block at a time is accessed, and the matrices may be given as a
+    generator reading them one by one.
+
+    Parameters
+    ----------
+
+    **matrices** : iterable of array-like objects
+        The matrices to sum.
+
+    *block_size* : int, optional
+        The approximate number of matrix elements added at once.
+
+    Returns
+    -------
+
+    *numpy.matrix* or ``None``
+        The sum of the matrices, or ``None`` if no matrices were given.
+    '''
+    _sum = None
+    for _matrix in matrices:
+        if _sum is None:
+            _sum = np.array(_matrix, dtype=np.float64)
+            _block_rows = max(1, block_size // max(1, _sum.shape[-1]))
+            continue
+        if _matrix.shape != _sum.shape:
+            raise ValueError("Cannot add matrices of shapes %r and %r."
+                             % (_sum.shape, _matrix.shape))
+        for _start in range(0, len(_sum), _block_rows):
+            _sum[_start:_start + _block_rows] += \
+                np.asarray(_matrix[_start:_start + _block_rows])
+
+    if _sum is None:
+        return None
+    return np.asmatrix(_sum)
+
 
 def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
                       cov_mat_files=None, title="Untitled Dataset",
@@ -50,6 +301,9 @@ def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
     character or omitted, any sequence of whitespace characters is assumed to
     separate the data.
 
+    Files compressed with `gzip`, `bzip2` or `xz` are decompressed while being
+    parsed (see :py:func:`~kafe.stream.open_text_input`).
+
     Parameters
     ----------
 
@@ -71,7 +325,9 @@ def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
 
         Each element of this tuple may be either ``None``, a file or file-like
         object, or an iterable containing files and file-like objects. Each
-        file should contain a covariance matrix for the respective axis.
+        file should contain a covariance matrix for the respective axis,
+        either as plain text or, for file paths, in the binary NumPy format
+        (``.npy``). Binary files are memory-mapped instead of being read.
 
         When creating the :py:obj:`Dataset`, all given matrices are summed over.
 
@@ -111,6 +367,11 @@ def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
             ...   ...   ...  ...
             a_N1  a_N2  ...  a_NM
 
+        The file may be compressed (see
+        :py:func:`~kafe.stream.open_text_input`). Alternatively, a file path
+        may point to a file in the binary NumPy format (``.npy``), which is
+        memory-mapped read-only instead of being parsed.
+
         Parameters
         ----------
 
@@ -124,63 +385,26 @@ def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
         Returns
         -------
 
-        *numpy.matrix*
+        *numpy.matrix* or *numpy.memmap*
             matrix read from file
         '''
 
-        # Read all lines from the file
-        try:
-            tmp_lines = file_like.readlines()
-        except:
-            tmp_f = open(file_like)
-            tmp_lines = tmp_f.readlines()
-            tmp_f.close()
-
-        # actual file parsing
-        result = []
-        for line in tmp_lines:  # go through the lines of the file
-            if '#' in line:
-                # ignore anything after a comment sign (#)
-                line = line.split('#')[0]
-
-            # ignore empty lines
-            if (not line) or (line.isspace()):
-                continue
-
-            # get field contents by splitting lines
-            if delimiter is None:
-                tmp_fields = line.split()
-            else:
-                tmp_fields = line.split(delimiter)
-
-            # turn them into floats
-            tmp_fields = list(map(float, tmp_fields))
+        if not hasattr(file_like, 'read') and is_npy_file(file_like):
+            return np.load(file_like, mmap_mode='r')
 
-            # append those contents to the right fields
-            result.append(tmp_fields)
+        # text files are parsed line by line
+        with open_text_input(file_like) as tmp_f:
+            result = parse_float_columns(tmp_f, delimiter=delimiter)
 
         return np.asmatrix(result)  # return np.matrix as result
     # -- end helper function
 
-    try:
-        # try to read the lines of the file
-        tmp_lines = file_to_parse.readlines()
-        logger.info("Reading column data (%s) from file: %r"
-                    % (field_order, file_to_parse))
-        # this will fail if a file path string was passed, so alternatively:
-    except AttributeError:
-        if basename is None:
-            # get the basename from the path
-            _basename = os.path.basename(file_to_parse)
-            # remove the last extension (usually '.dat')
-            basename = '.'.join(_basename.split('.')[:-1])
-        # open the file pointed to by the path
-        tmp_file = open(file_to_parse, 'r')
-        logger.info("Reading column data (%s) from file: %s"
-                    % (field_order, file_to_parse))
-        # and then read the lines of the file
-        tmp_lines = tmp_file.readlines()
-        tmp_file.close()
+    if basename is None and not hasattr(file_to_parse, 'read'):
+        # get the basename from the path
+        _basename = strip_compression_extension(
+            os.path.basename(file_to_parse))
+        # remove the last extension (usually '.dat')
+        basename = '.'.join(_basename.split('.')[:-1])
 
     # if basename still unset, set it to 'untitled'
     if basename is None:
@@ -222,38 +446,33 @@ def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
     if delimiter in ['', ' ', '\t']:  # if delimiter is a whitespace character
         delimiter = None              # set to None
 
-    # actual file parsing
-    for line in tmp_lines:  # go through the lines of the file
-
-        if '#' in line:
-            # ignore anything after a comment sign (#)
-            line = line.split('#')[0]
-
-        if (not line) or (line.isspace()):  # ignore empty lines
-            continue
-
-        # get field contents by splitting lines
-        if delimiter is None:
-            tmp_fields = line.split()
-        else:
-            tmp_fields = line.split(delimiter)
-
-        # append those contents to the right fields
-        for idx, field_name in enumerate(field_order_list):
-            fields[field_name].append(float(tmp_fields[idx]))
+    # actual file parsing: read all fields up to the last one needed
+    if hasattr(file_to_parse, 'read'):
+        logger.info("Reading column data (%s) from file: %r"
+                    % (field_order, file_to_parse))
+        max_rows = None
+    else:
+        logger.info("Reading column data (%s) from file: %s"
+                    % (field_order, file_to_parse))
+        max_rows = _count_lines(file_to_parse)
+    # compressed files are decompressed while being parsed
+    with open_text_input(file_to_parse) as tmp_file:
+        columns = parse_float_columns(tmp_file,
+                                      n_columns=len(field_order_list),
+                                      delimiter=delimiter, max_rows=max_rows)
 
     # gather kwargs for Dataset object
     dataset_kwargs = {}
-    for key in fields.keys():
-        if fields[key]:           # if the field is not empty
+    if len(columns):
+        for idx, field_name in enumerate(field_order_list):
             # some syntax translation needed (x -> xdata)
             # for Dataset constructor
-            if key in axes:
-                dataset_kwargs[key+'data'] = np.asarray(fields[key])
-            elif key == 'ignore':
+            if field_name in axes:
+                dataset_kwargs[field_name+'data'] = columns[:, idx]
+            elif field_name == 'ignore':
                 pass
             else:
-                dataset_kwargs[key] = np.asarray(fields[key])
+                dataset_kwargs[field_name] = columns[:, idx]
 
     dataset_kwargs.update({'title': title, 'basename': basename,
                            'axis_labels': axis_labels,
@@ -286,24 +505,19 @@ def parse_column_data(file_to_parse, field_order='x,y', delimiter=' ',
                         isinstance(cov_mat_files[axis_id], tuple) or
                         isinstance(cov_mat_files[axis_id], list)
                     ):
-                        # we have more than one cov_mat
-                        current_cov_mat = None  # initialize to None, for now
-
-                        # go through each matrix file for this axis
-                        for tmp_mat_file in cov_mat_files[axis_id]:
-                            # read the matrix
-                            tmp_mat = parse_matrix_file(tmp_mat_file)
-                            # add to previous cov_mats for this axis
-                            if current_cov_mat is None:
-                                current_cov_mat = tmp_mat
-                            else:
-                                current_cov_mat += tmp_mat
+                        # we have more than one cov_mat: read the matrix
+                        # files one by one and add them up
+                        current_cov_mat = sum_matrices(
+                            parse_matrix_file(tmp_mat_file)
+                            for tmp_mat_file in cov_mat_files[axis_id]
+                        )
                     else:
                         # ony one cov_mat for the axis:
                         # parse the given matrix file into cov mat
-                        current_cov_mat = parse_matrix_file(
+                        # (copied, in case it is memory-mapped)
+                        current_cov_mat = sum_matrices([parse_matrix_file(
                             cov_mat_files[axis_id]
-                        )
+                        )])
 
                     # append to cov_mats to pass to :py:obj:`Dataset`
                     cov_mats.append(current_cov_mat)
@@ -331,7 +545,8 @@ def parse_general_inputfile(file_to_parse):
     ----------
 
     **file_to_parse** : file-like object or string containing a file path
-       The file to parse.
+       The file to parse. Files compressed with `gzip`, `bzip2` or `xz` are
+       decompressed while being read.
 
     Returns
     -------
@@ -595,6 +810,7 @@ def parse_general_inputfile(file_to_parse):
     #                     `*ConstrainedParameters`
     #   G.Q., 15-Aug-14 import of fitf via exec statement
     #   D.S.,  2-Jul-15 re-indent, pep8 conformity
+    #          18-Oct-26 vectorized decoding in float64, cache of results
     #---------------------------------------------------------------------
 
     # define a dictionary for tags from file
@@ -614,7 +830,7 @@ def parse_general_inputfile(file_to_parse):
               "*yData_COV": 'arr',   # y values, errors, syst. & COV
               "*xData_SCOV": 'arr',  # x values, errors, syst. & sqrt(COV)
               "*yData_SCOV": 'arr',  # y values, errors, syst. & sqrt(COV)
-              "*xAbsCor": 'f',       # common x-error  (f=float32)
+              "*xAbsCor": 'f',       # common x-error  (f=float)
               "*yAbsCor": 'f',       # common y-error
               "*xRelCor": 'f',       # common, relative x-error
               "*yRelCor": 'f',       # common, relative y-error
@@ -628,6 +844,18 @@ def parse_general_inputfile(file_to_parse):
 
     setkeys = []  # remember specified keys
 
+    # reuse the result for a file which has not changed since the last parse
+    if hasattr(file_to_parse, 'read'):
+        cache_key = None
+    else:
+        _stat = os.stat(file_to_parse)
+        cache_key = (os.path.abspath(file_to_parse),
+                     _stat.st_mtime, _stat.st_size)
+    _cached = _cache_lookup(_parse_cache, cache_key)
+    if _cached is not None:
+        logger.info("Using cached input from file: %s" % (file_to_parse,))
+        return _copy_parse_result(_cached)
+
     # define character for comments
     ccomment = "#"
     # --- helpers for parse_general_inputfile -------------------------------
@@ -636,72 +864,76 @@ def parse_general_inputfile(file_to_parse):
         # remove comments, empty lines and extra spaces from input file
         inputlines = []
 
-        try:
-            tmp_lines = f.readlines()
-        except AttributeError:
-            tmp_f = open(f, 'r')
-            logger.info("Reading data from file: %s" % (f))
-            tmp_lines = tmp_f.readlines()
-            tmp_f.close()
-        finally:
-            logger.info("Reading data from file: %r" % (f))
-
-        # pre-process each line
-        for line in tmp_lines:
-            # remove comments
-            if comment_character in line:
-                line = line.split(comment_character)[0]
-            # skip empty lines
-            if not line or line.isspace():
-                continue
-            else:
-                inputlines.append(line)
+        logger.info("Reading data from file: %r" % (f))
+        # compressed files are decompressed while being read
+        with open_text_input(f) as tmp_f:
+            # pre-process each line
+            for line in tmp_f:
+                # remove comments
+                if comment_character in line:
+                    line = line.split(comment_character)[0]
+                # skip empty lines
+                if not line or line.isspace():
+                    continue
+                else:
+                    inputlines.append(line)
 
         return inputlines
 
+    def data_and_lower_triangle(flist, n_columns, diagonal):
+        # get the first `n_columns` columns and the elements of the lower
+        # triangular matrix following them, row by row
+        size = len(flist)
+        columns = np.array([row[:n_columns] for row in flist], np.float64).T
+        offset = 1 if diagonal else 0
+        triangle = np.array(list(chain.from_iterable(
+            row[n_columns:n_columns + i + offset]
+            for i, row in enumerate(flist))), np.float64)
+        return columns, triangle, np.tril_indices(size, offset - 1)
+
     def data_from_SCOV(flist):
         # decode data with covariance matrix
         # given as lower triangular matrix of sqrt of elements
-        size = len(flist)
-        dat = np.array([flist[i][0] for i in range(size)], np.float32)
-        err = np.array([flist[i][1] for i in range(size)], np.float32)
-        sys = np.array([flist[i][2] for i in range(size)], np.float32)
-        cov = np.zeros((size, size), np.float64)
-        for i in range(1, size):
-            for j in range(0, i):
-                cov[i, j] = np.float64(flist[i][j + 3]) ** 2
-                cov[j, i] = cov[i, j]
-        np.fill_diagonal(cov, sys * sys)
+        (dat, err, syst), sqrt_cov, (i, j) = \
+            data_and_lower_triangle(flist, 3, diagonal=False)
+        cov = np.zeros((len(flist), len(flist)), np.float64)
+        cov[i, j] = sqrt_cov ** 2
+        cov[j, i] = cov[i, j]
+        np.fill_diagonal(cov, syst * syst)
         return dat, err, cov
 
     def data_from_COV(flist):
         # decode data with full covariance matrix
-        size = len(flist)
-        dat = np.array([flist[i][0] for i in range(size)], np.float32)
-        err = np.array([flist[i][1] for i in range(size)], np.float32)
-        cov = np.zeros((size, size), np.float64)
-        for i in range(1, size):
-            for j in range(1, size):
-                cov[i, j] = np.float64(flist[i][j + 2])
+        # given as lower triangular matrix including the diagonal
+        (dat, err), lower_cov, (i, j) = \
+            data_and_lower_triangle(flist, 2, diagonal=True)
+        cov = np.zeros((len(flist), len(flist)), np.float64)
+        cov[i, j] = lower_cov
+        cov[j, i] = lower_cov
         return dat, err, cov
 
     def data_from_COR(flist):
         # decode data with covariance matrix given
         # given as lower triangular matrix of correlation coefficients
-        size = len(flist)
-        dat = np.array([flist[i][0] for i in range(size)], np.float32)
-        err = np.array([flist[i][1] for i in range(size)], np.float32)
-        sys = np.array([flist[i][2] for i in range(size)], np.float32)
-        cov = np.zeros((size, size), np.float64)
-        for i in range(1, size):
-            for j in range(0, i):
-                cov[i, j] = np.float64(flist[i][j + 3]) * sys[i] * sys[j]
-                cov[j, i] = cov[i, j]
-        np.fill_diagonal(cov, sys * sys)
+        (dat, err, syst), cor, (i, j) = \
+            data_and_lower_triangle(flist, 3, diagonal=False)
+        cov = np.zeros((len(flist), len(flist)), np.float64)
+        cov[i, j] = cor * syst[i] * syst[j]
+        cov[j, i] = cov[i, j]
+        np.fill_diagonal(cov, syst * syst)
         return dat, err, cov
 
     def parse_sanitize_fitf_code(code_string):
         '''Parse and sanitize Python code'''
+        _cached = _cache_lookup(_fitf_code_cache, code_string)
+        if _cached is not None:
+            return _cached
+        _result = tokenize_sanitize_fitf_code(code_string)
+        _cache_store(_fitf_code_cache, code_string, _result)
+        return _result
+
+    def tokenize_sanitize_fitf_code(code_string):
+        '''Tokenize and sanitize Python code'''
         import tokenize
         import string
         try:
@@ -832,7 +1064,7 @@ def parse_general_inputfile(file_to_parse):
                     _val = _vals[0]
                 else:
                     _val = _vals[0]
-                tokens[current_key] = np.float32(_val)
+                tokens[current_key] = np.float64(_val)
             elif tokens[current_key] == 'arr':
                 # expected input is array of data -> empty list
                 tokens[current_key] = []
@@ -867,23 +1099,23 @@ def parse_general_inputfile(file_to_parse):
                 flist = tokens[key]
                 rows = len(flist)
                 cols = len(flist[0])
-                xdat = np.array([flist[i][0] for i in range(rows)], np.float32)
+                xdat = np.array([flist[i][0] for i in range(rows)], np.float64)
                 if(cols >= 2):
                     xerr = np.array([flist[i][1]
-                                    for i in range(rows)], np.float32)
+                                    for i in range(rows)], np.float64)
                 else:
-                    xerr = np.zeros(rows, np.float32)
+                    xerr = np.zeros(rows, np.float64)
                 xcov = np.zeros((rows, rows), np.float64)
             elif (key == '*yData'):
                 flist = tokens[key]
                 rows = len(flist)
                 cols = len(flist[0])
-                ydat = np.array([flist[i][0] for i in range(rows)], np.float32)
+                ydat = np.array([flist[i][0] for i in range(rows)], np.float64)
                 if(cols >= 2):
                     yerr = np.array([flist[i][1]
-                                    for i in range(rows)], np.float32)
+                                    for i in range(rows)], np.float64)
                 else:
-                    yerr = np.zeros(rows, np.float32)
+                    yerr = np.zeros(rows, np.float64)
                 ycov = np.zeros((rows, rows), np.float64)
             elif (key == '*xData_SCOV'):
                 xdat, xerr, xcov = data_from_SCOV(tokens[key])
@@ -929,15 +1161,16 @@ def parse_general_inputfile(file_to_parse):
     #  x-data may not have been given (e.g. for calcualtion of average)
     if len(xdat) == 0:
         logger.warn("no xdata given - generated as an arange")
-        xdat = np.arange(0., len(ydat), 1., np.float32)
-        xerr = np.zeros(len(ydat), np.float32)
+        xdat = np.arange(0., len(ydat), 1., np.float64)
+        xerr = np.zeros(len(ydat), np.float64)
         xcov = np.zeros((len(ydat), len(ydat)), np.float64)
 
     # set a name for the data set, if not given yet
     if(tokens['*BASENAME'] == ''):
         if('str' in str(type(file_to_parse))):
         # get the basename from the path
-            _basename = os.path.basename(file_to_parse)
+            _basename = strip_compression_extension(
+                os.path.basename(file_to_parse))
              # remove the last extension (usually '.dat')
             tokens['*BASENAME'] = '.'.join(_basename.split('.')[:-1])
         else:
@@ -1001,7 +1234,10 @@ def parse_general_inputfile(file_to_parse):
                           'constrained_parameters': cpars
                           })
 
-    return dataset_kwargs, fit_kwargs
+    if cache_key is None:
+        return dataset_kwargs, fit_kwargs
+    _cache_store(_parse_cache, cache_key, (dataset_kwargs, fit_kwargs))
+    return _copy_parse_result((dataset_kwargs, fit_kwargs))
 
 # ---- end parse_general_inputfile
 
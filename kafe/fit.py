@@ -47,6 +47,21 @@
 # 08-Oct-16   G.Q. added function get_results()
 # 16-Oct-16   D.S. supplying quiet=True to Fit() is now passed on to minimizer;
 #                  no file is created for quiet=True.
+# 18-Oct-26        minimizer calls the FCN with an array of parameter values
+#                  fix_parameters/release_parameters use a single call
+#                  to the minimizer
+#                  added set_linear_parameters: linear parameters are
+#                  profiled analytically during the minimization
+#                  models linear in all parameters are solved in closed form
+#                  added set_covariance_method: Gauss-Newton approximation
+#                  of the parameter covariance matrix instead of/besides HESSE
+#                  added evaluate_chi2_batch for many parameter sets at once
+#                  plot_contour can compute contours on a parameter grid
+#                  plot_profile uses an adaptive, warm-started profile scan
+#                  constraints are combined and precompiled for the FCN
+#                  the dataset is streamed to the log instead of formatted
+#                  added refit for data appended to the dataset
+#                  default chi2 uses the cached Cholesky factor
 # -------------------------------------------------------------------------
 
 from __future__ import print_function
@@ -58,8 +73,11 @@ import numpy as np
 from .numeric_tools import cov_to_cor, extract_statistical_errors, MinuitCov_to_cor, cor_to_cov
 
 from .config import (FORMAT_ERROR_SIGNIFICANT_PLACES, F_SIGNIFICANCE_LEVEL,
+                     F_LINEAR_CLOSED_FORM, F_COVARIANCE_METHOD,
                      M_MINIMIZER_TO_USE, log_file, null_file)
+from .linear_solver import LinearSolver
 from math import floor, log
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
 
 import os
 from .stream import StreamDup
@@ -68,6 +86,9 @@ from .stream import StreamDup
 import logging
 logger = logging.getLogger('kafe')
 
+# memory (in bytes) per intermediate array in `Fit.evaluate_chi2_batch`
+_CHI2_BATCH_MEMORY = 2 ** 25
+
 
 # The default FCN
 def chi2(xdata, ydata, cov_mat,
@@ -107,7 +128,7 @@ def chi2(xdata, ydata, cov_mat,
     **fit_function** : function
         The fit function :math:`f(x)`
 
-    **parameter_values** : list/tuple
+    **parameter_values** : list/tuple/`numpy.ndarray`
         The values of the parameters at which :math:`f(x)` should be evaluated.
 
     Keyword Arguments
@@ -213,7 +234,8 @@ class Fit(object):
 
         >>> FCN(xdata, ydata, cov_mat, fit_function, parameter_values)
 
-        It should return a float. If not specified, the default :math:`\chi^2`
+        Here, `parameter_values` is a one-dimensional `float64` array
+        provided by the minimizer. It should return a float. If not specified, the default :math:`\chi^2`
         `FCN` is used. This should be sufficient for most fits.
 
     fit_name : string, optional
@@ -226,15 +248,19 @@ class Fit(object):
         legend describing the fitter curve. If omitted, this defaults to the
         fit function's :math:`LaTeX` expression.
 
-    minimizer_to_use : 'ROOT' or 'minuit', optional
+    minimizer_to_use : 'ROOT', 'minuit' or 'linear', optional
         Which minimizer to use. This defaults to whatever is set in the config
         file, but can be specifically overridden for some fits using this
-        keyword argument
+        keyword argument. If no minimizer is given and the fit function is
+        declared linear in all parameters (see
+        :py:func:`~kafe.function_tools.Linear`), the fit is solved in closed
+        form, unless disabled in the config file. Use 'linear' to request
+        the closed-form solution explicitly.
     '''
 
     def __init__(self, dataset, fit_function, external_fcn=chi2,
                  fit_name=None, fit_label=None,
-                 minimizer_to_use=M_MINIMIZER_TO_USE,
+                 minimizer_to_use=None,
                  quiet=False):
         '''
         Construct an instance of a ``Fit``
@@ -262,6 +288,13 @@ class Fit(object):
         """Parameter Contours [id1, id2, dchi2, [xc], [yc]]"""
         self.profiles=[]
         """Parameter Profiles [id1, [xp], [dchi1(xp)]]"""
+        self.hesse_cov_mat = None
+        """Parameter covariance matrix from ``HESSE`` (`numpy.matrix`)"""
+        self.gauss_newton_cov_mat = None
+        """Gauss-Newton parameter covariance matrix (`numpy.matrix`)"""
+        self.covariance_agreement = None
+        """Comparison of both covariance matrices (`dict`), see
+        :py:meth:`set_covariance_method`"""
 
         if isinstance(fit_function, FitFunction):
             #: the fit function used for this `Fit`
@@ -295,9 +328,25 @@ class Fit(object):
                                           dtype=bool)
         self.number_of_fixed_parameters = 0
 
+        # store which parameters enter the fit function linearly
+        self._linear_parameters = np.zeros(self.number_of_parameters,
+                                           dtype=bool)
+        self._linear_parameters[list(self.fit_function.linear_parameters)] = True
+        # ids of the linear parameters currently eliminated from the FCN
+        self._profiled_parameter_ids = None
+        # covariance matrix and its inverse used for profiling
+        self._profiling_cov_mat = (None, None)
+        # covariance matrix and its Cholesky factor
+        self._cov_mat_cholesky = (None, None)
+
+        self.covariance_method = None
+        self.set_covariance_method(F_COVARIANCE_METHOD)
+
         # Dictionary to store Gaussian_constrain object with the ids of constrained parameters as key
         self.constrain = {}
         self.number_of_constrained_parameters = 0
+        # all constraints combined into one, as passed to the FCN
+        self._fcn_constraints = {}
 
         # store the full function definition
         self.function_equation_full = \
@@ -327,7 +376,16 @@ class Fit(object):
                         "data points have the `y`-error 1.0")
 
         #: this `Fit`'s minimizer (`Minuit`)
-        if type(minimizer_to_use) is str:
+        # models linear in all parameters are solved in closed form, unless
+        # a minimizer is requested explicitly
+        _closed_form = (minimizer_to_use is None and F_LINEAR_CLOSED_FORM
+                        and self.fit_function.is_linear
+                        and self.external_fcn is chi2)
+        if minimizer_to_use is None:
+            minimizer_to_use = M_MINIMIZER_TO_USE
+        if _closed_form:
+            _minimizer_handle = LinearSolver
+        elif type(minimizer_to_use) is str:
             # if specifying the minimizer type using a string
             if minimizer_to_use.lower() == "root":
                 # raise error if ROOT is not found on the system
@@ -346,19 +404,28 @@ class Fit(object):
                 from .iminuit_wrapper import IMinuit
                 _minimizer_handle = IMinuit
                 #raise NotImplementedError, "'iminuit' minimizer not yet implemented"
+            elif minimizer_to_use.lower() == "linear":
+                _minimizer_handle = LinearSolver
             else:
                 raise ValueError("Unknown minimizer '%s'" % (minimizer_to_use,))
         else:
             # assume class reference is given
             _minimizer_handle = minimizer_to_use
 
+        _kwargs = dict()
+        if _minimizer_handle is LinearSolver:
+            if self.external_fcn is not chi2:
+                raise ValueError("The linear least-squares solution requires "
+                                 "the default chi2 FCN.")
+            _kwargs['model'] = self._linear_model
+
         self.minimizer = _minimizer_handle(self.number_of_parameters,
-                                           self.call_external_fcn,
+                                           self._call_external_fcn,
                                            self.parameter_names,
                                            self.current_parameter_values,
                                            None,
                                            # pass quiet flag to minimizer
-                                           quiet=quiet)
+                                           quiet=quiet, **_kwargs)
 
 
         # set Minuit's initial parameters and parameter errors
@@ -419,10 +486,160 @@ class Fit(object):
 
         '''
 
+        return self._call_external_fcn(np.asarray(parameter_values,
+                                                  dtype=np.float64))
+
+    def _call_external_fcn(self, parameter_values):
+        r'''
+        Array version of `call_external_fcn`. This is the function passed to
+        the minimizer, which calls it with a single `float64` array of
+        parameter values. The array is handed on to the external `FCN`
+        without copying. The default :math:`\chi^2` is evaluated here
+        directly, using the cached Cholesky factor of the covariance matrix.
+        '''
+
+        if self._profiled_parameter_ids is not None:
+            parameter_values = self._solve_linear_parameters(parameter_values)[0]
+
+        if self.external_fcn is chi2:
+            # whiten the residuals with the cached Cholesky factor of the
+            # covariance matrix instead of inverting it in every call
+            try:
+                _cholesky, _lower = self._get_cov_mat_cholesky()
+            except np.linalg.LinAlgError:
+                pass
+            else:
+                _whitened = solve_triangular(
+                    _cholesky,
+                    self.ydata - self.fit_function.evaluate(self.xdata,
+                                                            parameter_values),
+                    lower=_lower, check_finite=False)
+                _chi2 = _whitened.dot(_whitened)
+                for _constraint in self._fcn_constraints.values():
+                    _chi2 += _constraint.calculate_chi2_penalty(parameter_values)
+                return _chi2
+
         return self.external_fcn(self.xdata, self.ydata, self.current_cov_mat,
                                  self.fit_function, parameter_values,
                                  self.constrain)
 
+    def evaluate_chi2_batch(self, parameter_array, chunk_size=None):
+        r'''
+        Evaluates the `FCN` for many sets of parameter values at once, e.g.
+        for scans, grids or toy studies.
+
+        For the default :math:`\chi^2` `FCN`, the fit function is evaluated
+        for all parameter sets by broadcasting (see
+        :py:meth:`~kafe.function_tools.FitFunction.evaluate_batch`), and the
+        residuals are whitened with the Cholesky factor of the covariance
+        matrix in a single triangular solve. Constraint penalties are
+        included. Other `FCN`\ s are called for each parameter set.
+
+        Parameters
+        ----------
+
+        **parameter_array** : array of shape (`M`, number of parameters)
+            The `M` sets of parameter values.
+
+        Keyword Arguments
+        -----------------
+
+        chunk_size : int, optional
+            Number of parameter sets processed at once. By default, this is
+            chosen so that intermediate arrays stay below 32 MB.
+
+        Returns
+        -------
+
+        `numpy.ndarray`
+            Array of the `M` `FCN` values.
+        '''
+        parameter_array = np.atleast_2d(np.asarray(parameter_array,
+                                                   dtype=np.float64))
+        if parameter_array.ndim != 2 or \
+                parameter_array.shape[1] != self.number_of_parameters:
+            raise ValueError("Expected an array of shape (M, %d), got %s."
+                             % (self.number_of_parameters,
+                                parameter_array.shape))
+
+        if self.external_fcn is not chi2:
+            return np.array([self._call_external_fcn(_parameter_values)
+                             for _parameter_values in parameter_array])
+
+        if chunk_size is None:
+            chunk_size = max(1, _CHI2_BATCH_MEMORY // (8 * len(self.xdata)))
+
+        _cholesky, _lower = self._get_cov_mat_cholesky()
+        _output = np.empty(len(parameter_array))
+        for _start in range(0, len(parameter_array), chunk_size):
+            _chunk = parameter_array[_start:_start + chunk_size]
+            _residuals = self.ydata - self.fit_function.evaluate_batch(
+                self.xdata, _chunk)
+            _whitened = solve_triangular(_cholesky, _residuals.T, lower=_lower,
+                                         check_finite=False)
+            _chi2 = np.sum(_whitened ** 2, axis=0)
+            for _constraint in self._fcn_constraints.values():
+                _chi2 += _constraint.calculate_chi2_penalty_batch(_chunk)
+            _output[_start:_start + chunk_size] = _chi2
+
+        return _output
+
+    def _linear_model(self):
+        '''
+        Returns the data, the covariance matrix and the decomposition of the
+        fit function into offset and basis functions, for the
+        :py:class:`~kafe.linear_solver.LinearSolver`. Parameter constraints
+        are added as additional measurements of the parameters.
+        '''
+        _offset, _basis = self.fit_function.linear_basis(
+            self.xdata, self.current_parameter_values,
+            list(range(self.number_of_parameters)))
+        _ydata = self.ydata
+        _cov_mat = np.asarray(self.current_cov_mat)
+
+        for _constraint in self.constrain.values():
+            _values, _errors = np.asarray(_constraint.parameter_constrain,
+                                          dtype=np.float64)
+            _ids = np.flatnonzero(_errors)
+            if _constraint.cov_mat_inv is not None:
+                _constraint_cov_mat = np.asarray(_constraint.cov_mat_inv.I)
+            else:
+                _constraint_cov_mat = np.diag(np.asarray(_errors[_ids], dtype=np.float64) ** 2)
+            _n, _m = len(_ydata), len(_ids)
+            _ydata = np.concatenate((_ydata, _values[_ids]))
+            _offset = np.concatenate((_offset, np.zeros(_m)))
+            _basis = np.vstack((_basis, np.eye(self.number_of_parameters)[_ids]))
+            _cov_mat = np.block([[_cov_mat, np.zeros((_n, _m))],
+                                 [np.zeros((_m, _n)), _constraint_cov_mat]])
+
+        return _ydata, _offset, _basis, _cov_mat
+
+    def _solve_linear_parameters(self, parameter_values):
+        '''
+        Calculates the values of the profiled linear parameters which minimize
+        :math:`\chi^2` for the given values of the other parameters, by solving
+        the weighted least-squares problem. Returns a copy of
+        `parameter_values` with these values inserted and the covariance
+        matrix of the linear parameters (for fixed other parameters).
+        '''
+        _ids = self._profiled_parameter_ids
+        _offset, _basis = self.fit_function.linear_basis(self.xdata,
+                                                         parameter_values, _ids)
+
+        # the inverse covariance matrix only changes after x error projection
+        if self._profiling_cov_mat[0] is not self.current_cov_mat:
+            self._profiling_cov_mat = (self.current_cov_mat,
+                                       np.asarray(self.current_cov_mat.I))
+        _inv_cov_mat = self._profiling_cov_mat[1]
+
+        _weighted_basis = _inv_cov_mat.dot(_basis)
+        _normal_matrix = _basis.T.dot(_weighted_basis)
+        _rhs = _weighted_basis.T.dot(self.ydata - _offset)
+
+        _values = np.array(parameter_values, dtype=np.float64)
+        _values[_ids] = np.linalg.lstsq(_normal_matrix, _rhs, rcond=None)[0]
+        return _values, np.linalg.pinv(_normal_matrix)
+
     def get_function_error(self, x):
         r'''
         This method uses the parameter error matrix of the fit to calculate
@@ -500,7 +717,9 @@ class Fit(object):
     def get_error_matrix(self):
         '''
         This method returns the covariance matrix of the fit parameters which
-        is obtained by querying the minimizer object for this `Fit`
+        is obtained by querying the minimizer object for this `Fit`, or the
+        Gauss-Newton covariance matrix if it was used as the fit result (see
+        :py:meth:`~kafe.fit.Fit.set_covariance_method`).
 
         Returns
         -------
@@ -508,11 +727,19 @@ class Fit(object):
         *numpy.matrix*
             The covariance matrix of the parameters.
         '''
+        if self._gauss_newton_errors():
+            return self.gauss_newton_cov_mat
         return self.minimizer.get_error_matrix()
 
+    def _gauss_newton_errors(self):
+        '''Whether the errors of the last fit are the Gauss-Newton ones.'''
+        return (self.gauss_newton_cov_mat is not None and
+                self.par_cov_mat is self.gauss_newton_cov_mat)
+
     def get_parameter_errors(self, rounding=False):
         '''
-        Get the current parameter uncertainties from the minimizer.
+        Get the current parameter uncertainties from the minimizer, or from
+        the Gauss-Newton covariance matrix if it was used as the fit result.
 
         Keyword Arguments
         -----------------
@@ -527,8 +754,15 @@ class Fit(object):
         '''
         output = []
         names = []
+        _gauss_newton_errors = None
+        if self._gauss_newton_errors():
+            _gauss_newton_errors = dict(zip(
+                self.parameter_names,
+                np.sqrt(np.diag(self.gauss_newton_cov_mat))))
         for name, value, error in self.minimizer.get_parameter_info():
             names.append(name)
+            if _gauss_newton_errors is not None:
+                error = _gauss_newton_errors[name]
             if rounding:
                 value, error = round_to_significance(value, error)
             output.append(error)
@@ -699,6 +933,7 @@ class Fit(object):
         when :py:meth:`~kafe.fit.Fit.do_fit` is called next. Parameters can be
         given by their names or by their IDs.
         '''
+        _par_ids = []
         for parameter in parameters_to_fix:
             # turn names into IDs, if needed
             par_id = self._find_parameter(parameter)
@@ -706,8 +941,11 @@ class Fit(object):
                 raise ValueError("Cannot fix parameter. `%s` not "
                                  "a valid ID or parameter name."
                                  % parameter)
-            # found parameter, fix it
-            self.minimizer.fix_parameter(par_id)
+            _par_ids.append(par_id)
+
+        # found parameters, fix them all at once
+        self.minimizer.fix_parameters(_par_ids)
+        for par_id in _par_ids:
             self.number_of_fixed_parameters += 1
             self._fixed_parameters[par_id] = True
             logger.info("Fixed parameter %d (%s)"
@@ -722,6 +960,7 @@ class Fit(object):
         parameters.
         '''
         if parameters_to_release:
+            _par_ids = []
             for parameter in parameters_to_release:
                 # turn names into IDs, if needed
                 par_id = self._find_parameter(parameter)
@@ -729,18 +968,21 @@ class Fit(object):
                     raise ValueError("Cannot release parameter. `%s` not "
                                      "a valid ID or parameter name."
                                      % parameter )
+                _par_ids.append(par_id)
 
-                # Release found parameter
-                self.minimizer.release_parameter(par_id)
+            # Release found parameters all at once
+            self.minimizer.release_parameters(_par_ids)
+            for par_id in _par_ids:
                 self.number_of_fixed_parameters -= 1
                 self._fixed_parameters[par_id] = False
                 logger.info("Released parameter %d (%s)"
                             % (par_id, self.parameter_names[par_id]))
         else:
-            # go through all parameter IDs
-            for par_id in range(self.number_of_parameters):
-                # Release parameter
-                self.minimizer.release_parameter(par_id)
+            # release all parameter IDs
+            self.minimizer.release_parameters(
+                list(range(self.number_of_parameters)))
+            self.number_of_fixed_parameters = 0
+            self._fixed_parameters[:] = False
 
             # Inform about release
             logger.info("Released all parameters")
@@ -783,7 +1025,8 @@ class Fit(object):
                 raise ValueError("Cannot constrain parameter. `%s` not "
                                  "a valid ID or parameter name."
                                  % parameter)
-            elif [id for id in self.constrain.keys() if par_id in id]:
+            elif par_id in dummy or \
+                    [id for id in self.constrain.keys() if par_id in id]:
                 raise ValueError("Cannot constrain parameter. '%s' is already "
                                  "a constrained parameter."
                                  % parameter)
@@ -804,12 +1047,89 @@ class Fit(object):
         if cor_mat is not None:
             # Convert correlation matrix to covariance matrix for easier computing later on
             cov_mat = cor_to_cov(cor_mat, parerrs)
+            # bring the matrix into the order of the parameter ids, in which
+            # the constrained parameters are stored
+            _order = np.argsort(dummy)
+            cov_mat = cov_mat[np.ix_(_order, _order)]
 
         # Sort the tupel for better readability
         dummy.sort()
         # Create dictionary entry
         self.constrain.update({tuple(dummy): GaussianConstraint(parameter_constrain, cov_mat)})
 
+        # combine all constraints, so that the FCN evaluates them at once
+        _constrained = sorted(par_id for ids in self.constrain.keys() for par_id in ids)
+        self._fcn_constraints = {
+            tuple(_constrained): GaussianConstraint.combine(self.constrain.values())}
+
+    def set_linear_parameters(self, *linear_parameters):
+        '''
+        Declare parameters which enter the fit function linearly, like
+        normalizations, offsets or amplitudes. Parameters can be given by their
+        names or by their IDs. If no arguments are provided, no parameter is
+        treated as linear.
+
+        During :py:meth:`~kafe.fit.Fit.do_fit`, the free linear parameters are
+        eliminated analytically at each call of the `FCN` by a weighted
+        least-squares solve, so that the minimizer only works on the other
+        parameters. A final minimization with all parameters provides the full
+        parameter errors and correlations. This is only done for the default
+        :math:`\chi^2` `FCN`, and not for constrained parameters.
+        '''
+        _par_ids = []
+        for parameter in linear_parameters:
+            # turn names into IDs, if needed
+            par_id = self._find_parameter(parameter)
+            if par_id is None:
+                raise ValueError("Cannot declare parameter linear. `%s` not "
+                                 "a valid ID or parameter name."
+                                 % parameter)
+            _par_ids.append(par_id)
+
+        if _par_ids and not self.fit_function.is_linear_in(
+                self.xdata, self.current_parameter_values, _par_ids):
+            raise ValueError("Fit function `%s` is not linear in the "
+                             "parameters %s."
+                             % (self.fit_function.name,
+                                [self.parameter_names[i] for i in _par_ids]))
+
+        self._linear_parameters[:] = False
+        self._linear_parameters[_par_ids] = True
+        for par_id in _par_ids:
+            logger.info("Declared parameter %d (%s) linear"
+                        % (par_id, self.parameter_names[par_id]))
+
+    def set_covariance_method(self, method):
+        '''
+        Choose how :py:meth:`~kafe.fit.Fit.do_fit` determines the parameter
+        covariance matrix `par_cov_mat`.
+
+        Parameters
+        ----------
+
+        **method** : 'hesse', 'gauss-newton' or 'both'
+            With 'hesse', the minimizer's ``HESSE`` algorithm computes the
+            matrix of second derivatives of the `FCN` numerically, which
+            takes :math:`\mathcal{O}(P^2)` `FCN` evaluations. With
+            'gauss-newton', ``HESSE`` and ``MINOS`` are skipped and the
+            covariance matrix is computed as :math:`(J^T C^{-1} J)^{-1}` from
+            a single evaluation of the Jacobian :math:`J` of the fit function
+            with respect to the parameters. The parameter errors are taken
+            from this matrix, i.e. they are parabolic. This is only possible
+            for the default :math:`\chi^2` `FCN`. With 'both', both matrices are computed and stored in
+            `hesse_cov_mat` and `gauss_newton_cov_mat`, the one from ``HESSE``
+            is used as the result and their agreement is stored in
+            `covariance_agreement`.
+        '''
+        method = method.lower()
+        if method not in ('hesse', 'gauss-newton', 'both'):
+            raise ValueError("Unknown covariance method '%s'. Expected "
+                             "'hesse', 'gauss-newton' or 'both'." % (method,))
+        if method != 'hesse' and self.external_fcn is not chi2:
+            raise ValueError("The Gauss-Newton covariance matrix requires "
+                             "the default chi2 FCN.")
+        self.covariance_method = method
+
     def parameter_is_fixed(self, parameter):
         '''
         Check whether a parameter is fixed. Accepts a parameter's name or ID
@@ -847,6 +1167,152 @@ class Fit(object):
 
         return found_id
 
+    def _start_linear_profiling(self):
+        '''
+        Eliminates the free, unconstrained linear parameters from the
+        minimization by fixing them in the minimizer and solving for them in
+        each call of the `FCN`. Returns ``True`` if any parameter is profiled.
+        '''
+        if isinstance(self.minimizer, LinearSolver):
+            # the whole problem is already solved in closed form
+            return False
+        _constrained = [par_id for ids in self.constrain.keys() for par_id in ids]
+        _ids = [par_id for par_id in np.flatnonzero(self._linear_parameters)
+                if not self._fixed_parameters[par_id] and par_id not in _constrained]
+        if not _ids:
+            return False
+        if self.external_fcn is not chi2:
+            logger.warning("Linear parameters can only be profiled for "
+                           "the default chi2 FCN.")
+            return False
+        if len(_ids) == self.number_of_parameters - self.number_of_fixed_parameters:
+            # keep one parameter for the minimizer
+            _ids = _ids[1:]
+
+        logger.debug("Profiling linear parameters %s" % (_ids,))
+        self._profiled_parameter_ids = np.array(_ids, dtype=np.intp)
+        self.minimizer.fix_parameters(_ids)
+        return True
+
+    def _stop_linear_profiling(self):
+        '''
+        Inserts the solution for the profiled linear parameters into the
+        minimizer and releases them again. The parameters are released even
+        if the solution fails.
+        '''
+        _ids = self._profiled_parameter_ids
+        try:
+            _values, _cov_mat = self._solve_linear_parameters(
+                self.current_parameter_values)
+        finally:
+            self.minimizer.release_parameters(list(_ids))
+            self._profiled_parameter_ids = None
+        _errors = np.array(self.current_parameter_errors, dtype=np.float64)
+        _errors[_ids] = np.sqrt(np.abs(np.diag(_cov_mat)))
+
+        self.current_parameter_values = list(_values)
+        self.current_parameter_errors = list(_errors)
+        self.minimizer.set_parameter_values(self.current_parameter_values)
+        self.minimizer.set_parameter_errors(self.current_parameter_errors)
+
+    def _get_cov_mat_cholesky(self):
+        '''
+        Returns the Cholesky factor of the current covariance matrix. It is
+        cached, since the matrix only changes after `x` error projection.
+        '''
+        if self._cov_mat_cholesky[0] is not self.current_cov_mat:
+            if self.current_cov_mat is self.dataset.get_cov_mat('y'):
+                # the dataset extends its factor when points are appended
+                _factor = (self.dataset.get_cov_mat_cholesky('y'), True)
+            else:
+                _factor = cho_factor(np.asarray(self.current_cov_mat),
+                                     lower=True)
+            self._cov_mat_cholesky = (self.current_cov_mat, _factor)
+        return self._cov_mat_cholesky[1]
+
+    def _calculate_parameter_jacobian(self, parameter_values, parameter_ids):
+        '''
+        Calculates the derivatives of the fit function at the `x` data with
+        respect to the parameters with ids in `parameter_ids` by central
+        differences. The step sizes are a small fraction of the current
+        parameter errors.
+        '''
+        _values = np.array(parameter_values, dtype=np.float64)
+        _errors = np.abs(np.asarray(self.current_parameter_errors,
+                                    dtype=np.float64))
+        _jacobian = np.empty((len(self.xdata), len(parameter_ids)))
+        for k, par_id in enumerate(parameter_ids):
+            _step = 1e-3 * _errors[par_id]
+            if not _step:
+                _step = 1e-6 * (1. + abs(_values[par_id]))
+            _value = _values[par_id]
+            _values[par_id] = _value + _step
+            _f_up = self.fit_function.evaluate(self.xdata, _values)
+            _values[par_id] = _value - _step
+            _f_down = self.fit_function.evaluate(self.xdata, _values)
+            _values[par_id] = _value
+            _jacobian[:, k] = (_f_up - _f_down) / (2. * _step)
+        return _jacobian
+
+    def _calculate_gauss_newton_cov_mat(self):
+        '''
+        Calculates the Gauss-Newton approximation
+        :math:`(J^T C^{-1} J + C_c^{-1})^{-1}` of the covariance matrix of
+        the free parameters at the current parameter values, where
+        :math:`C_c` is the covariance matrix of the parameter constraints.
+        Rows and columns of fixed parameters are zero.
+        '''
+        _free = np.flatnonzero(~self._fixed_parameters)
+        _jacobian = self._calculate_parameter_jacobian(
+            self.current_parameter_values, _free)
+        _normal_matrix = np.zeros((self.number_of_parameters,
+                                   self.number_of_parameters))
+        _normal_matrix[np.ix_(_free, _free)] = _jacobian.T.dot(
+            cho_solve(self._get_cov_mat_cholesky(), _jacobian))
+
+        for _constraint in self._fcn_constraints.values():
+            _ids = _constraint.parameter_ids
+            _normal_matrix[np.ix_(_ids, _ids)] += _constraint.whitening_matrix.T.dot(
+                _constraint.whitening_matrix)
+
+        _cov_mat = np.zeros_like(_normal_matrix)
+        _cov_mat[np.ix_(_free, _free)] = np.linalg.inv(
+            _normal_matrix[np.ix_(_free, _free)])
+        # scale to the FCN value defining the errors
+        return np.asmatrix(_cov_mat * self.minimizer.get_fit_info('err_def'))
+
+    def _compare_covariance_matrices(self, hesse_cov_mat, gauss_newton_cov_mat,
+                                     tolerance=0.05):
+        '''
+        Compares the parameter errors and correlations obtained from ``HESSE``
+        and from the Gauss-Newton approximation and returns a dictionary
+        holding the largest relative difference of the errors
+        (`max_error_deviation`), the largest absolute difference of the
+        correlation coefficients (`max_correlation_deviation`) and whether
+        both are below `tolerance` (`agree`).
+        '''
+        _free = np.flatnonzero(~self._fixed_parameters)
+        _hesse = np.asarray(hesse_cov_mat)[np.ix_(_free, _free)]
+        _gauss_newton = np.asarray(gauss_newton_cov_mat)[np.ix_(_free, _free)]
+
+        _hesse_errors = np.sqrt(np.abs(np.diag(_hesse)))
+        _gauss_newton_errors = np.sqrt(np.abs(np.diag(_gauss_newton)))
+        _error_deviation = np.max(np.abs(_gauss_newton_errors / _hesse_errors - 1.))
+        _correlation_deviation = np.max(np.abs(
+            _hesse / np.outer(_hesse_errors, _hesse_errors) -
+            _gauss_newton / np.outer(_gauss_newton_errors, _gauss_newton_errors)))
+
+        _agree = _error_deviation < tolerance and _correlation_deviation < tolerance
+        if not _agree:
+            logger.warning("Covariance matrices from HESSE and Gauss-Newton "
+                           "approximation differ (errors by up to %.1f%%, "
+                           "correlations by up to %.3f)."
+                           % (100. * _error_deviation, _correlation_deviation))
+
+        return dict(max_error_deviation=_error_deviation,
+                    max_correlation_deviation=_correlation_deviation,
+                    agree=_agree)
+
     def get_results(self):
         '''
         Return results from Fit
@@ -896,7 +1362,8 @@ class Fit(object):
             print("# Dataset #", file=self.out_stream,)
             print("###########", file=self.out_stream,)
             print('', file=self.out_stream,)
-            print(self.dataset.get_formatted(), file=self.out_stream,)
+            self.dataset.write_formatted(self.out_stream)
+            print('', file=self.out_stream,)
 
             print("################", file=self.out_stream,)
             print("# Fit function #", file=self.out_stream,)
@@ -923,58 +1390,68 @@ class Fit(object):
                         print(format(cov_to_cor(i.cov_mat_inv.I)), file=self.out_stream,)
                 print("", file=self.out_stream)
 
-        max_x_iterations = 10
-
-        logger.debug("Calling Minuit")
-        if self.dataset.has_errors('x'):
-            self.call_minimizer(final_fit=False, verbose=verbose, quiet=quiet)
-        else:
-            self.call_minimizer(final_fit=True, verbose=verbose, quiet=quiet)
+        # eliminate linear parameters from the minimization
+        _profiling = self._start_linear_profiling()
 
-        # if the dataset has x errors, project onto the current error matrix
-        if self.dataset.has_errors('x'):
-            logger.debug("Dataset has `x` errors. Iterating for `x` error.")
-            iter_nr = 0
-            while iter_nr < max_x_iterations:
-                old_matrix = copy(self.current_cov_mat)
-                self.project_x_covariance_matrix()
-
-                logger.debug("`x` fit iteration %d" % (iter_nr,))
-                if iter_nr==0:
-                    self.call_minimizer(final_fit=False, verbose=verbose, quiet=quiet)
-                else:
-                    self.call_minimizer(final_fit=True, verbose=verbose, quiet=quiet)
-                new_matrix = self.current_cov_mat
+        # skip HESSE if only the Gauss-Newton covariance matrix is needed
+        _hesse = self.covariance_method != 'gauss-newton'
 
-                # stop if the matrix has not changed within tolerance)
-                # GQ: adjusted precision: rtol 1e-4 on cov-matrix is
-                # clearly sufficient
-                if np.allclose(old_matrix, new_matrix, atol=0, rtol=1e-4):
-                    logger.debug("Matrix for `x` fit iteration has converged.")
-                    break   # interrupt iteration
-                iter_nr += 1
+        try:
+            self._minimize_iterating_x_errors(_hesse and not _profiling,
+                                              verbose=verbose, quiet=quiet)
+        finally:
+            # release the profiled parameters, also if the fit failed
+            if _profiling:
+                self._stop_linear_profiling()
+
+        # minimize with all parameters, starting at the minimum, to get
+        # the full parameter errors and correlations
+        if _profiling:
+            self.call_minimizer(final_fit=_hesse, verbose=verbose, quiet=quiet)
+
+        # determine the parameter covariance matrix
+        self.hesse_cov_mat = None
+        self.gauss_newton_cov_mat = None
+        self.covariance_agreement = None
+        if _hesse:
+            self.hesse_cov_mat = self.get_error_matrix()
+        if self.covariance_method != 'hesse':
+            self.gauss_newton_cov_mat = self._calculate_gauss_newton_cov_mat()
+        if self.covariance_method == 'both':
+            self.covariance_agreement = self._compare_covariance_matrices(
+                self.hesse_cov_mat, self.gauss_newton_cov_mat)
 
         # determine, retrieve and analyze errors from MINOS algorithm
-        tol = 0.05
-        if(quiet):
-          log_level=-1
+        # (skipped if the errors are taken from the Gauss-Newton matrix)
+        if _hesse:
+            tol = 0.05
+            if(quiet):
+              log_level=-1
+            else:
+              log_level=1
+            self.minos_errors = self.minimizer.minos_errors(log_level)
+            # error analysis:
+            for par_nr, par_val in enumerate(self.current_parameter_values):
+                ep = self.minos_errors[par_nr][0]
+                em = self.minos_errors[par_nr][1]
+                if ep != 0 and em != 0:
+                  if (abs(ep + em)/(ep - em) > tol) or \
+                     (abs(1. - 0.5*(ep - em)/self.minos_errors[par_nr][2])>tol):
+                      self.parabolic_errors=False
         else:
-          log_level=1
-        self.minos_errors = self.minimizer.minos_errors(log_level)
-        # error analysis:
-        for par_nr, par_val in enumerate(self.current_parameter_values):
-            ep = self.minos_errors[par_nr][0]
-            em = self.minos_errors[par_nr][1]
-            if ep != 0 and em != 0:
-              if (abs(ep + em)/(ep - em) > tol) or \
-                 (abs(1. - 0.5*(ep - em)/self.minos_errors[par_nr][2])>tol):
-                  self.parabolic_errors=False
+            self.minos_errors = None
+            self.parabolic_errors = True
 
         # store results ...
         self.final_fcn = self.minimizer.get_fit_info('fcn')
         self.final_parameter_values = self.current_parameter_values
+        if _hesse:
+            self.par_cov_mat = self.hesse_cov_mat
+        else:
+            self.par_cov_mat = self.gauss_newton_cov_mat
+            self.current_parameter_errors = list(
+                np.sqrt(np.diag(self.par_cov_mat)))
         self.final_parameter_errors = self.current_parameter_errors
-        self.par_cov_mat = self.get_error_matrix()
         # ... and print at end of fit
         if not quiet:
             self.print_fit_results()
@@ -984,6 +1461,72 @@ class Fit(object):
         self.out_stream.flush()  # write to output files
 
 
+    def refit(self, quiet=True, verbose=False):
+        '''
+        Repeats the fit after data points have been appended to the
+        :py:obj:`Dataset` (see :py:meth:`~kafe.dataset.Dataset.append_data`),
+        e.g. to follow measurements as they arrive:
+
+        >>> my_fit.do_fit()
+        >>> my_dataset.append_data(x_new, y_new)
+        >>> my_fit.refit()
+
+        The minimizer starts at the result of the previous fit, and the
+        Cholesky factor of the `y` covariance matrix is extended by the rows
+        for the new data points instead of being recomputed. To keep refits
+        fast, the parameter covariance matrix is always calculated using the
+        Gauss-Newton approximation (see
+        :py:meth:`~kafe.fit.Fit.set_covariance_method`), and ``MINOS`` is not
+        run.
+
+        Keyword Arguments
+        -----------------
+
+        quiet : boolean, optional
+            Set to ``False`` to print the fit results. Defaults to ``True``.
+
+        verbose : boolean, optional
+            Set to ``True`` if more output should be printed.
+        '''
+
+        # take over the data and the covariance matrix from the dataset
+        self.xdata = self.dataset.get_data('x')
+        self.ydata = self.dataset.get_data('y')
+        if self.dataset.has_errors('y'):
+            self.current_cov_mat = self.dataset.get_cov_mat(
+                'y',
+                fallback_on_singular='report'
+            )
+        else:
+            self.current_cov_mat = np.asmatrix(np.eye(self.dataset.get_size()))
+
+        _profiling = self._start_linear_profiling()
+        try:
+            self._minimize_iterating_x_errors(False, verbose=verbose, quiet=quiet)
+        finally:
+            if _profiling:
+                self._stop_linear_profiling()
+        if _profiling:
+            self.call_minimizer(final_fit=False, verbose=verbose, quiet=quiet)
+
+        # store results
+        self.hesse_cov_mat = None
+        self.covariance_agreement = None
+        self.minos_errors = None
+        self.parabolic_errors = True
+        self.gauss_newton_cov_mat = self._calculate_gauss_newton_cov_mat()
+        self.par_cov_mat = self.gauss_newton_cov_mat
+        self.current_parameter_errors = list(np.sqrt(np.diag(self.par_cov_mat)))
+        self.final_fcn = self.minimizer.get_fit_info('fcn')
+        self.final_parameter_values = self.current_parameter_values
+        self.final_parameter_errors = self.current_parameter_errors
+
+        if not quiet:
+            self.print_fit_results()
+            self.print_rounded_fit_parameters()
+            self.print_fit_details()
+            self.out_stream.flush()
+
     def print_raw_results(self):
         '''
         unformatted print-out of all fit results
@@ -1018,6 +1561,49 @@ class Fit(object):
         logger.debug("Retrieving data from minimizer")
         self.current_parameter_values = self.minimizer.get_parameter_values()
         self.current_parameter_errors = self.minimizer.get_parameter_errors()
+        if self._profiled_parameter_ids is not None:
+            # the minimizer does not know the values of the profiled parameters
+            self.current_parameter_values = list(
+                self._solve_linear_parameters(self.current_parameter_values)[0])
+
+    def _minimize_iterating_x_errors(self, final_fit, verbose=False,
+                                     quiet=False):
+        '''
+        Minimizes the `FCN`. If the dataset has `x` errors, their projection
+        onto the covariance matrix and the minimization are repeated until the
+        matrix converges. Only the last minimization is a final fit (with
+        ``HESSE``), if `final_fit` is ``True``.
+        '''
+        max_x_iterations = 10
+
+        logger.debug("Calling Minuit")
+        if self.dataset.has_errors('x'):
+            self.call_minimizer(final_fit=False, verbose=verbose, quiet=quiet)
+        else:
+            self.call_minimizer(final_fit=final_fit, verbose=verbose, quiet=quiet)
+            return
+
+        # the dataset has x errors: project onto the current error matrix
+        logger.debug("Dataset has `x` errors. Iterating for `x` error.")
+        iter_nr = 0
+        while iter_nr < max_x_iterations:
+            old_matrix = copy(self.current_cov_mat)
+            self.project_x_covariance_matrix()
+
+            logger.debug("`x` fit iteration %d" % (iter_nr,))
+            if iter_nr==0:
+                self.call_minimizer(final_fit=False, verbose=verbose, quiet=quiet)
+            else:
+                self.call_minimizer(final_fit=final_fit, verbose=verbose, quiet=quiet)
+            new_matrix = self.current_cov_mat
+
+            # stop if the matrix has not changed within tolerance)
+            # GQ: adjusted precision: rtol 1e-4 on cov-matrix is
+            # clearly sufficient
+            if np.allclose(old_matrix, new_matrix, atol=0, rtol=1e-4):
+                logger.debug("Matrix for `x` fit iteration has converged.")
+                break   # interrupt iteration
+            iter_nr += 1
 
     def project_x_covariance_matrix(self):
         r'''
@@ -1170,7 +1756,7 @@ class Fit(object):
 
     def plot_contour(self, parameter1, parameter2, dchi2=2.3,
                      n_points=100, color='gray', alpha=.1, show=False,
-                     axes=None):
+                     axes=None, method='minimizer'):
         r'''
         Plots one or more two-dimensional contours for this fit into
         a separate figure and returns the figure object.
@@ -1214,6 +1800,13 @@ class Fit(object):
         axes : `maplotlib.pyplot.axes`
             Sub-plot axes to add plot to
 
+        method : 'minimizer' or 'grid', optional
+            With 'minimizer' (default), each contour is determined by the
+            contour algorithm of the minimizer. With 'grid', all contours
+            are extracted from the profiled :math:`\chi^2` on a parameter
+            grid, which is computed in parallel (see
+            :py:func:`~kafe.scan_tools.profile_contours`).
+
         Returns
         -------
 
@@ -1221,6 +1814,10 @@ class Fit(object):
             A figure object containing the contour plot.
         '''
 
+        if method not in ('minimizer', 'grid'):
+            raise ValueError("Unknown contour method '%s'. Expected "
+                             "'minimizer' or 'grid'." % (method,))
+
         # lookup parameter IDs
         par1 = self._find_parameter(parameter1)
         par2 = self._find_parameter(parameter2)
@@ -1264,11 +1861,19 @@ class Fit(object):
             dc2list.append(dchi2)  # not iterable, append float
         else:
             dc2list.extend(dchi2)  # iterable, extend by list
+        if method == 'grid':
+            # compute all contours from the same grid
+            from .scan_tools import profile_contours
+            grid_contours = profile_contours(self, par1, par2, dc2list,
+                                             n_points)
         ncont = 0
         for dc2 in dc2list:
-            ncont += ncont  # count contours in list
-            self.minimizer.set_err(dc2)
-            xs, ys = self.minimizer.get_contour(par1, par2, n_points)
+            if method == 'grid':
+                xs, ys = grid_contours[ncont]
+            else:
+                self.minimizer.set_err(dc2)
+                xs, ys = self.minimizer.get_contour(par1, par2, n_points)
+            ncont += 1  # count contours in list
             # store result
             self.contours.append([par1, par2, dc2, xs, ys])
             # plot contour lines
@@ -1290,7 +1895,8 @@ class Fit(object):
             return tmp_fig
 
     def plot_profile(self, parid, n_points=21,
-                     color='blue', alpha=.5, show=False, axes=None):
+                     color='blue', alpha=.5, show=False, axes=None,
+                     processes=1):
         r'''
         Plots a profile :math:`\\chi^2` for this fit into
         a separate figure and returns the figure object.
@@ -1305,7 +1911,9 @@ class Fit(object):
         -----------------
 
         n_points : int, optional
-           Number of plot points to use for the profile curve.
+           Approximate number of points to calculate for the profile
+           curve. Additional points are placed where :math:`\Delta\chi^2`
+           crosses 1 and 4 (see :py:func:`~kafe.scan_tools.profile_scan`).
 
         color : string, optional
            A ``matplotlib`` color identifier specifying the line
@@ -1321,6 +1929,12 @@ class Fit(object):
 
         axes : sub-plot axes to put plot
 
+        processes : int, optional
+           Number of worker processes for the profile scan of the default
+           :math:`\chi^2` `FCN`. Defaults to 1, i.e. no processes are
+           forked. For other `FCN`\ s, the profile is calculated by the
+           minimizer.
+
         Returns
         -------
 
@@ -1329,6 +1943,7 @@ class Fit(object):
         '''
 
         from scipy import interpolate
+        from .scan_tools import profile_scan
 
         # lookup parameter ID
         id = self._find_parameter(parid)
@@ -1368,12 +1983,15 @@ class Fit(object):
         tmp_ax.errorbar(val, 1., xerr=err, linewidth=3, fmt='o', color='black')
         # tmp_ax.scatter(xval, yval, marker='+', label='parameter values')
         # get profile
-        xp, yp = self.minimizer.get_profile(id, n_points)
+        if self.external_fcn is chi2:
+            xp, yp = profile_scan(self, id, n_points, processes=processes)
+        else:
+            xp, yp = self.minimizer.get_profile(id, n_points)
         self.profiles.append([id, xp, yp])  # store this result
         # plot (smoothed) profile
         yp = yp - np.min(yp)  # refer to minimum
         yspline = interpolate.UnivariateSpline(xp, yp, s=0)
-        xnew = np.linspace(xp[0], xp[n_points - 1], 200)
+        xnew = np.linspace(xp[0], xp[-1], 200)
         tmp_ax.plot(xnew, yspline(xnew), '-', linewidth=2, color=color,
                     label='profile $\\chi^2$')
         # plot parabolic expectation
@@ -1473,6 +2091,98 @@ class GaussianConstraint(object):
             self.cov_mat_inv = cov_mat.I
         else:
             self.cov_mat_inv = None
+        #: constant added to the penalty (for merged constraints)
+        self.penalty_offset = 0.
+        self._compile()
+
+    def _compile(self):
+        r'''
+        Precomputes the ids and expected values of the constrained parameters
+        and the whitening matrix :math:`W` with :math:`W^T W = C^{-1}`,
+        obtained from the Cholesky decomposition of the inverse covariance
+        matrix. The penalty is then :math:`|W (\vec{p} - \vec{c})|^2`.
+        '''
+        if self.parameter_constrain is None:
+            #: ids of the constrained parameters
+            self.parameter_ids = np.zeros(0, dtype=np.intp)
+            #: expected values of the constrained parameters
+            self.centers = np.zeros(0)
+            #: whitening matrix of the constraint
+            self.whitening_matrix = np.zeros((0, 0))
+            return
+
+        _errors = np.asarray(self.parameter_constrain[1], dtype=np.float64)
+        self.parameter_ids = np.flatnonzero(_errors)
+        self.centers = np.asarray(self.parameter_constrain[0],
+                                  dtype=np.float64)[self.parameter_ids]
+        if self.cov_mat_inv is not None:
+            # C^-1 = L L^T  =>  W = L^T
+            self.whitening_matrix = np.linalg.cholesky(
+                np.asarray(self.cov_mat_inv, dtype=np.float64)).T
+        else:
+            self.whitening_matrix = np.diag(1. / _errors[self.parameter_ids])
+
+    @classmethod
+    def combine(cls, constraints):
+        r'''
+        Combines constraints into a single constraint, so that the total
+        penalty is calculated at once. Constraints on the same parameters are
+        merged by adding their information matrices :math:`W_k^T W_k`: the
+        combined center is the information-weighted mean of the centers, and
+        the constant remaining penalty at the combined center is stored in
+        `penalty_offset`, so that the total penalty is unchanged.
+
+        Parameters
+        ----------
+
+        constraints: iterable of `GaussianConstraint` objects
+            The constraints to combine.
+
+        Returns
+        -------
+
+        `GaussianConstraint`
+            The combined constraint.
+        '''
+        constraints = [_constraint for _constraint in constraints
+                       if _constraint.parameter_constrain is not None]
+        if not constraints:
+            return cls(None)
+
+        _ids = np.unique(np.concatenate([_constraint.parameter_ids
+                                         for _constraint in constraints]))
+        _information = np.zeros((len(_ids), len(_ids)))
+        _weighted_centers = np.zeros(len(_ids))
+        _penalty_offset = 0.
+        for _constraint in constraints:
+            _positions = np.searchsorted(_ids, _constraint.parameter_ids)
+            _constraint_information = _constraint.whitening_matrix.T.dot(
+                _constraint.whitening_matrix)
+            _weighted = _constraint_information.dot(_constraint.centers)
+            # the ids of a single constraint are unique
+            _information[np.ix_(_positions, _positions)] += _constraint_information
+            _weighted_centers[_positions] += _weighted
+            _penalty_offset += _constraint.centers.dot(_weighted)
+
+        _centers = np.linalg.solve(_information, _weighted_centers)
+        _overlapping = len(_ids) < sum(len(_constraint.parameter_ids)
+                                       for _constraint in constraints)
+
+        _size = len(constraints[0].parameter_constrain[0])
+        _values, _errors = np.zeros(_size), np.zeros(_size)
+        _values[_ids] = _centers
+        _errors[_ids] = np.sqrt(np.diag(np.linalg.inv(_information)))
+        _combined = cls([_values, _errors])
+        _combined.parameter_ids = _ids
+        _combined.centers = _centers
+        _combined.whitening_matrix = np.linalg.cholesky(_information).T
+        if _overlapping:
+            _combined.penalty_offset = max(
+                _penalty_offset - _centers.dot(_weighted_centers), 0.)
+        if _overlapping or any(_constraint.cov_mat_inv is not None
+                               for _constraint in constraints):
+            _combined.cov_mat_inv = np.asmatrix(_information)
+        return _combined
 
     def calculate_chi2_penalty(self, parameter_values):
         '''
@@ -1487,22 +2197,31 @@ class GaussianConstraint(object):
             The values of the parameters at which :math:`f(x)` should be evaluated.
 
         '''
-        _vector = []
-        dchi2 = 0
-        if self.parameter_constrain is not None:
-            if self.cov_mat_inv is not None:
-                for i, err in enumerate(self.parameter_constrain[1]):
-                    if err:  # there is a constraint, add to chi2
-                        _vector.append(parameter_values[i] - self.parameter_constrain[0][i])
-                _vector = np.asarray(_vector)
-                dchi2 = (_vector.T.dot(self.cov_mat_inv).dot(_vector))[0, 0]
+        _whitened = self.whitening_matrix.dot(
+            np.asarray(parameter_values, dtype=np.float64)[self.parameter_ids]
+            - self.centers)
+        return _whitened.dot(_whitened) + self.penalty_offset
 
-            else:
-                for i, err in enumerate(self.parameter_constrain[1]):
-                    if err:  # there is a constraint, add to chi2
-                        dchi2 += ((parameter_values[i] - self.parameter_constrain[0][i]) / err) ** 2
+    def calculate_chi2_penalty_batch(self, parameter_array):
+        '''
+        Calculates the :math:`\chi^2` penalties for several sets of parameter
+        values at once.
+
+        Parameters
+        ----------
 
-        return dchi2
+        parameter_array: array of shape (`M`, number of parameters)
+            The `M` sets of parameter values.
+
+        Returns
+        -------
+
+        `numpy.ndarray`
+            Array of the `M` penalties.
+        '''
+        _whitened = (np.asarray(parameter_array, dtype=np.float64)[:, self.parameter_ids]
+                     - self.centers).dot(self.whitening_matrix.T)
+        return np.sum(_whitened ** 2, axis=1) + self.penalty_offset
 
 
 
@@ -9,7 +9,7 @@ Collection of model functions
 '''
 
 
-from .function_tools import FitFunction, LaTeX, ASCII
+from .function_tools import FitFunction, LaTeX, ASCII, Linear
 from numpy import exp, sqrt, pi
 from scipy.special import gamma, wofz
 
@@ -17,6 +17,7 @@ from scipy.special import gamma, wofz
 # Change-log:
 # GQ: 20-Aug-14: added relativistic Breit-Wigner, Lorentz, Voigt and
 #                and nomalized Gauss
+#     18-Oct-26: polynomial models declared linear in their parameters
 #######################################################################
 
 
@@ -30,6 +31,7 @@ from scipy.special import gamma, wofz
 
 @ASCII(expression='constant')
 @LaTeX(name='f', parameter_names=('c',), expression='c')
+@Linear()
 @FitFunction
 def constant_1par(x, constant=1.0):
     return constant
@@ -39,6 +41,7 @@ def constant_1par(x, constant=1.0):
 '''
 @ASCII(expression='slope * x')
 @LaTeX(name='f', parameter_names=('m',), expression='m\,x')
+@Linear()
 @FitFunction
 def linear_1par(x, slope=1.0):
     return slope * x
@@ -46,6 +49,7 @@ def linear_1par(x, slope=1.0):
 
 @ASCII(expression='slope * x + y_intercept')
 @LaTeX(name='f', parameter_names=('m', 'n'), expression='m\\,x+n')
+@Linear()
 @FitFunction
 def linear_2par(x, slope=1.0, y_intercept=0.0):
     return slope * x + y_intercept
@@ -63,6 +67,7 @@ def linear_2par2(x, slope=1.0, x_offset=0.0):
 '''
 @ASCII(expression='quad_coeff * x^2')
 @LaTeX(name='f', parameter_names=('a',), expression='a\\,x^2')
+@Linear()
 @FitFunction
 def quadratic_1par(x, quad_coeff=1.0):
     return quad_coeff * x**2
@@ -70,6 +75,7 @@ def quadratic_1par(x, quad_coeff=1.0):
 
 @ASCII(expression='quad_coeff * x^2 + constant')
 @LaTeX(name='f', parameter_names=('a', 'c'), expression='a\\,x^2+c')
+@Linear()
 @FitFunction
 def quadratic_2par(x, quad_coeff=1.0, constant=0.0):
     return quad_coeff * x**2 + constant
@@ -84,6 +90,7 @@ def quadratic_2par2(x, quad_coeff=1.0, x_offset=0.0):
 
 @ASCII(expression='quad_coeff * x^2 + lin_coeff * x + constant')
 @LaTeX(name='f', parameter_names=('a', 'b', 'c'), expression='a\\,x^2+b\\,x+c')
+@Linear()
 @FitFunction
 def quadratic_3par(x, quad_coeff=1.0, lin_coeff=0.0, constant=0.0):
     return quad_coeff * x**2 + lin_coeff * x + constant
@@ -103,6 +110,7 @@ def quadratic_3par2(x, quad_coeff=1.0, x_offset=0.0, constant=0.0):
 @ASCII(expression='coeff3 * x^3 + coeff2 * x^2 + coeff1 * x + coeff0')
 @LaTeX(name='f', parameter_names=('a', 'b', 'c', 'd'),
        expression='a\\,x^3+b\\,x^2+c\\,x+d')
+@Linear()
 @FitFunction
 def poly3(x, coeff3=1.0, coeff2=0.0, coeff1=0.0, coeff0=0.0):
     return coeff3 * x**3 + coeff2 * x**2 + coeff1 * x + coeff0
@@ -112,6 +120,7 @@ def poly3(x, coeff3=1.0, coeff2=0.0, coeff1=0.0, coeff0=0.0):
                   'coeff1 * x + coeff0')
 @LaTeX(name='f', parameter_names=('a', 'b', 'c', 'd', 'e'),
        expression='a\\,x^4+b\\,x^3+c\\,x^2+d\\,x+e')
+@Linear()
 @FitFunction
 def poly4(x, coeff4=1.0, coeff3=0.0, coeff2=0.0, coeff1=0.0, coeff0=0.0):
     return coeff4 * x**4 + coeff3 * x**3 + coeff2 * x**2 + coeff1 * x + coeff0
@@ -121,6 +130,7 @@ def poly4(x, coeff4=1.0, coeff3=0.0, coeff2=0.0, coeff1=0.0, coeff0=0.0):
                   'coeff2 * x^2 + coeff1 * x + coeff0')
 @LaTeX(name='f', parameter_names=('a', 'b', 'c', 'd', 'e', 'f'),
        expression='a\\,x^5+b\\,x^4+c\\,x^3+d\\,x^2+e\\,x+f')
+@Linear()
 @FitFunction
 def poly5(x, coeff5=1.0, coeff4=0.0, coeff3=0.0,
           coeff2=0.0, coeff1=0.0, coeff0=0.0):
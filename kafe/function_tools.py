@@ -18,6 +18,9 @@
 # GQ 140815  removed `getsourcelines`, as this was not compatible
 #              with module import from a string
 # GQ 140817 addes method `evaluate` to FitFunction
+# 18-Oct-26 added `linear_basis` and `is_linear_in` to FitFunction
+#           added decorator `Linear` to declare linear parameters
+#           added method `evaluate_batch` to FitFunction
 
 import numpy as np
 
@@ -161,6 +164,14 @@ class FitFunction:
         #: a :math:`LaTeX` math expression, the function's result
         self.latex_expression = None
 
+        #: The ids of the parameters the function is declared linear in
+        self.linear_parameters = ()
+
+    @property
+    def is_linear(self):
+        '''``True`` if the function is declared linear in all parameters.'''
+        return len(self.linear_parameters) == self.number_of_parameters
+
     def __call__(self, *args, **kwargs):
         return self.f(*args, **kwargs)
 
@@ -188,6 +199,107 @@ class FitFunction:
             # use python map to calculate function values at each x
             return np.asarray(list(map(tempf, x_0) ))
 
+    def evaluate_batch(self, x_0, parameter_array):
+        r'''
+        Evaluate the fit function at an array of x-values for several sets
+        of parameter values at once. The function is called once with the
+        x-values and parameters broadcast against each other. If it cannot
+        handle arrays (e.g. because it uses ``math`` functions or ``if``
+        statements on `x`), it is evaluated for each parameter set
+        separately.
+
+          **x_0** array of floats of length `N`
+
+          **parameter_array** array of parameter values of shape (`M`,
+          number of parameters)
+
+          **returns** array of function values of shape (`M`, `N`)
+        '''
+        x_0 = np.asarray(x_0, dtype=np.float64)
+        parameter_array = np.asarray(parameter_array, dtype=np.float64)
+        _shape = (len(parameter_array), len(x_0))
+
+        try:
+            _values = self.f(x_0[np.newaxis, :],
+                             *(parameter_array[:, np.newaxis, k]
+                               for k in range(self.number_of_parameters)))
+            return np.array(np.broadcast_to(_values, _shape), dtype=np.float64)
+        except Exception:
+            # function does not support broadcasting: evaluate row by row
+            _output = np.empty(_shape)
+            for i, parameter_list in enumerate(parameter_array):
+                _output[i] = self.evaluate(x_0, parameter_list)
+            return _output
+
+
+    def linear_basis(self, x_0, parameter_list, parameter_ids):
+        r'''
+        Splits the fit function into a part not depending on the parameters
+        with the ids in `parameter_ids` and one basis function for each of
+        these parameters, evaluated at the x-values in `x_0`:
+
+        .. math::
+
+            f(x) = f_0(x) + \sum_k p_k b_k(x)
+
+        This decomposition is only valid if the function is linear in these
+        parameters.
+
+          **x_0** array of floats
+
+          **parameter_list** values of function parameters (the values of
+          the parameters in `parameter_ids` are ignored)
+
+          **parameter_ids** ids of the parameters entering linearly
+
+          **returns** tuple of the array :math:`f_0(x)` and the array of
+          shape (len(`x_0`), len(`parameter_ids`)) holding the :math:`b_k(x)`
+        '''
+        _values = np.array(parameter_list, dtype=np.float64)
+        _values[list(parameter_ids)] = 0.
+
+        def _evaluate(values):
+            return np.fromiter((self.f(x, *values) for x in x_0),
+                               dtype=np.float64, count=len(x_0))
+
+        _offset = _evaluate(_values)
+        _basis = np.empty((len(x_0), len(parameter_ids)))
+        for k, _id in enumerate(parameter_ids):
+            _values[_id] = 1.
+            _basis[:, k] = _evaluate(_values) - _offset
+            _values[_id] = 0.
+
+        return _offset, _basis
+
+    def is_linear_in(self, x_0, parameter_list, parameter_ids, rtol=1e-6):
+        r'''
+        Checks numerically whether the fit function is linear in the
+        parameters with the ids in `parameter_ids` by comparing the function
+        values at the x-values in `x_0` to the ones obtained from
+        :py:meth:`linear_basis`, at `parameter_list` and at shifted values.
+
+          **x_0** array of floats
+
+          **parameter_list** values of function parameters
+
+          **parameter_ids** ids of the parameters to check
+
+          **returns** boolean
+        '''
+        parameter_ids = list(parameter_ids)
+        _offset, _basis = self.linear_basis(x_0, parameter_list, parameter_ids)
+        _values = np.array(parameter_list, dtype=np.float64)
+        _linear_values = _values[parameter_ids]
+        _shift = (1. + np.abs(_linear_values)) * \
+            np.linspace(1., 2., len(parameter_ids))
+        for _test_values in (_linear_values, _linear_values + _shift):
+            _values[parameter_ids] = _test_values
+            _f = self.evaluate(x_0, _values)
+            _f_linear = _offset + _basis.dot(_test_values)
+            if not np.allclose(_f, _f_linear, rtol=rtol,
+                               atol=rtol * max(np.max(np.abs(_f)), 1.)):
+                return False
+        return True
 
     def derive_by_x(self, x_0, precision_list, parameter_list):
         r'''
@@ -430,3 +542,43 @@ def ASCII(**kwargs):
         return fit_function
 
     return override
+
+
+def Linear(**kwargs):
+    r"""
+    Optional decorator for fit functions. Declares that the function is
+    linear in (some of) its parameters, i.e. that it can be written as
+
+    .. math::
+
+        f(x) = f_0(x) + \sum_k p_k b_k(x)
+
+    with functions :math:`f_0` and :math:`b_k` not depending on the
+    parameters :math:`p_k`. Fits of functions linear in all parameters are
+    solved directly, and linear parameters of other functions are profiled
+    analytically during the minimization. Possible arguments:
+
+    *parameter_names* : list of strings
+        Names of the parameters the function is linear in. If omitted, the
+        function is declared linear in all parameters.
+    """
+
+    # retrieve values from the dictionary
+    parameter_names = kwargs.pop("parameter_names", None)
+
+    if kwargs:
+        logger.warning("Unknown keyword arguments for decorator Linear ignored: %r"
+                       % (kwargs.keys(),))
+
+    def override(fit_function):
+        if parameter_names is None:
+            fit_function.linear_parameters = tuple(
+                range(fit_function.number_of_parameters))
+        else:
+            fit_function.linear_parameters = tuple(
+                list(fit_function.parameter_names).index(name)
+                for name in parameter_names)
+
+        return fit_function
+
+    return override
@@ -14,6 +14,9 @@
 #  05-May-15    create module
 #  08-Oct-16 GQ  printout level -1 if "quiet" specified
 #                suppressed du2() if no printout requested
+#  18-Oct-26     FCN is called with a single array of parameter values
+#                fix/release parameters in place, added bulk versions
+#                optional analytic gradient of the FCN
 # ----------------------------------------------------------------
 
 # import iminuit as python package
@@ -55,12 +58,14 @@ class IMinuit:
     # init signature exactly as for the 'Minuit' class
     def __init__(self, number_of_parameters, function_to_minimize,
                  parameter_names, start_parameters, parameter_errors,
-                 quiet=True, verbose=False):
+                 quiet=True, verbose=False, gradient=None):
         '''
         Create an *iminuit* minimizer for a function `function_to_minimize`.
         Necessary arguments are the number of parameters and the function to be
-        minimized `function_to_minimize`. The function `function_to_minimize`'s
-        arguments must be numerical values. The same goes for its output.
+        minimized `function_to_minimize`. The function `function_to_minimize`
+        is called with a single one-dimensional `float64` array containing
+        the values of all parameters, in the order given by `parameter_names`.
+        Its output must be a numerical value.
 
         Another requirement is for every parameter of `function_to_minimize` to
         have a default value. These are then used to initialize Minuit.
@@ -70,7 +75,8 @@ class IMinuit:
 
         **function_to_minimize** : function
             The function which `Minuit` should minimize. This must be a Python
-            function with <``number_of_parameters``> arguments.
+            function taking a single array of <``number_of_parameters``>
+            parameter values as its argument.
 
         **parameter_names** : tuple/list of strings
             The parameter names. These are used to keep track of the parameters
@@ -93,6 +99,13 @@ class IMinuit:
             If ``True``, sets ``iminuit``'s print level to a high value, so
             that all output is logged.
 
+        *gradient* : function (optional, default: ``None``)
+            A function with the same call signature as
+            `function_to_minimize`, returning an array with the first
+            derivatives of `function_to_minimize` with respect to all
+            parameters. If given, ``iminuit`` uses it instead of computing
+            the gradient numerically.
+
         '''
 
         #: the name of this minimizer type
@@ -101,6 +114,9 @@ class IMinuit:
         #: the actual `FCN` called in ``FCN_wrapper``
         self.function_to_minimize = function_to_minimize
 
+        #: the gradient of `function_to_minimize` (``None`` if numerical)
+        self.gradient = gradient
+
         #: number of parameters to minimize for
         self.number_of_parameters = number_of_parameters
 
@@ -131,8 +147,8 @@ class IMinuit:
 
         # initialize the minimizer
         self.__iminuit = iminuit.Minuit(self.function_to_minimize,
-            forced_parameters=_par_names, errordef=self.errordef,
-            **_init_par_dict)
+            forced_parameters=_par_names, use_array_call=True,
+            grad=self.gradient, errordef=self.errordef, **_init_par_dict)
 
         # set minimizer properties
         self.set_err()
@@ -166,8 +182,12 @@ class IMinuit:
             self.function_to_minimize,
             print_level=self.print_level,
             forced_parameters=self.parameter_names,
+            use_array_call=True,
+            grad=self.gradient,
             errordef=self.errordef,
             **fitparam)
+        # a new minimizer starts with the default strategy
+        self.__iminuit.set_strategy(self.strategy)
 
         return 0
 
@@ -193,6 +213,7 @@ class IMinuit:
         '''
 
         self.__iminuit.set_strategy(strategy_id)
+        self.strategy = strategy_id
 
     def set_err(self, up_value=1.0):
         '''Sets the ``UP`` value for Minuit.
@@ -526,68 +547,40 @@ class IMinuit:
         '''
         Fix parameter <`parameter`>.
 
-        **parameter** : string
-            Name of the parameter to fix.
+        **parameter** : string or int
+            Name or ID of the parameter to fix.
         '''
-
-        # cannot do this directly in iminuit
-        # must create new minimizer with fixed parameters
-
-        if isinstance(parameter, int):
-            par_id = parameter
-            parameter = self.parameter_names[parameter]
-        else:
-            try:
-                par_id = self.parameter_names.index(parameter)
-            except ValueError:
-                raise ValueError("No parameter named '%s'" % (parameter,))
-
-        logger.info("Fixing parameter %d in Minuit" % (par_id,))
-
-        fitparam = self.__iminuit.fitarg.copy()   # copy minimizer arguments
-        #fitparam[parameter] = v
-        fitparam['fix_%s'%parameter] = True     # set fix-flag for parameter
-        # replace minimizer
-        ##del self.__iminuit
-        self.__iminuit = iminuit.Minuit(
-            self.function_to_minimize,
-            print_level=self.print_level,
-            forced_parameters=self.parameter_names,
-            errordef = self.errordef,
-            **fitparam)
-
+        self.fix_parameters([parameter])
 
     def release_parameter(self, parameter):
         '''
         Release parameter <`parameter`>.
 
-        **parameter** : string
-            Name of the parameter to release.
+        **parameter** : string or int
+            Name or ID of the parameter to release.
         '''
+        self.release_parameters([parameter])
 
-        if isinstance(parameter, int):
-            par_id = parameter
-            parameter = self.parameter_names[parameter]
-        else:
-            try:
-                par_id = self.parameter_names.index(parameter)
-            except ValueError:
-                raise ValueError("No parameter named '%s'" % (parameter,))
-
-        logger.info("Releasing parameter %d in Minuit" % (par_id,))
+    def fix_parameters(self, parameters):
+        '''
+        Fix several parameters at once. The live minimizer is updated in
+        place, so that the state of the last minimization (parameter values,
+        errors and `errordef`) is kept as a starting point for the next one.
 
-        fitparam = self.__iminuit.fitarg.copy()   # copy minimizer arguments
-        #fitparam[parameter] = v
-        fitparam['fix_%s'%parameter] = False     # set fix-flag for parameter
-        # replace minimizer
-        ##del self.__iminuit
-        self.__iminuit = iminuit.Minuit(
-            self.function_to_minimize,
-            print_level=self.print_level,
-            forced_parameters=self.parameter_names,
-            **fitparam)
+        **parameters** : list of strings or ints
+            Names or IDs of the parameters to fix.
+        '''
+        self._set_fixed_flags(parameters, True)
 
+    def release_parameters(self, parameters):
+        '''
+        Release several parameters at once. The live minimizer is updated in
+        place, see `fix_parameters`.
 
+        **parameters** : list of strings or ints
+            Names or IDs of the parameters to release.
+        '''
+        self._set_fixed_flags(parameters, False)
 
     def reset(self):
         '''Resets iminuit by re-creating the minimizer.'''
@@ -598,27 +591,33 @@ class IMinuit:
             self.function_to_minimize,
             print_level=self.print_level,
             forced_parameters=self.parameter_names,
+            use_array_call=True,
+            grad=self.gradient,
+            errordef=self.errordef,
             **fitparam)
+        # a new minimizer starts with the default strategy
+        self.__iminuit.set_strategy(self.strategy)
 
     def FCN_wrapper(self, **kw_parameters):
         '''
         This wrapper converts from the "keyword argument" way of calling the
-        function to a "positional argument" way, taking into account the order
+        function to the "array argument" way, taking into account the order
         of the parameters as they appear in `self.parameter_names`.
 
-        This mapping is done for each call, so it's quite resource intensive,
-        but this is unavoidable, since external FCNs to minimize expect
-        positional arguments.
+        It is not used during minimization, since *iminuit* passes the
+        parameter values to `function_to_minimize` as an array directly.
 
         **kw_parameters** : dict
             Map of parameter name to parameter value.
         '''
 
-        # translate keyword arguments to positional arguments
-        parameter_list = [kw_parameters[name] for name in self.parameter_names]
+        # translate keyword arguments to a parameter array
+        parameter_array = np.array([kw_parameters[name]
+                                    for name in self.parameter_names],
+                                   dtype=np.float64)
 
-        # call the positional FCN.
-        return self.function_to_minimize(*parameter_list)
+        # call the array FCN.
+        return self.function_to_minimize(parameter_array)
 
     def minimize(self, final_fit=True, log_print_level=2):
         '''Do the minimization. This calls `Minuit`'s algorithms ``MIGRAD``
@@ -682,7 +681,10 @@ class IMinuit:
         output = []
 
         for par_id, parameter in enumerate(self.parameter_names):
-            if parameter in _results.keys():
+            # (MINOS results of a previous run are kept for parameters
+            #  which have been fixed in the meantime)
+            if (parameter in _results.keys()
+                    and not self.__iminuit.is_fixed(parameter)):
                 _minstruct = _results[parameter]
                 # positive, negative parameter error
                 errpos, errneg = _minstruct.upper, _minstruct.lower
@@ -710,3 +712,41 @@ class IMinuit:
             _mat = np.insert(np.insert(_mat, _id, 0., axis=0), _id, 0., axis=1)
 
         return _mat
+
+    def _set_fixed_flags(self, parameters, fix):
+        '''
+        Sets the `fix` flag of several parameters in iminuit.
+        '''
+        _names = []
+        for parameter in parameters:
+            if isinstance(parameter, (int, np.integer)):
+                par_id = parameter
+                parameter = self.parameter_names[parameter]
+            else:
+                try:
+                    par_id = self.parameter_names.index(parameter)
+                except ValueError:
+                    raise ValueError("No parameter named '%s'" % (parameter,))
+            logger.info("%s parameter %d in Minuit"
+                        % (("Fixing" if fix else "Releasing"), par_id))
+            _names.append(parameter)
+
+        if hasattr(self.__iminuit, 'fixed'):
+            # iminuit >= 1.3: change flags on the live minimizer
+            for _name in _names:
+                self.__iminuit.fixed[_name] = fix
+        else:
+            # FIX_UPSTREAM older iminuit versions cannot do this directly,
+            # so create a single new minimizer with all flags changed
+            fitparam = self.__iminuit.fitarg.copy()   # copy minimizer arguments
+            for _name in _names:
+                fitparam['fix_%s' % _name] = fix     # set fix-flag for parameter
+            self.__iminuit = iminuit.Minuit(
+                self.function_to_minimize,
+                print_level=self.print_level,
+                forced_parameters=self.parameter_names,
+                use_array_call=True,
+                grad=self.gradient,
+                errordef=self.errordef,
+                **fitparam)
+            self.__iminuit.set_strategy(self.strategy)
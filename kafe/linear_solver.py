@@ -0,0 +1,463 @@
+'''
+.. module:: linear_solver
+   :platform: Unix
+   :synopsis: A submodule providing the `LinearSolver` object, which
+        determines the parameters of models linear in their parameters by
+        solving the generalized least-squares problem directly. It has the
+        same interface as the wrappers for *iminuit* and ROOT::TMinuit.
+'''
+
+# ----------------------------------------------------------------
+# Changes:
+#  18-Oct-26     create module
+# ----------------------------------------------------------------
+
+from .config import log_file, null_file
+from time import gmtime, strftime
+
+import numpy as np
+import scipy.stats as stats
+from scipy.linalg import cholesky, solve_triangular
+
+# import main logger for kafe
+import logging
+logger = logging.getLogger('kafe')
+
+# Constants
+############
+
+# dictionary lookup for error codes
+D_MATRIX_ERROR = {0: "Error matrix not calculated",
+                  3: "Error matrix accurate"}  #: Error matrix status codes
+
+
+class LinearSolver:
+    '''
+    A minimizer for the :math:`\\chi^2` of a model which is linear in all its
+    parameters. The minimum, the parameter covariance matrix, contours and
+    profiles are calculated exactly from the solution of the generalized
+    least-squares problem, without any iterations.
+
+    The model is given by a function `model` which returns the tuple
+    (`ydata`, `offset`, `basis`, `cov_mat`), so that the model prediction
+    for the parameter vector :math:`\\vec{p}` is
+    :math:`\\vec{f} = \\vec{f}_0 + B \\vec{p}` and
+    :math:`\\chi^2 = (\\vec{y} - \\vec{f})^T C^{-1} (\\vec{y} - \\vec{f})`.
+    '''
+
+    # init signature as for the 'Minuit' class, plus the model
+    def __init__(self, number_of_parameters, function_to_minimize,
+                 parameter_names, start_parameters, parameter_errors,
+                 quiet=True, verbose=False, model=None):
+        '''
+        Create a linear least-squares solver.
+
+        **number_of_parameters** : int
+            The number of parameters of the function to minimize.
+
+        **function_to_minimize** : function
+            The :math:`\\chi^2` function, taking a single array of
+            <``number_of_parameters``> parameter values as its argument. Only
+            used to report the value at the minimum.
+
+        **parameter_names** : tuple/list of strings
+            The parameter names.
+
+        **start_parameters** : tuple/list of floats
+            The start values of the parameters. Only the values of fixed
+            parameters are used.
+
+        **parameter_errors** : tuple/list of floats
+            An initial guess of the parameter errors. Not used for the
+            solution.
+
+        *quiet* : boolean (optional, default: ``True``)
+            If ``True``, suppresses all output.
+
+        *verbose* : boolean (optional, default: ``False``)
+            Not used.
+
+        *model* : function
+            A function without arguments returning the tuple (`ydata`,
+            `offset`, `basis`, `cov_mat`), which describes the linear model
+            in its current state.
+        '''
+
+        #: the name of this minimizer type
+        self.name = "linear least squares"
+
+        #: the :math:`\chi^2` function
+        self.function_to_minimize = function_to_minimize
+
+        #: the function returning the linear model
+        self.model = model
+
+        #: number of parameters to minimize for
+        self.number_of_parameters = number_of_parameters
+
+        if not quiet:
+            self.out_file = open(log_file("linear_solver.log"), 'a')
+        else:
+            self.out_file = null_file()
+
+        #: ``UP`` value: change of the `FCN` defining the parameter errors
+        self.errordef = 1.0
+
+        # store which parameters are fixed
+        self._fixed = np.zeros(self.number_of_parameters, dtype=bool)
+
+        # results of the last minimization
+        self._cov_mat = None
+        self._fcn = None
+
+        self.set_parameter_names(parameter_names)
+        self.set_parameter_values(start_parameters)
+        self.set_parameter_errors(parameter_errors)
+
+    # Set methods
+    ##############
+
+    def set_print_level(self, print_level=1):
+        '''Does nothing, the solver has no output levels.'''
+        self.print_level = print_level
+
+    def set_strategy(self, strategy_id=1):
+        '''Does nothing, there is only one strategy.'''
+        self.strategy = strategy_id
+
+    def set_err(self, up_value=1.0):
+        '''Sets the ``UP`` value.
+
+        *up_value* : float (optional, default: 1.0)
+            This is the value by which `FCN` is expected to change.
+        '''
+        self.errordef = up_value
+
+    def set_tolerance(self, tol):
+        '''Does nothing, the solution is exact.'''
+        self.tolerance = tol
+
+    def set_parameter_values(self, parameter_values):
+        '''Sets the fit parameters.'''
+        if len(parameter_values) == self.number_of_parameters:
+            self.current_parameters = np.array(parameter_values, dtype=np.float64)
+        else:
+            raise Exception("Cannot set parameter values. "
+                            "Tuple length mismatch.")
+
+    def set_parameter_names(self, parameter_names):
+        '''Sets the fit parameter names.'''
+        if len(parameter_names) == self.number_of_parameters:
+            self.parameter_names = parameter_names
+        else:
+            raise Exception("Cannot set parameter names. "
+                            "Tuple length mismatch.")
+
+    def set_parameter_errors(self, parameter_errors=None):
+        '''Sets the fit parameter errors. If parameter_values=`None`, sets the
+        error to 10% of the parameter value.'''
+        if parameter_errors is None:
+            self.parameter_errors = np.array([max(0.1, 0.1 * par)
+                                              for par in self.current_parameters])
+        elif len(parameter_errors) != self.number_of_parameters:
+            raise Exception("Cannot set parameter errors. "
+                            "Tuple length mismatch.")
+        else:
+            self.parameter_errors = np.array(parameter_errors, dtype=np.float64)
+
+    # Get methods
+    ##############
+
+    def get_error_matrix(self, correlation=False):
+        '''Retrieves the parameter error matrix, with zeroes for fixed
+        parameters.
+
+        correlation : boolean (optional, default ``False``)
+            If ``True``, return correlation matrix, else return
+            covariance matrix.
+
+        return : `numpy.matrix`
+        '''
+        if self._cov_mat is None:
+            _mat = np.zeros((self.number_of_parameters, self.number_of_parameters))
+        else:
+            _mat = self.errordef * self._cov_mat
+        if correlation:
+            _err = np.sqrt(np.diag(_mat))
+            _outer = np.outer(_err, _err)
+            _mat = np.divide(_mat, _outer, out=np.zeros_like(_mat), where=_outer != 0)
+        return np.asmatrix(_mat)
+
+    def get_parameter_values(self):
+        '''Retrieves the parameter values.
+
+        return : tuple
+            Current parameter values
+        '''
+        return tuple(self.current_parameters)
+
+    def get_parameter_errors(self):
+        '''Retrieves the parameter errors.
+
+        return : tuple
+            Current parameter errors
+        '''
+        return tuple(self.parameter_errors)
+
+    def get_parameter_info(self):
+        '''Retrieves parameter information.
+
+        return : list of tuples
+            ``(parameter_name, parameter_val, parameter_error)``
+        '''
+        return tuple(zip(self.parameter_names, self.current_parameters,
+                         self.parameter_errors * ~self._fixed))
+
+    def get_parameter_name(self, parameter_nr):
+        '''Gets the name of parameter number ``parameter_nr``
+
+        **parameter_nr** : int
+            Number of the parameter whose name to get.
+        '''
+        return self.parameter_names[parameter_nr]
+
+    def get_fit_info(self, info):
+        '''Retrieves other info about the solution.
+
+        **info** : string
+            Information about the fit to retrieve.
+            This can be any of the following:
+
+              - ``'fcn'``: `FCN` value at minimum,
+              - ``'edm'``: estimated distance to minimum (always 0)
+              - ``'err_def'``: ``UP`` value
+              - ``'status_code'``: error matrix status code
+
+        '''
+        if info == 'fcn':
+            return self._fcn
+        elif info == 'edm':
+            return 0.
+        elif info == 'err_def':
+            return self.errordef
+        elif info == 'status_code':
+            if self._cov_mat is None:
+                return D_MATRIX_ERROR[0]
+            return D_MATRIX_ERROR[3]
+
+    def get_chi2_probability(self, n_deg_of_freedom):
+        '''
+        Returns the probability that an observed :math:`\\chi^2` exceeds
+        the calculated value of :math:`\\chi^2` for this fit by chance,
+        even for a correct model.
+
+        n_def_of_freedom : int
+            The number of degrees of freedom. This is typically
+            :math:`n_\\text{datapoints} - n_\\text{parameters}`.
+        '''
+        return 1. - stats.chi2.cdf(self._fcn, n_deg_of_freedom)
+
+    def get_contour(self, parameter1, parameter2, n_points=21):
+        '''
+        Returns the contour of two parameters for the current ``UP`` value.
+        For a linear model, this is exactly the ellipse given by the
+        covariance matrix of the two parameters.
+
+        **parameter1** : int
+            ID of the parameter to be displayed on the `x`-axis.
+
+        **parameter2** : int
+            ID of the parameter to be displayed on the `y`-axis.
+
+        *n_points* : int (optional)
+            number of points used to draw the contour. Default is 21.
+
+        *returns* : 2-tuple of arrays
+            a 2-tuple (x, y) containing ``n_points+1`` points sampled
+            along the contour. The first point is repeated at the end
+            of the list to generate a closed contour.
+        '''
+        if not isinstance(parameter1, int):
+            parameter1 = self.parameter_names.index(parameter1)
+        if not isinstance(parameter2, int):
+            parameter2 = self.parameter_names.index(parameter2)
+
+        # first, make sure we are at minimum
+        self.minimize(final_fit=True, log_print_level=0)
+
+        _ids = [parameter1, parameter2]
+        _sub_cov_mat = self.get_error_matrix()[np.ix_(_ids, _ids)]
+        _cholesky = np.linalg.cholesky(_sub_cov_mat)
+        _angles = np.linspace(0., 2. * np.pi, n_points + 1)
+        _circle = np.vstack((np.cos(_angles), np.sin(_angles)))
+        x, y = np.asarray(_cholesky.dot(_circle)) + \
+            self.current_parameters[_ids][:, np.newaxis]
+        return (x, y)
+
+    def get_profile(self, parameter, n_points=21):
+        '''
+        Returns the profile :math:`\\chi^2` of a parameter. For a linear
+        model, this is exactly a parabola.
+
+        **parameter** : int
+            ID of the parameter to be displayed on the `x`-axis.
+
+        *n_points* : int (optional)
+            number of points used for profile. Default is 21.
+
+        *returns* : two arrays, par. values and corresp. :math:`\\chi^2`
+            containing ``n_points`` sampled profile points within three
+            standard deviations.
+        '''
+        if not isinstance(parameter, int):
+            try:
+                parameter = self.parameter_names.index(parameter)
+            except ValueError:
+                raise ValueError("No parameter named '%s'" % (parameter,))
+
+        # first, make sure we are at minimum
+        self.minimize(final_fit=True, log_print_level=0)
+
+        _value = self.current_parameters[parameter]
+        _error = np.sqrt(self._cov_mat[parameter, parameter])
+        _bound = 3. * np.sqrt(self.errordef) * _error
+        _values = np.linspace(_value - _bound, _value + _bound, n_points)
+        return _values, self._fcn + ((_values - _value) / _error) ** 2
+
+    # Other methods
+    ################
+
+    def fix_parameter(self, parameter):
+        '''
+        Fix parameter <`parameter`>.
+
+        **parameter** : string or int
+            Name or ID of the parameter to fix.
+        '''
+        self.fix_parameters([parameter])
+
+    def release_parameter(self, parameter):
+        '''
+        Release parameter <`parameter`>.
+
+        **parameter** : string or int
+            Name or ID of the parameter to release.
+        '''
+        self.release_parameters([parameter])
+
+    def fix_parameters(self, parameters):
+        '''
+        Fix several parameters at once.
+
+        **parameters** : list of strings or ints
+            Names or IDs of the parameters to fix.
+        '''
+        self._set_fixed_flags(parameters, True)
+
+    def release_parameters(self, parameters):
+        '''
+        Release several parameters at once.
+
+        **parameters** : list of strings or ints
+            Names or IDs of the parameters to release.
+        '''
+        self._set_fixed_flags(parameters, False)
+
+    def reset(self):
+        '''Discards the results of the last solution.'''
+        self._cov_mat = None
+        self._fcn = None
+
+    def minimize(self, final_fit=True, log_print_level=2):
+        '''
+        Solves the generalized least-squares problem for the free
+        parameters. The covariance matrix is whitened with its Cholesky
+        factor, and the columns of the whitened basis are normalized and
+        orthogonalized by a QR decomposition before solving. This keeps the
+        solution accurate also for polynomials of high degree, whose basis
+        functions are almost linearly dependent.
+        '''
+        # insert timestamp
+        prefix = "Linear least squares solution on"
+        self.out_file.write('\n')
+        self.out_file.write('#'*(len(prefix)+4+20))
+        self.out_file.write('\n')
+        self.out_file.write("# %s " % (prefix,) +
+                            strftime("%Y-%m-%d %H:%M:%S #\n", gmtime()))
+        self.out_file.write('#'*(len(prefix)+4+20))
+        self.out_file.write('\n\n')
+
+        _ydata, _offset, _basis, _cov_mat = self.model()
+        _free = np.flatnonzero(~self._fixed)
+
+        # move the contribution of the fixed parameters to the offset
+        _residual = np.asarray(_ydata, dtype=np.float64) - _offset - \
+            _basis[:, self._fixed].dot(self.current_parameters[self._fixed])
+
+        # whiten the problem using the Cholesky factor of the cov. matrix
+        _cholesky = cholesky(np.asarray(_cov_mat), lower=True, check_finite=False)
+        _basis = solve_triangular(_cholesky, _basis[:, _free], lower=True,
+                                  check_finite=False)
+        _residual = solve_triangular(_cholesky, _residual, lower=True,
+                                     check_finite=False)
+
+        # normalize the columns and orthogonalize the basis
+        _norms = np.sqrt(np.sum(_basis ** 2, axis=0))
+        _norms[_norms == 0] = 1.
+        _q, _r = np.linalg.qr(_basis / _norms)
+        _r_inv = solve_triangular(_r, np.eye(len(_free)), check_finite=False)
+
+        _solution = _r_inv.dot(_q.T.dot(_residual)) / _norms
+        _sub_cov_mat = _r_inv.dot(_r_inv.T) / np.outer(_norms, _norms)
+
+        self.current_parameters[_free] = _solution
+        self._cov_mat = np.zeros((self.number_of_parameters, self.number_of_parameters))
+        self._cov_mat[np.ix_(_free, _free)] = _sub_cov_mat
+        self.parameter_errors[_free] = np.sqrt(self.errordef * np.diag(_sub_cov_mat))
+        self._fcn = self.function_to_minimize(self.current_parameters.copy())
+
+        self.out_file.write("FCN = %g\n" % (self._fcn,))
+        for _name, _value, _error in self.get_parameter_info():
+            self.out_file.write("%s = %g +- %g\n" % (_name, _value, _error))
+        self.out_file.flush()
+
+    def minos_errors(self, log_print_level=1):
+        '''
+           Get (asymmetric) parameter uncertainties. For a linear model,
+           these are exactly the parabolic errors.
+
+           returns : tuple
+             A tuple of (err+, err-, parabolic error, global correlation)
+        '''
+        _cov_mat = self.get_error_matrix()
+        _free = np.flatnonzero(~self._fixed)
+        _inv_diag = np.zeros(self.number_of_parameters)
+        if len(_free):
+            _inv_diag[_free] = np.diag(np.linalg.inv(_cov_mat[np.ix_(_free, _free)]))
+
+        output = []
+        for par_id in range(self.number_of_parameters):
+            if self._fixed[par_id]:
+                # fixed parameters -> return zero errors
+                output.append([0., 0., 0., 0.])
+                continue
+            err = self.parameter_errors[par_id]
+            # global correlation coefficient
+            gcor = np.sqrt(max(0., 1. - 1. / (_cov_mat[par_id, par_id] * _inv_diag[par_id])))
+            output.append([float(err), float(-err), float(err), float(gcor)])
+        return output
+
+    def _set_fixed_flags(self, parameters, fix):
+        '''
+        Sets the `fix` flag of several parameters.
+        '''
+        for parameter in parameters:
+            if isinstance(parameter, (int, np.integer)):
+                par_id = parameter
+            else:
+                try:
+                    par_id = self.parameter_names.index(parameter)
+                except ValueError:
+                    raise ValueError("No parameter named '%s'" % (parameter,))
+            self._fixed[par_id] = fix
+            logger.debug("%s parameter %d" % ("Fixed" if fix else "Released", par_id))
@@ -16,6 +16,9 @@
 #  09-Dec-14  G.Q.  added chi2 profiling (function get_profile)
 #  08-Oct-16  GQ  printout level -1 if "quiet" specified
 #                 suppressed du2() if no printout requested
+#  18-Oct-26        FCN is called with a single array of parameter values
+#                   added bulk fix_parameters/release_parameters
+#                   optional analytic gradient of the FCN
 # ----------------------------------------------------------------
 
 # ROOT's data types needed to use TMinuit:
@@ -58,12 +61,14 @@ class Minuit:
 
     def __init__(self, number_of_parameters, function_to_minimize,
                  parameter_names, start_parameters, parameter_errors,
-                 quiet=True, verbose=False):
+                 quiet=True, verbose=False, gradient=None):
         '''
         Create a Minuit minimizer for a function `function_to_minimize`.
         Necessary arguments are the number of parameters and the function to be
-        minimized `function_to_minimize`. The function `function_to_minimize`'s
-        arguments must be numerical values. The same goes for its output.
+        minimized `function_to_minimize`. The function `function_to_minimize`
+        is called with a single one-dimensional `float64` array containing
+        the values of all parameters, in the order given by `parameter_names`.
+        Its output must be a numerical value.
 
         Another requirement is for every parameter of `function_to_minimize` to
         have a default value. These are then used to initialize Minuit.
@@ -73,7 +78,8 @@ class Minuit:
 
         **function_to_minimize** : function
             The function which `Minuit` should minimize. This must be a Python
-            function with <``number_of_parameters``> arguments.
+            function taking a single array of <``number_of_parameters``>
+            parameter values as its argument.
 
         **parameter_names** : tuple/list of strings
             The parameter names. These are used to keep track of the parameters
@@ -96,6 +102,13 @@ class Minuit:
             If ``True``, sets ``TMinuit``'s print level to a high value, so
             that all output is logged.
 
+        *gradient* : function (optional, default: ``None``)
+            A function with the same call signature as
+            `function_to_minimize`, returning an array with the first
+            derivatives of `function_to_minimize` with respect to all
+            parameters. If given, ``TMinuit`` uses it instead of computing
+            the gradient numerically.
+
         '''
         #: the name of this minimizer type
         self.name = "ROOT::TMinuit"
@@ -103,6 +116,9 @@ class Minuit:
         #: the actual `FCN` called in ``FCN_wrapper``
         self.function_to_minimize = function_to_minimize
 
+        #: the gradient of `function_to_minimize` (``None`` if numerical)
+        self.gradient = gradient
+
         #: number of parameters to minimize for
         self.number_of_parameters = number_of_parameters
 
@@ -132,6 +148,11 @@ class Minuit:
         self.set_parameter_errors(parameter_errors)
         self.set_parameter_names(parameter_names)
 
+        # tell TMinuit that the FCN provides its own first derivatives
+        if self.gradient is not None:
+            error_code = Long(0)
+            self.__gMinuit.mnexcm("SET GRA", arr('d', [1]), 1, error_code)
+
         #: maximum number of iterations until ``TMinuit`` gives up
         self.max_iterations = M_MAX_ITERATIONS
 
@@ -182,6 +203,7 @@ class Minuit:
         # execute SET STRATEGY command
         self.__gMinuit.mnexcm("SET STRATEGY",
                               arr('d', [strategy_id]), 1, error_code)
+        self.strategy = strategy_id
 
     def set_err(self, up_value=1.0):
         '''Sets the ``UP`` value for Minuit.
@@ -533,6 +555,38 @@ class Minuit:
         self.__gMinuit.mnexcm("RELEASE",
                               arr('d', [parameter_number+1]), 1, error_code)
 
+    def fix_parameters(self, parameter_numbers):
+        '''
+        Fix several parameters with a single ``FIX`` command.
+
+        **parameter_numbers** : list of int
+            Numbers of the parameters to fix.
+        '''
+        if not parameter_numbers:
+            return
+        error_code = Long(0)
+        logger.info("Fixing parameters %r in Minuit" % (list(parameter_numbers),))
+        # execute FIX command for all parameters at once
+        self.__gMinuit.mnexcm("FIX",
+                              arr('d', [_n+1 for _n in parameter_numbers]),
+                              len(parameter_numbers), error_code)
+
+    def release_parameters(self, parameter_numbers):
+        '''
+        Release several parameters with a single ``RELEASE`` command.
+
+        **parameter_numbers** : list of int
+            Numbers of the parameters to release.
+        '''
+        if not parameter_numbers:
+            return
+        error_code = Long(0)
+        logger.info("Releasing parameters %r in Minuit" % (list(parameter_numbers),))
+        # execute RELEASE command for all parameters at once
+        self.__gMinuit.mnexcm("RELEASE",
+                              arr('d', [_n+1 for _n in parameter_numbers]),
+                              len(parameter_numbers), error_code)
+
     def reset(self):
         '''Execute TMinuit's `mnrset` method.'''
         self.__gMinuit.mnrset(0)  # reset TMinuit
@@ -553,15 +607,15 @@ class Minuit:
 
         **derivatives** : C array
             If the user chooses to calculate the first derivative of the
-            function inside the `FCN`, this value should be written here. This
-            interface to `Minuit` ignores this derivative, however, so
-            calculating this inside the `FCN` has no effect (yet).
+            function inside the `FCN`, this value should be written here.
+            This is done if a `gradient` function was given.
 
         **f** : C array
             The desired function value is in f[0] after execution.
 
         **parameters** : C array
-            A C array of parameters. Is cast to a Python list
+            A C array of parameters. Is wrapped in a `float64` NumPy array
+            which is passed on to `function_to_minimize`.
 
         **internal_flag** : int
             A flag allowing for different behaviour of the function.
@@ -569,14 +623,19 @@ class Minuit:
             `Minuit`'s specification.
         '''
 
-        # Retrieve the parameters from the C side of ROOT and
-        # store them in a Python list -- resource-intensive
-        # for many calls, but can't be improved (yet?)
-        parameter_list = np.frombuffer(parameters, dtype=float,
-                                       count=self.number_of_parameters)
+        # Wrap the parameters from the C side of ROOT in a
+        # NumPy array (no copy is made)
+        parameter_array = np.frombuffer(parameters, dtype=np.float64,
+                                        count=self.number_of_parameters)
 
         # call the Python implementation of FCN.
-        f[0] = self.function_to_minimize(*parameter_list)
+        f[0] = self.function_to_minimize(parameter_array)
+
+        # TMinuit requests the first derivatives with internal_flag == 2
+        if self.gradient is not None and internal_flag == 2:
+            gradient = self.gradient(parameter_array)
+            for i in range(self.number_of_parameters):
+                derivatives[i] = gradient[i]
 
     def minimize(self, final_fit=True, log_print_level=2):
         '''Do the minimization. This calls `Minuit`'s algorithms ``MIGRAD``
@@ -12,6 +12,20 @@
 # ----------------------------------------------------------------
 # Changes:
 # 11-Oct-16   J.S.: Added class ParameterSpace.
+# 18-Oct-26         vectorized _construct_cov_mat
+#                    minimizer calls the FCN with an array of parameter values
+#                    fix_parameters/release_parameters use a single call
+#                    to the minimizer
+#                    chi2 is summed over blocks of correlated datasets,
+#                    only the diagonal blocks of the cov. matrix are stored
+#                    _ParameterSpace compiles index arrays for each function
+#                    parameters are linked by name lookup, without pairwise loops
+#                    added add_fit/remove_fit
+#                    added prefit to seed the minimizer with sub-fit results
+#                    structured mode: sparse Jacobian, analytic gradient and
+#                    Gauss-Newton steps on the sparse normal equations
+#                    added set_linear_parameters: linear parameters are
+#                    profiled analytically during the minimization
 # ----------------------------------------------------------------
 
 from __future__ import print_function
@@ -19,10 +33,15 @@ from __future__ import print_function
 import kafe
 import logging
 import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
 import os
+import warnings
 
-from copy import copy
+from scipy.linalg import (LinAlgError, cho_factor, cho_solve,
+                          lu_factor, lu_solve)
+from scipy.sparse import coo_matrix, diags
+from scipy.sparse.linalg import spsolve
 
 from .function_tools import outer_product
 from .numeric_tools import extract_statistical_errors, MinuitCov_to_cor, cor_to_cov
@@ -33,6 +52,37 @@ from .stream import StreamDup
 
 logger = logging.getLogger('kafe')
 
+# relative step size for the numerical derivatives by the parameters
+_JACOBIAN_STEP = 1e-6
+
+# list of fits for the prefit worker processes (inherited when forking)
+_prefit_fit_list = None
+
+
+def _prefit_worker(job):
+    '''
+    Fits a single dataset of a multifit on its own, using a new `Fit` object,
+    so that the `Fit` in the multifit is not changed. Returns the parameter
+    values and errors as arrays, or ``None`` if the fit failed or all
+    parameters are fixed.
+    '''
+    _fit_id, _values, _errors, _fixed_ids = job
+    if len(_fixed_ids) == len(_values):
+        return None
+    _sub_fit = _prefit_fit_list[_fit_id]
+    try:
+        fit = kafe.Fit(_sub_fit.dataset, _sub_fit.fit_function, quiet=True)
+        fit.set_parameters(_values, _errors, no_warning=True)
+        if len(_fixed_ids):
+            fit.fix_parameters(*_fixed_ids)
+        fit.do_fit(quiet=True)
+    except Exception as e:
+        logger.warning("Fit of dataset %d failed: %s" % (_fit_id, e))
+        return None
+    return (np.asarray(fit.get_parameter_values(), dtype=float),
+            np.asarray(fit.get_parameter_errors(), dtype=float))
+
+
 def chi2( ydata, cov_mat,
          fdata):
     r'''
@@ -114,10 +164,20 @@ class Multifit(object):
         Which minimizer to use. This defaults to whatever is set in the config
         file, but can be specifically overridden for some fits using this
         keyword argument.
+
+    structured : boolean, optional
+        If ``True``, the block structure of the fit is exploited: the
+        derivatives by a parameter are calculated only from the datasets
+        depending on it, and the resulting gradient of :math:`\chi^2` is
+        passed to the minimizer. Before the minimization, :py:meth:`do_fit`
+        does Gauss-Newton steps on the sparse normal equations (see
+        :py:meth:`gauss_newton_fit`). Useful for fits with many parameters
+        that only affect single datasets.
     '''
     def __init__(self, dataset_function,external_fcn=chi2,
                  fit_name=None, fit_label=None,
-                 minimizer_to_use=M_MINIMIZER_TO_USE, quiet = False):
+                 minimizer_to_use=M_MINIMIZER_TO_USE, quiet = False,
+                 structured=False):
 
         # variables to store final results of this fit
         self.final_fcn = None
@@ -148,12 +208,8 @@ class Multifit(object):
         # Bool to store if datasets are the same
         self.corelate_datasets = False
 
-        self.first_cov_mat_y = self._build_cov_mat_datapoints('y')
-        self.current_cov_mat = self.first_cov_mat_y
-
-        self.first_cov_mat_x = None
-        if self.has_errors('x'):
-            self.first_cov_mat_x = self._build_cov_mat_datapoints('x')
+        # Build the block-diagonal covariance matrices for the data points
+        self._init_cov_mats()
 
 
         # Total number of parameters
@@ -167,6 +223,8 @@ class Multifit(object):
 
         self.minimizer_to_use = minimizer_to_use
         self.quiet_minuit = quiet
+        # exploit the sparse structure of the Jacobian
+        self.structured = structured
         # Init a object to hold the minimizer which will be initilized ind dofit()
         self.minimizer = None
 
@@ -180,6 +238,12 @@ class Multifit(object):
         # store a dictionary to lookup whether a parameter is fixed
         self._fixed_parameters = None
         self.number_of_fixed_parameters = 0
+        # names (function_name.parameter_name) of the fixed parameters
+        self._fixed_parameter_names = []
+        # names of the parameters entering the fit functions linearly
+        self._linear_parameter_names = []
+        # ids of the linear parameters currently eliminated from the FCN
+        self._profiled_parameter_ids = None
 
         # Store all datasets/functions in the corresponding lists
         for fit in self.fit_list:
@@ -247,6 +311,82 @@ class Multifit(object):
         else:
             self.out_stream= StreamDup([null_file()])
 
+    def add_fit(self, dataset, fit_function):
+        '''
+        Adds a dataset and the corresponding fit function to this multifit.
+        Only the covariance matrix block of the new dataset is built (unless
+        datasets are correlated via :py:meth:`autolink_datasets`). The minimizer
+        is started from the current parameter values, e.g. the result of the
+        previous fit. The parameters of the new fit are not linked to any other
+        parameters; use :py:meth:`link_parameters` or :py:meth:`autolink_parameters`
+        for this.
+
+        Parameters
+        ----------
+        **dataset**: `Dataset`
+            The dataset to add.
+        **fit_function**: function
+            The fit function for this dataset.
+
+        Returns
+        -------
+        The `Fit` object created for the new dataset.
+        '''
+        self._store_parameters_in_fits()
+
+        _fit = kafe.Fit(dataset, fit_function, quiet=True)
+        # (the list of fits is shared with the parameter space)
+        self.parameter_space.add_fit(_fit)
+        self._update_cov_mats(added_fit_id=len(self.fit_list) - 1)
+
+        self._reinit_minimizer()
+        return _fit
+
+    def remove_fit(self, fit):
+        '''
+        Removes a fit (dataset and fit function) from this multifit. Parameters
+        of other fits which were linked to parameters of the removed fit stay
+        linked to each other. The minimizer is started from the current parameter
+        values.
+
+        Parameters
+        ----------
+        **fit**: int or `Fit`
+            The position of the fit in :py:attr:`fit_list` or the `Fit` object
+            itself.
+        '''
+        if isinstance(fit, int):
+            _fit_id = fit
+        else:
+            _fit_id = self.fit_list.index(fit)
+        if len(self.fit_list) < 2:
+            raise ValueError("Cannot remove the last fit from a Multifit.")
+
+        self._store_parameters_in_fits()
+
+        _fit = self.fit_list[_fit_id]
+        _removed_names = self.parameter_space.function_to_parameter[_fit.fit_function]
+        # a fixed parameter of the removed fit stays fixed if it is linked to
+        # a parameter of another fit
+        _remaining_names = [_name for fit in self.fit_list if fit is not _fit
+                            for _name in self.parameter_space.function_to_parameter[fit.fit_function]]
+        _remaining_ids = self.parameter_space.get_parameter_ids(_remaining_names)
+        _fixed_names = []
+        for _name in self._fixed_parameter_names:
+            if _name in _removed_names:
+                _id = self.parameter_space.get_parameter_ids([_name])[0]
+                if _id not in _remaining_ids:
+                    continue
+                _name = _remaining_names[_remaining_ids.index(_id)]
+            if _name not in _fixed_names:
+                _fixed_names.append(_name)
+        self._fixed_parameter_names = _fixed_names
+        # (the list of fits is shared with the parameter space)
+        self.parameter_space.remove_fit(_fit)
+        self._update_cov_mats(removed_fit_id=_fit_id)
+
+        self._reinit_minimizer()
+
     def has_errors(self, axis):
         '''
         Checks if any dataset has errors on the given axis.
@@ -263,11 +403,7 @@ class Multifit(object):
         calculating :math:`\chi^2`.
         '''
         self.corelate_datasets = True
-        self.first_cov_mat_y = self._build_cov_mat_datapoints('y')
-        self.current_cov_mat = self.first_cov_mat_y
-
-        if self.has_errors('x'):
-            self.first_cov_mat_x = self._build_cov_mat_datapoints('x')
+        self._init_cov_mats()
 
     def autolink_parameters(self):
         '''
@@ -470,37 +606,86 @@ class Multifit(object):
         '''
         par_id = []
         for parameter in parameters_to_fix:
-            parameter_found = False
-            for fit in self.fit_list:
-                for param in fit.fit_function.parameter_names:
-                    if param == parameter:
-                        parameter = fit.fit_function.name+ str('.')+ param
-                        parameter_found = True
+            # fixed parameters are stored with their full names
+            parameter = self.parameter_space._convert_parameter_names(parameter)
+            parameter_found = any(parameter in _names for _names in
+                                  self.parameter_space.function_to_parameter.values())
             if parameter_found== False:
                 logger.warning("Parameter '%s' not found. Parameter was not fixed " % (parameter,))
                 break
             else:
                 par_id.append(self.parameter_space.get_parameter_ids([parameter])[0])
+                self._fixed_parameter_names.append(parameter)
                 logger.info("Fixed parameter %d (%s)" % (par_id[-1], parameter))
         # found parameter, fix it
         if self._minuit_lists_outdated:
             self._init_minimizer()
 
-        for i, id in enumerate(par_id):
-            if parameters_to_fix_value:
+        if parameters_to_fix_value:
+            for i, id in enumerate(par_id):
                 self.current_parameter_values_minuit[id]=parameters_to_fix_value[i]
-            if self._minimizer_handle:
-                self.minimizer.fix_parameter(id)
+        if self._minimizer_handle:
+            # fix all parameters with a single call to the minimizer
+            self.minimizer.fix_parameters(par_id)
+            if parameters_to_fix_value:
                 self.minimizer.set_parameter_values(
                     self.current_parameter_values_minuit)
-                self.minimizer.set_parameter_errors(
-                    self.current_parameter_errors_minuit)
+        for id in par_id:
             self.current_parameter_errors_minuit[id] = 0
 
 
         self.number_of_fixed_parameters += len(par_id)
         #self._fixed_parameters[par_id] = True
 
+    def set_linear_parameters(self, linear_parameters):
+        '''
+        Declares parameters which enter the fit functions linearly, like
+        normalizations, offsets or amplitudes. All linking must be done before
+        declaring linear parameters. An empty list means that no parameter is
+        treated as linear.
+
+        During :py:meth:`do_fit`, the free linear parameters are eliminated
+        analytically at each call of the `FCN` by a weighted least-squares
+        solve, so that the minimizer only works on the other parameters. A final
+        minimization with all parameters provides the full parameter errors
+        and correlations.
+
+        Parameters
+        ----------
+        **linear_parameters**: list of strings
+            A list of strings with the parameternames as an entry
+        '''
+        if self._minuit_lists_outdated:
+            self._init_minimizer()
+
+        _names = []
+        for parameter in linear_parameters:
+            parameter_found = False
+            for fit in self.fit_list:
+                for param in fit.fit_function.parameter_names:
+                    if param == parameter:
+                        parameter = fit.fit_function.name+ str('.')+ param
+                        parameter_found = True
+            if parameter_found== False:
+                raise ValueError("Cannot declare parameter linear. Parameter "
+                                 "'%s' not found." % (parameter,))
+            _names.append(parameter)
+
+        # all fit functions depending on the parameters must be linear in them
+        _par_ids = self.parameter_space.get_parameter_ids(_names)
+        for fit, _ids in zip(self.fit_list, self.parameter_space.get_parameter_index_arrays()):
+            _local = np.flatnonzero(np.in1d(_ids, _par_ids))
+            if len(_local) and not fit.fit_function.is_linear_in(
+                    fit.xdata, fit.current_parameter_values, _local):
+                raise ValueError("Fit function `%s` is not linear in the "
+                                 "parameters %s."
+                                 % (fit.fit_function.name,
+                                    [fit.parameter_names[i] for i in _local]))
+
+        self._linear_parameter_names = _names
+        for id, parameter in zip(_par_ids, _names):
+            logger.info("Declared parameter %d (%s) linear" % (id, parameter))
+
     def release_parameters(self, *parameters_to_release):
         '''
         Release the given parameters so that the minimizer begins to work with
@@ -510,6 +695,7 @@ class Multifit(object):
         parameters.
         '''
         if parameters_to_release:
+            _par_ids = []
             for parameter in parameters_to_release:
                 parameter_found = False
                 for fit in self.fit_list:
@@ -522,17 +708,21 @@ class Multifit(object):
                     logger.warning("Parameter not found. No parameter was released")
                 else:
                     par_id = self.parameter_space.get_parameter_ids([parameter])
-                    # Release found parameter
-                    self.minimizer.release_parameter(par_id[0])
+                    _par_ids.append(par_id[0])
+                    if parameter in self._fixed_parameter_names:
+                        self._fixed_parameter_names.remove(parameter)
                     self.number_of_fixed_parameters -= 1
                     #self._fixed_parameters[par_id] = False
                     logger.info("Released parameter %d (%s)" % (par_id[-1], parameter))
 
+            # Release found parameters all at once
+            self.minimizer.release_parameters(_par_ids)
+
         else:
-            # go through all parameter IDs
-            for par_id in range(self.total_number_of_parameters):
-                # Release parameter
-                self.minimizer.release_parameter(par_id)
+            # release all parameter IDs
+            self.minimizer.release_parameters(
+                list(range(self.total_number_of_parameters)))
+            self._fixed_parameter_names = []
             # Inform about release
             logger.info("Released all parameters")
 
@@ -610,37 +800,273 @@ class Multifit(object):
     # Private Methods
     ##################
 
+    @property
+    def first_cov_mat_y(self):
+        '''
+        The full `y` covariance matrix of all data points (`numpy.matrix`).
+        Internally, only the diagonal blocks of correlated datasets are stored,
+        the full matrix is assembled when it is first accessed.
+        '''
+        return self._get_assembled_cov_mat('y', self._cov_mat_blocks_y)
+
+    @first_cov_mat_y.setter
+    def first_cov_mat_y(self, mat):
+        self._cov_mat_blocks_y = self._split_cov_mat(mat)
+        self._assembled_cov_mats.pop('y', None)
+
+    @property
+    def first_cov_mat_x(self):
+        '''
+        The full `x` covariance matrix of all data points (`numpy.matrix`),
+        or ``None`` if no dataset has `x` errors.
+        '''
+        if self._cov_mat_blocks_x is None:
+            return None
+        return self._get_assembled_cov_mat('x', self._cov_mat_blocks_x)
+
+    @first_cov_mat_x.setter
+    def first_cov_mat_x(self, mat):
+        self._cov_mat_blocks_x = None if mat is None else self._split_cov_mat(mat)
+        self._assembled_cov_mats.pop('x', None)
+
+    @property
+    def current_cov_mat(self):
+        '''
+        The full covariance matrix currently used for the fit (`numpy.matrix`).
+        '''
+        return self._get_assembled_cov_mat('current', self._cov_mat_blocks)
+
+    @current_cov_mat.setter
+    def current_cov_mat(self, mat):
+        self._set_current_cov_mat_blocks(self._split_cov_mat(mat))
+
+    def _init_cov_mats(self):
+        '''
+        Groups the datasets into blocks of correlated datasets and builds the
+        `y` (and `x`) covariance matrices for each block.
+        '''
+        _axes = ['y']
+        if self.has_errors('x'):
+            _axes.append('x')
+
+        self._cov_mat_links = dict()
+        for axis in _axes:
+            self._cov_mat_links[axis] = self._find_correlated_datasets(axis)
+        self._build_cov_mat_groups()
+
+        self._assembled_cov_mats = dict()
+        self._cov_mat_blocks_y = self._build_cov_mat_datapoints('y')
+        self._cov_mat_blocks_x = None
+        if 'x' in _axes:
+            self._cov_mat_blocks_x = self._build_cov_mat_datapoints('x')
+
+        self._set_current_cov_mat_blocks(list(self._cov_mat_blocks_y))
+
+    def _find_correlated_datasets(self, axis):
+        '''
+        Returns a list of booleans, which are ``True`` for every dataset
+        which is correlated with the previous one on the given axis. Datasets
+        are only correlated if self.corelate_datasets is True.
+        '''
+        _n_fits = len(self.fit_list)
+        _links = [False] * _n_fits
+        if self.corelate_datasets:
+            for i, fit in enumerate(self.fit_list):
+                _prev = self.fit_list[i-1]
+                if (i-1) % _n_fits == i:
+                    continue
+                _data, _prev_data = fit.dataset.get_data(axis), _prev.dataset.get_data(axis)
+                if len(_data) == len(_prev_data) and \
+                        np.allclose(_data, _prev_data, atol=0, rtol=1e-4):
+                    _links[i] = True
+        return _links
+
+    def _build_cov_mat_groups(self):
+        '''
+        Groups all datasets which are correlated (on any axis) into blocks.
+        For each block, the dataset ids and the positions of its data points
+        in the concatenated data vector are stored.
+        '''
+        _n_fits = len(self.fit_list)
+        _sizes = [fit.dataset.get_size() for fit in self.fit_list]
+        _offsets = np.concatenate(([0], np.cumsum(_sizes))).astype(int)
+
+        # merge correlated datasets
+        _group_of = list(range(_n_fits))
+
+        def _find(i):
+            while _group_of[i] != i:
+                _group_of[i] = _group_of[_group_of[i]]
+                i = _group_of[i]
+            return i
+
+        for _links in self._cov_mat_links.values():
+            for i, _linked in enumerate(_links):
+                if _linked:
+                    _group_of[_find(i)] = _find((i-1) % _n_fits)
+
+        _groups = dict()
+        for i in range(_n_fits):
+            _groups.setdefault(_find(i), []).append(i)
+
+        self._cov_mat_groups = sorted(_groups.values())
+        self._cov_mat_group_indices = []
+        for _group in self._cov_mat_groups:
+            _idx = np.concatenate([np.arange(_offsets[i], _offsets[i+1])
+                                   for i in _group])
+            if len(_idx) and np.all(np.diff(_idx) == 1):
+                # contiguous block: use a slice to get views
+                _idx = slice(_idx[0], _idx[-1]+1)
+            self._cov_mat_group_indices.append(_idx)
+        self._number_of_datapoints = int(_offsets[-1])
+
     def _build_cov_mat_datapoints(self, axis):
         '''
         Builds the Cov_mat for the data points for the given axis. The cov_mat will take in account
         if 2 datasets are the same and correlate them, if self.corelate_datasets is True.
 
+        Only the diagonal blocks of correlated datasets are built. Returns a list
+        of matrices, one for each group in self._cov_mat_groups.
+        '''
+        return [self._build_cov_mat_block(_group, axis) for _group in self._cov_mat_groups]
 
+    def _build_cov_mat_block(self, group, axis):
+        '''
+        Builds the covariance matrix block for the data points of the datasets
+        with the ids given in `group`.
         '''
+        _links = self._cov_mat_links[axis]
+        _n_fits = len(self.fit_list)
         dummy2 = []
-        __querry_dummy2 = []
-        for i,fit in enumerate(self.fit_list):
-            # Create mask to store points where a non 0 matrix is needed.
-            __querry = [False] * len(self.fit_list)
-            # Diagonal entrys are never 0
-            __querry[i] = True
-            dummy2.append([0] * len(self.fit_list))
-            # Check if datsets are correlated. If so change non diagonal elements.
-            if self.corelate_datasets:
-                if np.allclose(self.fit_list[i].dataset.get_data(axis), self.fit_list[i-1].dataset.get_data(axis),
-                               atol=0, rtol=1e-4):
-                    __querry[i-1] = True
-            __querry_dummy2.append(__querry)
-
-        for i,list in enumerate(dummy2):
-            for j,entry in enumerate(list):
-                if __querry_dummy2[i][j]:
-                    dummy2[i][j] = self.fit_list[i].current_cov_mat
+        for i in group:
+            dummy2.append([])
+            for j in group:
+                # Diagonal entrys are never 0, the others only if datasets are correlated
+                if i == j or (_links[i] and j == (i-1) % _n_fits):
+                    dummy2[-1].append(self.fit_list[i].current_cov_mat)
                 else:
-                    dummy2[i][j] = np.zeros((self.fit_list[i].dataset.get_size(), self.fit_list[j].dataset.get_size()))
-        return np.bmat(dummy2)
+                    dummy2[-1].append(np.zeros((self.fit_list[i].dataset.get_size(),
+                                                self.fit_list[j].dataset.get_size())))
+        return np.asmatrix(np.bmat(dummy2))
+
+    def _assemble_cov_mat(self, blocks):
+        '''
+        Builds the full covariance matrix from the matrices of the blocks.
+        '''
+        _mat = np.zeros((self._number_of_datapoints, self._number_of_datapoints))
+        for _idx, _block in zip(self._cov_mat_group_indices, blocks):
+            if isinstance(_idx, slice):
+                _mat[_idx, _idx] = _block
+            else:
+                _mat[np.ix_(_idx, _idx)] = _block
+        return np.asmatrix(_mat)
+
+    def _get_assembled_cov_mat(self, name, blocks):
+        '''
+        Returns the full covariance matrix for the blocks, which is cached
+        under `name` until the blocks are changed.
+        '''
+        if name not in self._assembled_cov_mats:
+            self._assembled_cov_mats[name] = self._assemble_cov_mat(blocks)
+        return self._assembled_cov_mats[name]
+
+    def _split_cov_mat(self, mat):
+        '''
+        Splits a full covariance matrix into the blocks of correlated
+        datasets. Raises a `ValueError` if the matrix correlates datasets
+        which are not in the same block.
+        '''
+        _mat = np.asarray(mat, dtype=np.float64)
+        _size = self._number_of_datapoints
+        if _mat.shape != (_size, _size):
+            raise ValueError("Expected a %d x %d covariance matrix, got shape %r."
+                             % (_size, _size, _mat.shape))
+        _blocks = []
+        _in_blocks = np.zeros(_mat.shape, dtype=bool)
+        for _idx in self._cov_mat_group_indices:
+            _idx = (_idx, _idx) if isinstance(_idx, slice) else np.ix_(_idx, _idx)
+            _blocks.append(np.asmatrix(_mat[_idx].copy()))
+            _in_blocks[_idx] = True
+        if np.any(_mat[~_in_blocks]):
+            raise ValueError("The covariance matrix correlates datasets which "
+                             "are not linked. Use autolink_datasets() first.")
+        return _blocks
 
-    def _call_external_fcn(self, *parameter_values):
+    def _set_current_cov_mat_blocks(self, blocks):
+        '''
+        Sets the covariance matrix blocks used for the fit and factorizes them.
+        '''
+        self._cov_mat_blocks = blocks
+        self._cov_mat_factors = [self._factorize_cov_mat_block(_block) for _block in blocks]
+        self._assembled_cov_mats.pop('current', None)
+
+    def _factorize_cov_mat_block(self, block):
+        '''
+        Factorizes a covariance matrix block. Returns the solver function
+        and the factorization to pass to it, or ``None`` if the block is
+        singular.
+        '''
+        block = np.asarray(block)
+        try:
+            if not np.allclose(block, block.T):
+                raise LinAlgError("Matrix is not symmetric.")
+            return (cho_solve, cho_factor(block, check_finite=False))
+        except LinAlgError:
+            # not symmetric/positive definite: use LU decomposition
+            with warnings.catch_warnings():
+                # singular matrices are detected below
+                warnings.simplefilter('ignore')
+                _factor = lu_factor(block, check_finite=False)
+            if not np.all(np.diag(_factor[0])):
+                logger.warning("Covariance matrix block of size %d is singular."
+                               % (len(block),))
+                return None
+            return (lu_solve, _factor)
+
+    def _get_cov_mat_factorization(self, group_number):
+        '''
+        Returns the solver function and the factorization of a covariance
+        matrix block. Raises a `LinAlgError` if the block is singular.
+        '''
+        _factorization = self._cov_mat_factors[group_number]
+        if _factorization is None:
+            raise LinAlgError("Covariance matrix of datasets %s is singular."
+                              % (self._cov_mat_groups[group_number],))
+        return _factorization
+
+    def _update_cov_mats(self, added_fit_id=None, removed_fit_id=None):
+        '''
+        Updates the covariance matrix blocks after a dataset was added or removed.
+        If datasets are not correlated, only the block of that dataset is
+        built/removed. Otherwise, all blocks are rebuilt.
+        '''
+        _has_x_errors = self.has_errors('x')
+        if self.corelate_datasets or (self._cov_mat_blocks_x is not None) != _has_x_errors:
+            self._init_cov_mats()
+            return
+
+        # every dataset is a block of its own
+        for axis in self._cov_mat_links:
+            self._cov_mat_links[axis] = self._find_correlated_datasets(axis)
+        self._build_cov_mat_groups()
+
+        self._assembled_cov_mats = dict()
+        if removed_fit_id is not None:
+            del self._cov_mat_blocks_y[removed_fit_id]
+            if self._cov_mat_blocks_x is not None:
+                del self._cov_mat_blocks_x[removed_fit_id]
+            del self._cov_mat_blocks[removed_fit_id]
+            del self._cov_mat_factors[removed_fit_id]
+        if added_fit_id is not None:
+            _block_y = self._build_cov_mat_block([added_fit_id], 'y')
+            self._cov_mat_blocks_y.insert(added_fit_id, _block_y)
+            if self._cov_mat_blocks_x is not None:
+                self._cov_mat_blocks_x.insert(added_fit_id,
+                                              self._build_cov_mat_block([added_fit_id], 'x'))
+            self._cov_mat_blocks.insert(added_fit_id, _block_y)
+            self._cov_mat_factors.insert(added_fit_id, self._factorize_cov_mat_block(_block_y))
+
+    def _call_external_fcn(self, parameter_values):
         '''
         Wrapper for the external `FCN`. Since the actual fit process depends on
         finding the right parameter values we can calculate the function datapoints
@@ -649,35 +1075,399 @@ class Multifit(object):
         Parameters
         ----------
 
-        **parameter_values** : sequence of values
-            the parameter values at which `FCN` is to be evaluated
+        **parameter_values** : `numpy.ndarray`
+            the `float64` array of parameter values at which `FCN` is to be
+            evaluated, as passed by the minimizer
 
         '''
 
-        _ydata = np.zeros(len(self.current_cov_mat))
-        _fdata = np.zeros(len(self.current_cov_mat))
+        if self._profiled_parameter_ids is not None:
+            parameter_values = self._solve_linear_parameters(parameter_values)[0]
+
+        _ydata = np.empty(self._number_of_datapoints)
+        _fdata = np.empty(self._number_of_datapoints)
         i = 0
-        for fit in self.fit_list:
-            _parameter_values = self.parameter_space.get_current_parameter_values(parameter_values, fit.fit_function)
+        for fit, _ids in zip(self.fit_list,
+                             self.parameter_space.get_parameter_index_arrays()):
+            _n = len(fit.xdata)
+            _ydata[i:i+_n] = fit.ydata
+            _fdata[i:i+_n] = self._evaluate_fit_function(fit, parameter_values[_ids])
+            i += _n
+
+        # sum up the chi2 contributions of all blocks
+        _residual = _ydata - _fdata
+        _chi2 = 0.
+        for _group_number, _idx in enumerate(self._cov_mat_group_indices):
+            _solve, _factor = self._get_cov_mat_factorization(_group_number)
+            _r = _residual[_idx]
+            _chi2 += _r.dot(_solve(_factor, _r, check_finite=False))
 
-            def tmp_fit_function(x):
-                return fit.fit_function(x, *_parameter_values)
+        return _chi2
 
-            _dummy_ydata = fit.ydata
-            _dummy_fdata = np.asarray(list(map(tmp_fit_function, fit.xdata)))
-            for j, data in enumerate(_dummy_fdata):
-                _ydata[i] = _dummy_ydata[j]
-                _fdata[i] = _dummy_fdata[j]
-                i += 1
+    def _evaluate_fit_function(self, fit, parameter_values):
+        '''
+        Returns the values of the fit function of `fit` at its `x` data points
+        as a `float64` array.
+        '''
+        _fit_function = fit.fit_function
+        return np.fromiter((_fit_function(x, *parameter_values) for x in fit.xdata),
+                           dtype=np.float64, count=len(fit.xdata))
 
-        _chi2 = chi2(_ydata, self.current_cov_mat, _fdata)
+    def _solve_linear_parameters(self, parameter_values):
+        '''
+        Calculates the values of the profiled linear parameters which minimize
+        :math:`\chi^2` for the given values of the other parameters, by solving
+        the weighted least-squares problem. Returns a copy of
+        `parameter_values` with these values inserted and the covariance
+        matrix of the linear parameters (for fixed other parameters).
+        '''
+        parameter_values = np.asarray(parameter_values, dtype=np.float64)
+        _profiled = self._profiled_parameter_ids
+        _ydata = np.empty(self._number_of_datapoints)
+        _offset = np.empty(self._number_of_datapoints)
+        _basis = np.zeros((self._number_of_datapoints, len(_profiled)))
+        i = 0
+        for fit, _ids in zip(self.fit_list,
+                             self.parameter_space.get_parameter_index_arrays()):
+            _n = len(fit.xdata)
+            _ydata[i:i+_n] = fit.ydata
+            _local = np.flatnonzero(np.in1d(_ids, _profiled))
+            if len(_local):
+                _offset[i:i+_n], _fit_basis = fit.fit_function.linear_basis(
+                    fit.xdata, parameter_values[_ids], _local)
+                for k, _col in enumerate(np.searchsorted(_profiled, _ids[_local])):
+                    _basis[i:i+_n, _col] += _fit_basis[:, k]
+            else:
+                _offset[i:i+_n] = self._evaluate_fit_function(fit, parameter_values[_ids])
+            i += _n
 
-        return _chi2
+        _weighted_basis = 0.5 * self._apply_inverse_cov_mat(_basis)
+        _normal_matrix = _basis.T.dot(_weighted_basis)
+        _rhs = _weighted_basis.T.dot(_ydata - _offset)
+
+        _values = parameter_values.copy()
+        _values[_profiled] = np.linalg.lstsq(_normal_matrix, _rhs, rcond=None)[0]
+        return _values, np.linalg.pinv(_normal_matrix)
+
+    def _start_linear_profiling(self):
+        '''
+        Eliminates the free linear parameters from the minimization by fixing
+        them in the minimizer and solving for them in each call of the `FCN`.
+        Returns ``True`` if any parameter is profiled.
+        '''
+        _fixed_ids = self.parameter_space.get_parameter_ids(self._fixed_parameter_names)
+        _ids = sorted(set(self.parameter_space.get_parameter_ids(self._linear_parameter_names))
+                      - set(_fixed_ids))
+        if not _ids:
+            return False
+        if len(_ids) == self.total_number_of_parameters - len(_fixed_ids):
+            # keep one parameter for the minimizer
+            _ids = _ids[1:]
+
+        logger.debug("Profiling linear parameters %s" % (_ids,))
+        self._profiled_parameter_ids = np.array(_ids, dtype=np.intp)
+        self.minimizer.fix_parameters(_ids)
+        return True
+
+    def _stop_linear_profiling(self):
+        '''
+        Inserts the solution for the profiled linear parameters into the
+        minimizer and releases them again. The parameters are released even
+        if the solution fails.
+        '''
+        _ids = self._profiled_parameter_ids
+        try:
+            _values, _cov_mat = self._solve_linear_parameters(
+                self.current_parameter_values_minuit)
+        finally:
+            self.minimizer.release_parameters(list(_ids))
+            self._profiled_parameter_ids = None
+        _errors = np.array(self.current_parameter_errors_minuit, dtype=np.float64)
+        _errors[_ids] = np.sqrt(np.abs(np.diag(_cov_mat)))
+
+        self.current_parameter_values_minuit = list(_values)
+        self.current_parameter_errors_minuit = list(_errors)
+        self.minimizer.set_parameter_values(self.current_parameter_values_minuit)
+        self.minimizer.set_parameter_errors(self.current_parameter_errors_minuit)
+
+    def _apply_inverse_cov_mat(self, vector, group_number=None):
+        '''
+        Multiplies `vector` (or the rows of a matrix) with
+        :math:`C^{-1} + C^{-T}` using the factorized covariance matrix blocks.
+        If `group_number` is given, `vector` only contains the data points of
+        that block.
+        '''
+        if group_number is None:
+            _result = np.empty_like(vector, dtype=np.float64)
+            for _group_number, _idx in enumerate(self._cov_mat_group_indices):
+                _result[_idx] = self._apply_inverse_cov_mat(vector[_idx], _group_number)
+            return _result
+
+        _solve, _factor = self._get_cov_mat_factorization(group_number)
+        if _solve is cho_solve:
+            return 2. * cho_solve(_factor, vector, check_finite=False)
+        return (lu_solve(_factor, vector, check_finite=False) +
+                lu_solve(_factor, vector, trans=1, check_finite=False))
+
+    def _calculate_jacobian(self, parameter_values):
+        '''
+        Calculates the residuals of all data points and the derivatives of
+        the fit functions by the (free) parameters. Since the function values
+        of a dataset only depend on the parameters of its own fit function,
+        only that dataset is evaluated when a parameter is varied.
+
+        Returns the residuals and a list with a tuple (`ids`, `jacobian`) for
+        each dataset, where `jacobian` has a column for each parameter id
+        in `ids`.
+        '''
+        parameter_values = np.asarray(parameter_values, dtype=np.float64)
+        _fixed = np.zeros(self.total_number_of_parameters, dtype=bool)
+        _fixed[self.parameter_space.get_parameter_ids(self._fixed_parameter_names)] = True
+
+        _residual = np.empty(self._number_of_datapoints)
+        _jacobians = []
+        i = 0
+        for fit, _ids in zip(self.fit_list,
+                             self.parameter_space.get_parameter_index_arrays()):
+            _values = parameter_values[_ids]
+            _n = len(fit.xdata)
+            _residual[i:i+_n] = fit.ydata - self._evaluate_fit_function(fit, _values)
+
+            # central differences for all free parameters of this dataset
+            _free = np.flatnonzero(~_fixed[_ids])
+            _jacobian = np.empty((_n, len(_free)))
+            for k, _par in enumerate(_free):
+                _step = _JACOBIAN_STEP * max(abs(_values[_par]), 1.)
+                _up, _down = _values.copy(), _values.copy()
+                _up[_par] += _step
+                _down[_par] -= _step
+                _jacobian[:, k] = (self._evaluate_fit_function(fit, _up) -
+                                   self._evaluate_fit_function(fit, _down)) / (2. * _step)
+            _jacobians.append((_ids[_free], _jacobian))
+            i += _n
+
+        return _residual, _jacobians
+
+    def _call_external_gradient(self, parameter_values):
+        '''
+        Returns the gradient of :math:`\chi^2` by all parameters, calculated
+        from the sparse Jacobian. Passed to the minimizer in structured mode.
+
+        While linear parameters are profiled, the gradient is evaluated at the
+        solved linear parameters, and it is zero for the profiled parameters,
+        since the minimized `FCN` does not depend on them.
+        '''
+        if self._profiled_parameter_ids is not None:
+            parameter_values = self._solve_linear_parameters(parameter_values)[0]
+
+        _residual, _jacobians = self._calculate_jacobian(parameter_values)
+        _weighted_residual = self._apply_inverse_cov_mat(_residual)
+
+        _gradient = np.zeros(self.total_number_of_parameters)
+        i = 0
+        for _ids, _jacobian in _jacobians:
+            _n = _jacobian.shape[0]
+            np.add.at(_gradient, _ids, -_jacobian.T.dot(_weighted_residual[i:i+_n]))
+            i += _n
+        if self._profiled_parameter_ids is not None:
+            _gradient[self._profiled_parameter_ids] = 0.
+        return _gradient
+
+    def _build_normal_equations(self, residual, jacobians):
+        '''
+        Builds the sparse normal matrix :math:`J^T C^{-1} J` and the right hand
+        side :math:`J^T C^{-1} r` of the Gauss-Newton equations. Each block of
+        correlated datasets only contributes to the rows and columns of its own
+        parameters, so the matrix is block-sparse (arrow-shaped for parameters
+        shared between all datasets).
+        '''
+        _offsets = np.concatenate(([0], np.cumsum([_jacobian.shape[0]
+                                                   for _ids, _jacobian in jacobians])))
+        _rhs = np.zeros(self.total_number_of_parameters)
+        _rows, _cols, _entries = [], [], []
+        for _group_number, (_group, _idx) in enumerate(zip(self._cov_mat_groups,
+                                                           self._cov_mat_group_indices)):
+            _group_ids = np.unique(np.concatenate([jacobians[i][0] for i in _group]))
+            if not len(_group_ids):
+                continue
+
+            # dense Jacobian of this block, one column for each of its parameters
+            _jacobian = np.zeros((sum(_offsets[i+1] - _offsets[i] for i in _group),
+                                  len(_group_ids)))
+            _row = 0
+            for i in _group:
+                _ids, _fit_jacobian = jacobians[i]
+                _n = _fit_jacobian.shape[0]
+                for k, _col in enumerate(np.searchsorted(_group_ids, _ids)):
+                    _jacobian[_row:_row+_n, _col] += _fit_jacobian[:, k]
+                _row += _n
+
+            _weighted_jacobian = self._apply_inverse_cov_mat(_jacobian, _group_number)
+            _rhs[_group_ids] += 0.5 * _weighted_jacobian.T.dot(residual[_idx])
+            _block = 0.5 * _jacobian.T.dot(_weighted_jacobian)
+            _r, _c = np.meshgrid(_group_ids, _group_ids, indexing='ij')
+            _rows.append(_r.ravel())
+            _cols.append(_c.ravel())
+            _entries.append(_block.ravel())
+
+        _n_par = self.total_number_of_parameters
+        if not _entries:
+            return coo_matrix((_n_par, _n_par)).tocsr(), _rhs
+        _normal_matrix = coo_matrix((np.concatenate(_entries),
+                                     (np.concatenate(_rows), np.concatenate(_cols))),
+                                    shape=(_n_par, _n_par)).tocsr()
+        return _normal_matrix, _rhs
 
     # Fit Workflow
     ###############
 
-    def do_fit(self, quiet=False, verbose=False):
+    def gauss_newton_fit(self, max_iterations=20, tolerance=1e-6):
+        '''
+        Minimizes :math:`\chi^2` with damped Gauss-Newton (Levenberg-Marquardt)
+        steps, starting from the current parameter values. The Jacobian is
+        calculated dataset by dataset and the normal equations are solved as a
+        sparse linear system, so that fits with many parameters of single
+        datasets remain fast. The result is used as starting point for the
+        minimizer. Fixed parameters are not changed.
+
+        The covariance matrix is kept constant, so the projection of `x` errors
+        is left to :py:meth:`do_fit`.
+
+        Keyword Arguments
+        -----------------
+
+        max_iterations : int, optional
+            Maximum number of Gauss-Newton steps.
+
+        tolerance : float, optional
+            Stop if :math:`\chi^2` decreases by less than this fraction.
+        '''
+        if self._minuit_lists_outdated:
+            self._init_minimizer()
+
+        _values = np.array(self.current_parameter_values_minuit, dtype=np.float64)
+        _chi2 = self._call_external_fcn(_values)
+        _damping = 1e-3
+        _iteration = 0
+        while _iteration < max_iterations:
+            _iteration += 1
+            _residual, _jacobians = self._calculate_jacobian(_values)
+            _normal_matrix, _rhs = self._build_normal_equations(_residual, _jacobians)
+
+            # only parameters the data depend on can be determined
+            _free = np.flatnonzero(_normal_matrix.diagonal() > 0)
+            if not len(_free):
+                break
+            _normal_matrix = _normal_matrix[_free][:, _free]
+            _diagonal = diags(_normal_matrix.diagonal())
+
+            # increase the damping until chi2 decreases
+            _new_chi2 = np.inf
+            while _damping < 1e10:
+                _step = spsolve((_normal_matrix + _damping * _diagonal).tocsc(), _rhs[_free])
+                _new_values = _values.copy()
+                _new_values[_free] += _step
+                _new_chi2 = self._call_external_fcn(_new_values)
+                if np.isfinite(_new_chi2) and _new_chi2 <= _chi2:
+                    break
+                _damping *= 10.
+            if not _new_chi2 <= _chi2:
+                break  # no further improvement possible
+
+            _converged = _chi2 - _new_chi2 <= tolerance * max(_new_chi2, 1.)
+            _values, _chi2 = _new_values, _new_chi2
+            _damping = max(_damping / 10., 1e-12)
+            if _converged:
+                break
+
+        logger.info("Gauss-Newton fit: chi2 = %g after %d iterations" % (_chi2, _iteration))
+        self.current_parameter_values_minuit = list(_values)
+        if self._minimizer_handle:
+            self.minimizer.set_parameter_values(self.current_parameter_values_minuit)
+
+    def prefit(self, processes=None):
+        '''
+        Seeds the global minimization with the results of independent fits of
+        each dataset. Every dataset is fitted on its own, starting from the current
+        parameter values, in a pool of worker processes. The sub-fits are done with
+        new `Fit` objects, parameters fixed in the `Multifit` are fixed in them, too.
+        Linked parameters are combined by inverse-variance averaging of the sub-fit
+        results, which are then used as starting values and step sizes for the
+        minimizer. Fixed parameters are not changed.
+
+        If processes cannot be forked on this platform, the sub-fits are
+        done one after the other.
+
+        Keyword Arguments
+        -----------------
+
+        processes : int, optional
+            Number of worker processes. Defaults to the number of CPUs. If set
+            to 1, no worker processes are started.
+        '''
+        global _prefit_fit_list
+
+        if self._minuit_lists_outdated:
+            self._init_minimizer()
+        self._store_parameters_in_fits()
+
+        _fixed_ids = self.parameter_space.get_parameter_ids(self._fixed_parameter_names)
+        _jobs = [(_fit_id, fit.current_parameter_values, fit.current_parameter_errors,
+                  np.flatnonzero(np.in1d(_ids, _fixed_ids)))
+                 for _fit_id, (fit, _ids) in enumerate(
+                     zip(self.fit_list, self.parameter_space.get_parameter_index_arrays()))]
+
+        _context = None
+        if processes != 1 and len(self.fit_list) > 1:
+            try:
+                _context = multiprocessing.get_context('fork')
+            except AttributeError:
+                # Python 2: worker processes are always forked on Unix
+                _context = multiprocessing
+            except ValueError:
+                logger.info("Cannot fork processes. Doing sub-fits sequentially.")
+
+        # worker processes inherit the list of fits from this process
+        _prefit_fit_list = self.fit_list
+        try:
+            if _context is not None:
+                logger.info("Fitting %d datasets in worker processes" % (len(self.fit_list),))
+                _pool = _context.Pool(processes)
+                try:
+                    _results = _pool.map(_prefit_worker, _jobs)
+                finally:
+                    _pool.close()
+                    _pool.join()
+            else:
+                _results = [_prefit_worker(_job) for _job in _jobs]
+        finally:
+            _prefit_fit_list = None
+
+        # combine the results: inverse-variance weighted average for each parameter
+        _sum_of_weights = np.zeros(self.total_number_of_parameters)
+        _weighted_sum = np.zeros(self.total_number_of_parameters)
+        for _ids, _result in zip(self.parameter_space.get_parameter_index_arrays(), _results):
+            if _result is None:
+                continue
+            _values, _errors = _result
+            _valid = np.isfinite(_values) & np.isfinite(_errors) & (_errors > 0)
+            _weights = 1. / _errors[_valid] ** 2
+            np.add.at(_sum_of_weights, _ids[_valid], _weights)
+            np.add.at(_weighted_sum, _ids[_valid], _weights * _values[_valid])
+
+        _seeded = _sum_of_weights > 0
+        _seeded[_fixed_ids] = False
+        for id in np.flatnonzero(_seeded):
+            self.current_parameter_values_minuit[id] = _weighted_sum[id] / _sum_of_weights[id]
+            self.current_parameter_errors_minuit[id] = 1. / np.sqrt(_sum_of_weights[id])
+        logger.info("Seeded %d of %d parameters from sub-fits"
+                    % (np.count_nonzero(_seeded), self.total_number_of_parameters))
+
+        if self._minimizer_handle:
+            self.minimizer.set_parameter_values(self.current_parameter_values_minuit)
+            self.minimizer.set_parameter_errors(self.current_parameter_errors_minuit)
+
+    def do_fit(self, quiet=False, verbose=False, prefit=False):
         '''
         Runs the fit algorithm for this `MultiFit` object.
 
@@ -707,39 +1497,71 @@ class Multifit(object):
 
         verbose : boolean, optional
             Set to ``True`` if more output should be printed.
+
+        prefit : boolean, optional
+            Set to ``True`` to seed the minimizer with the results of
+            independent fits of each dataset, see :py:meth:`prefit`.
         '''
 
         # Check if lists are up to date. If not recalculate them
         if self._minuit_lists_outdated:
             self._init_minimizer()
+        if prefit:
+            self.prefit()
+        _strategy = None
+        if self.structured:
+            self.gauss_newton_fit()
+            if self._minimizer_handle:
+                # the minimizer starts close to the minimum, and HESSE is
+                # run for the final fit anyway
+                _strategy = getattr(self.minimizer, 'strategy', 1)
+                self.minimizer.set_strategy(0)
         if self._minimizer_handle:
-            max_x_iterations = 10
-            logger.debug("Calling Minuit")
-            self._call_minimizer(final_fit=True, verbose=verbose)
-            # if the dataset has x errors, project onto the current error matrix
-            if self.first_cov_mat_x is not None:
-                logger.debug("Dataset has `x` errors. Iterating for `x` error.")
-                iter_nr = 0
-                while iter_nr < max_x_iterations:
-
-                    old_matrix = copy(self.current_cov_mat)
-                    self._project_x_covariance_matrix()
-                    logger.debug("`x` fit iteration %d" % (iter_nr,))
-                    if iter_nr == 0:
-                        self._call_minimizer(final_fit=False, verbose=verbose)
-                    else:
-                        self._call_minimizer(final_fit=True, verbose=verbose)
-                    new_matrix = self.current_cov_mat
-
-                    # stop if the matrix has not changed within tolerance)
-                    # GQ: adjusted precision: rtol 1e-4 on cov-matrix is
-                    # clearly sufficient
-                    if np.allclose(old_matrix, new_matrix, atol=0, rtol=1e-4):
-                        logger.debug("Matrix for `x` fit iteration has converged.")
-                        break  # interrupt iteration
-                    iter_nr += 1
-
-            self.par_cov_mat = self.get_error_matrix()
+            try:
+                max_x_iterations = 10
+                # eliminate linear parameters from the minimization
+                _profiling = self._start_linear_profiling()
+                try:
+                    logger.debug("Calling Minuit")
+                    self._call_minimizer(final_fit=not _profiling, verbose=verbose)
+                    # if the dataset has x errors, project onto the current error matrix
+                    if self._cov_mat_blocks_x is not None:
+                        logger.debug("Dataset has `x` errors. Iterating for `x` error.")
+                        iter_nr = 0
+                        while iter_nr < max_x_iterations:
+
+                            old_blocks = self._cov_mat_blocks
+                            self._project_x_covariance_matrix()
+                            logger.debug("`x` fit iteration %d" % (iter_nr,))
+                            if iter_nr == 0 or _profiling:
+                                self._call_minimizer(final_fit=False, verbose=verbose)
+                            else:
+                                self._call_minimizer(final_fit=True, verbose=verbose)
+                            new_blocks = self._cov_mat_blocks
+
+                            # stop if the matrix has not changed within tolerance)
+                            # GQ: adjusted precision: rtol 1e-4 on cov-matrix is
+                            # clearly sufficient
+                            if all(np.allclose(old_matrix, new_matrix, atol=0, rtol=1e-4)
+                                   for old_matrix, new_matrix in zip(old_blocks, new_blocks)):
+                                logger.debug("Matrix for `x` fit iteration has converged.")
+                                break  # interrupt iteration
+                            iter_nr += 1
+                finally:
+                    # release the profiled parameters, also if the fit failed
+                    if _profiling:
+                        self._stop_linear_profiling()
+
+                # minimize with all parameters, starting at the minimum, to get
+                # the full parameter errors and correlations
+                if _profiling:
+                    self._call_minimizer(final_fit=True, verbose=verbose)
+
+                self.par_cov_mat = self.get_error_matrix()
+            finally:
+                # restore the strategy of the minimizer
+                if _strategy is not None:
+                    self.minimizer.set_strategy(_strategy)
 
 
             # determine, retrieve and analyze errors from MINOS algorithm
@@ -779,6 +1601,34 @@ class Multifit(object):
     # Private Methods
     ##################
 
+    def _store_parameters_in_fits(self):
+        '''
+        Writes the current parameter values (and non-zero errors) of the
+        minimizer lists back to the fits, so that a new minimizer starts
+        from them.
+        '''
+        if self._minuit_lists_outdated or self.current_parameter_values_minuit is None:
+            return
+        _values = np.asarray(self.current_parameter_values_minuit, dtype=float)
+        _errors = np.asarray(self.current_parameter_errors_minuit, dtype=float)
+        for fit, _ids in zip(self.fit_list, self.parameter_space.get_parameter_index_arrays()):
+            fit.current_parameter_values = list(_values[_ids])
+            fit.current_parameter_errors = [_err if _err else _old_err for _err, _old_err
+                                            in zip(_errors[_ids], fit.current_parameter_errors)]
+
+    def _reinit_minimizer(self):
+        '''
+        Creates a new minimizer for the current parameter space and fixes
+        all parameters which were fixed before.
+        '''
+        self._init_minimizer()
+        _par_ids = self.parameter_space.get_parameter_ids(self._fixed_parameter_names)
+        if self._minimizer_handle and _par_ids:
+            self.minimizer.fix_parameters(_par_ids)
+        for id in _par_ids:
+            self.current_parameter_errors_minuit[id] = 0
+        self.number_of_fixed_parameters = len(_par_ids)
+
     def _calculate_minuit_lists(self):
         '''
         Recalculates or creates all lists which the minimizer needs for his workflow.
@@ -801,10 +1651,14 @@ class Multifit(object):
         # Init the minimizer
         self._calculate_minuit_lists()
         if self._minimizer_handle:
+            _kwargs = dict()
+            if self.structured:
+                _kwargs['gradient'] = self._call_external_gradient
             self.minimizer = self._minimizer_handle(self.total_number_of_parameters,
                                                     self._call_external_fcn, self.parameter_names_minuit,
                                                     self.current_parameter_values_minuit,
-                                                    self.current_parameter_errors_minuit, quiet=self.quiet_minuit)
+                                                    self.current_parameter_errors_minuit, quiet=self.quiet_minuit,
+                                                    **_kwargs)
 
             # set Minuit's initial parameters and parameter errors
             #            may be overwritten via ``set_parameters``
@@ -832,6 +1686,10 @@ class Multifit(object):
 
         self.current_parameter_values_minuit = list(self.minimizer.get_parameter_values())
         self.current_parameter_errors_minuit = list(self.minimizer.get_parameter_errors())
+        if self._profiled_parameter_ids is not None:
+            # the minimizer does not know the values of the profiled parameters
+            self.current_parameter_values_minuit = list(
+                self._solve_linear_parameters(self.current_parameter_values_minuit)[0])
 
     def _project_x_covariance_matrix(self):
         r'''
@@ -850,7 +1708,10 @@ class Multifit(object):
         logger.debug("Projecting `x` covariance matrix.")
 
         # use 1/100th of the smallest error as spacing for df/dx
-        precision_list = 0.01 * np.sqrt(np.diag(self.current_cov_mat))
+        _diag = np.empty(self._number_of_datapoints)
+        for _idx, _block in zip(self._cov_mat_group_indices, self._cov_mat_blocks):
+            _diag[_idx] = np.diag(_block)
+        precision_list = 0.01 * np.sqrt(_diag)
 
         if min(precision_list) == 0:
             logger.warn('At least one input error is zero - set to 1e-7')
@@ -864,12 +1725,18 @@ class Multifit(object):
                                                      self.parameter_space.get_current_parameter_values(self.current_parameter_values_minuit, fit.fit_function)))
 
 
-        outer_prod = outer_product(np.concatenate(_tmp))
+        _derivatives = np.concatenate(_tmp)
 
-        proj_xcov_mat = np.asarray(self.first_cov_mat_x) * outer_prod
+        # project blockwise
+        _blocks = []
+        for _idx, _block_y, _block_x in zip(self._cov_mat_group_indices,
+                                            self._cov_mat_blocks_y,
+                                            self._cov_mat_blocks_x):
+            outer_prod = outer_product(_derivatives[_idx])
+            proj_xcov_mat = np.asarray(_block_x) * outer_prod
+            _blocks.append(_block_y + np.asmatrix(proj_xcov_mat))
 
-        self.current_cov_mat = self.first_cov_mat_y + \
-                               np.asmatrix(proj_xcov_mat)
+        self._set_current_cov_mat_blocks(_blocks)
 
     # Output functions
     ###################
@@ -880,14 +1747,12 @@ class Multifit(object):
 
         '''
         Cor = MinuitCov_to_cor(self.par_cov_mat)
-        number_of_parameters = len(fit.parameter_names)
-        new_cor = np.zeros((number_of_parameters,number_of_parameters))
-        dummy = self.parameter_space.fit_to_parameter_id(fit)
+        ids = np.asarray(self.parameter_space.fit_to_parameter_id(fit),
+                         dtype=int)
 
-        # Create a new correlation Matrix
-        for i, id1 in enumerate(dummy):
-            for j, id2 in enumerate(dummy):
-                new_cor[i][j] = Cor[id1][id2]
+        # Create a new correlation Matrix from the rows/columns of the
+        # global matrix belonging to this fit
+        new_cor = Cor[np.ix_(ids, ids)]
 
         # Calculate new covariance matrix
         new_cov = cor_to_cov(new_cor, fit.final_parameter_errors)
@@ -1443,37 +2308,87 @@ class _ParameterSpace(object):
         # Dictionary which takes a parameter name as a key and gives back the linked parameter
         self.alias = {}
 
+        # Dictionary which holds the function as a key and the array of the global
+        # parameter ids of its parameters as value. Compiled in _update_parameter_to_id.
+        self._function_to_ids = {}
+
+        # Dictionary which takes a parameter name without the function name as a key and
+        # gives back the full name (function_name.parameter_name) of its first occurrence
+        self._short_to_full_name = {}
+
         self.fit_list = fit_list
 
         for fit in self.fit_list:
-            # Set the beginning values for each parameter
-            _tmp = []
-            for i in range(len(fit.fit_function.parameter_names)):
-                _tmp.append(fit.fit_function.name + str(".") + fit.fit_function.parameter_names[i])
-                self.total_number_of_parameters += 1
-            # Create dictionary entry for each function with the given parameters as values
-            self.function_to_parameter.update({fit.fit_function: _tmp})
+            self._register_fit(fit)
 
         self.build_current_parameter()
 
+    def _register_fit(self, fit):
+        '''
+        Creates the parameter names for the parameters of a fit.
+        '''
+        # Set the beginning values for each parameter
+        _tmp = []
+        for i in range(len(fit.fit_function.parameter_names)):
+            _tmp.append(fit.fit_function.name + str(".") + fit.fit_function.parameter_names[i])
+            self._short_to_full_name.setdefault(fit.fit_function.parameter_names[i], _tmp[-1])
+            self.total_number_of_parameters += 1
+        # Create dictionary entry for each function with the given parameters as values
+        self.function_to_parameter.update({fit.fit_function: _tmp})
+        self.parameter_changed_bool = True
+
+    def add_fit(self, fit):
+        '''
+        Adds a fit to the parameter space. Its parameters are not linked.
+        '''
+        if fit.fit_function in self.function_to_parameter:
+            raise ValueError("Fit function '%s' is already part of the Multifit."
+                             % (fit.fit_function.name,))
+        self.fit_list.append(fit)
+        self._register_fit(fit)
+
+    def remove_fit(self, fit):
+        '''
+        Removes a fit from the parameter space. Links of other parameters through
+        the parameters of the removed fit are kept.
+        '''
+        self.fit_list.remove(fit)
+        _removed = self.function_to_parameter.pop(fit.fit_function)
+        for param in _removed:
+            _target = self.alias.pop(param, None)
+            # reconnect the parameters which were linked to the removed one
+            _linked = [_key for _key, _value in self.alias.items() if _value == param]
+            if _target is None and _linked:
+                # the removed parameter was the end of the alias chain
+                _target = _linked.pop(0)
+                del self.alias[_target]
+            for _key in _linked:
+                self.alias[_key] = _target
+
+        self._short_to_full_name = {}
+        for _fit in self.fit_list:
+            for param, _full_name in zip(_fit.fit_function.parameter_names,
+                                         self.function_to_parameter[_fit.fit_function]):
+                self._short_to_full_name.setdefault(param, _full_name)
+
+        self.total_number_of_parameters = sum(
+            len(_params) for _params in self.function_to_parameter.values()) - len(self.alias)
+        self.parameter_changed_bool = True
+
     def autolink_parameters(self):
         '''
         Autolinks all parameters with the same name.
         '''
-        # Get first parameter tupel
-        for i, fit in enumerate( self.fit_list):
-            # Get second parameter tupel. Note that to avoid doing the comparison a
-            # second time only tupels ahead in the list will be taken.
-            for j in range(i + 1, len( self.fit_list)):
-                # Iterate over each tupel
-                for param1 in fit.parameter_names:
-                    for param2 in  self.fit_list[j].parameter_names:
-                        # Check if the parameter name after the function name is the same
-                        if param1 == param2:
-                            # Link both parameters together
-                            self.parameter_changed_bool = True
-                            self.link_parameters(fit.fit_function.name + str('.') + param1,
-                                                 self.fit_list[j].fit_function.name + str('.') + param2)
+        # Group the full parameter names by the parameter name
+        _name_to_group = {}
+        for fit in self.fit_list:
+            for param in fit.parameter_names:
+                _name_to_group.setdefault(param, []).append(fit.fit_function.name + str('.') + param)
+
+        # Link all parameters of a group to the first one
+        for _group in _name_to_group.values():
+            for param in _group[1:]:
+                self._link(_group[0], param)
 
     def link_parameters(self, param1, param2):
         '''
@@ -1496,39 +2411,37 @@ class _ParameterSpace(object):
         # parameter_name
 
         param1, param2 = self._convert_parameter_names(param1, param2)
+        if not self._link(param1, param2):
+            # Give a warning for the user
+            logger.warning("Deleted already linked parameters")
+
+    def _find_root(self, param):
+        '''
+        Follows the alias chain of a parameter and returns the parameter at its end,
+        which represents all parameters linked to it.
+        '''
+        while param in self.alias:
+            param = self.alias[param]
+        return param
+
+    def _link(self, param1, param2):
+        '''
+        Links two parameters given by their full names by joining their alias chains.
+        Returns ``False`` if the parameters were already linked (which would create
+        a loop in self.alias), ``True`` otherwise.
+        '''
+        _root1, _root2 = self._find_root(param1), self._find_root(param2)
+        if _root1 == _root2:
+            return False
+
         # A link between two parameters reduces the number of total parameters by one
         self.total_number_of_parameters -= 1
         self.parameter_changed_bool = True
-
-        # Check if param2 is already a key.
-        if param2 in self.alias:
-            # If param2 is already a key try param1 as a key.
-            self.alias.update({param1: param2})
-            # Look if you can go through self.alias and end on param1. If so, a loop was
-            # created. Delete the last entry in self.alias which caused the loop
-            _param = param1
-            while _param in self.alias:
-                _param = self.alias[_param]
-
-                if _param == param1:
-                    # Give a warning for the user
-                    logger.warn("Deleted already linked parameters")
-                    del self.alias[param1]
-                    self.total_number_of_parameters += 1
-                    break
+        if _root2 == param2:
+            self.alias[param2] = _root1
         else:
-            self.alias.update({param2: param1})
-            # Look if you can go through self.alias and end on param2. If so, a loop was
-            # created. Delete the last entry in self.alias which caused the loop
-            _param = param2
-            while _param in self.alias:
-                _param = self.alias[_param]
-                if _param == param2:
-                    # Give a warning for the user
-                    logger.warn("Deleted already linked parameters")
-                    del self.alias[param2]
-                    self.total_number_of_parameters += 1
-                    break
+            self.alias[_root1] = _root2
+        return True
 
     def delink(self, param1, param2):
         '''
@@ -1570,21 +2483,11 @@ class _ParameterSpace(object):
         Checks if the parameters are given in the function_name.parameter_name style. If so returns those names
         If not creates those names.
         '''
+        if "." not in param1:
+            param1 = self._short_to_full_name.get(param1, param1)
         if param2:
-            if "." not in param1 or "." not in param2:
-                for fit in self.fit_list:
-                    for param in fit.parameter_names:
-                        if param == param1:
-                            param1 = fit.fit_function.name + str('.') + param
-                        elif param == param2:
-                            param2 = fit.fit_function.name + str('.') + param
-        else:
-            if "." not in param1:
-                for fit in self.fit_list:
-                    for param in fit.parameter_names:
-                        if param == param1:
-                            param1 = fit.fit_function.name + str('.') + param
-        if param2 :
+            if "." not in param2:
+                param2 = self._short_to_full_name.get(param2, param2)
             return param1, param2
         else:
             return param1
@@ -1606,8 +2509,30 @@ class _ParameterSpace(object):
                     dic.update({fit.fit_function.name + str(".") + parameter_name: id_counter})
                     id_counter += 1
         self.parameter_to_id = dic
+
+        # Compile the ids of each function's parameters into an index array, so that
+        # no alias chains have to be followed when the parameter values are needed
+        self._function_to_ids = {}
+        for function, parameters in self.function_to_parameter.items():
+            _ids = []
+            for param in parameters:
+                while param not in self.parameter_to_id:
+                    param = self.alias[param]
+                _ids.append(self.parameter_to_id[param])
+            self._function_to_ids[function] = np.asarray(_ids, dtype=np.intp)
+
         self.parameter_changed_bool = False
 
+    def get_parameter_index_arrays(self):
+        '''
+        Returns a list with an array of global parameter ids for each fit in
+        self.fit_list. Indexing the array of all parameter values with such an
+        array gives the parameter values of the corresponding fit function.
+        '''
+        if self.parameter_changed_bool:
+            self._update_parameter_to_id()
+        return [self._function_to_ids[fit.fit_function] for fit in self.fit_list]
+
     def get_current_parameter_values(self, current_parameter_values, function):
         '''
         Builds the current parameter values for each function with the results from
@@ -1618,9 +2543,10 @@ class _ParameterSpace(object):
         Parameters
         ----------
 
-        **current_parameter_values**: List
+        **current_parameter_values**: List or `numpy.ndarray`
             List with the current parameter values from the minimizer. List is sorted
-            after the ids from self.parameter_to_id.
+            after the ids from self.parameter_to_id. If an array is given, an array is
+            returned.
 
         **fit_function** : function
             A user-defined Python function to fit to the data.
@@ -1630,24 +2556,11 @@ class _ParameterSpace(object):
         if self.parameter_changed_bool:
             self._update_parameter_to_id()
 
-        # Create list to store results
-
-        _parameter_values = [0] * len(self.function_to_parameter[function])
-        j = 0
-        for param in self.function_to_parameter[function]:
-            # Get the parameter ids
-            if param in self.parameter_to_id:
-                _parameter_values[j] = current_parameter_values[self.parameter_to_id[param]]
-            else:
-                # If id was not found the parameter is linked and has to be translated via self.alias
-                # until the parameter id is found
-                _param = self.alias[param]
-                while _param not in self.parameter_to_id:
-                    _param = self.alias[_param]
-                _parameter_values[j] = current_parameter_values[self.parameter_to_id[_param]]
-            j += 1
+        _ids = self._function_to_ids[function]
+        if isinstance(current_parameter_values, np.ndarray):
+            return current_parameter_values[_ids]
 
-        return _parameter_values
+        return [current_parameter_values[_id] for _id in _ids]
 
     def build_current_parameter(self):
         '''
@@ -1690,20 +2603,9 @@ class _ParameterSpace(object):
         '''
         Takes a fit as an argument an gives the ids of the parameter as a list back.
         '''
-        dummy = []
-        # Get parameter_ids from the fit
-        for i, parameter in enumerate(fit.parameter_names):
-            parameter = fit.fit_function.name + str('.') + parameter
-            if parameter in self.parameter_to_id:
-                id = self.parameter_to_id[parameter]
-            else:
-                _param = self.alias[parameter]
-                while _param not in self.parameter_to_id:
-                    _param = self.alias[_param]
-                id = self.parameter_to_id[_param]
-
-            dummy.append(id)
-        return dummy
+        if self.parameter_changed_bool:
+            self._update_parameter_to_id()
+        return self._function_to_ids[fit.fit_function].tolist()
 
     def get_parameter_ids(self, parameter):
         '''
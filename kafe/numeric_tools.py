@@ -16,8 +16,12 @@
 #                  for lines/colums corresponding to fixed parameters;
 #                  made a special version of cov_to_cor,
 #                  MinuitCov_to_cor for this case
+#     18-Oct-26    MinuitCov_to_cor vectorized, computes in float64
+#                  added cholesky_extend for bordered Cholesky updates
+#                  added cholesky_update for rank-one Cholesky updates
 
 import numpy as np
+from scipy.linalg import cholesky, solve_triangular
 
 def cov_to_cor(cov_mat):
     r'''
@@ -67,14 +71,15 @@ def MinuitCov_to_cor(cov_mat):
         The Minuit covariance matrix to convert.
     '''
 
+    cov_mat = np.asarray(cov_mat, dtype=np.float64)
     err = np.sqrt(np.diag(cov_mat))  # extract the errors
-    dim=len(err)
-    cor_mat=np.zeros((dim,dim),np.float32)
-    for i in range(0,dim):
-      for j in range(0,dim):
-          e2=err[i]*err[j]
-          if e2 != 0. :
-            cor_mat[i,j]=cov_mat[i,j]/e2
+
+    # outer product of the errors; entries are zero in the
+    # rows/columns of fixed parameters, which are left at zero
+    stat_err_outer_prod = np.outer(err, err)
+    cor_mat = np.zeros_like(cov_mat)
+    np.divide(cov_mat, stat_err_outer_prod, out=cor_mat,
+              where=(stat_err_outer_prod != 0.))
     return cor_mat
 
 def cor_to_cov(cor_mat, error_list):
@@ -171,3 +176,89 @@ def make_symmetric_lower(mat):
     tmp_mat += np.triu(tmp_mat.transpose(), 1)
 
     return np.asmatrix(tmp_mat)
+
+
+def cholesky_extend(lower_factor, cross_cov_mat, new_cov_mat):
+    r'''
+    Extends the lower Cholesky factor :math:`L` of an :math:`n\times n`
+    covariance matrix by :math:`k` rows and columns, without factorizing the
+    extended matrix from scratch:
+
+    .. math::
+
+        \begin{pmatrix} C & B^T \\ B & D \end{pmatrix} =
+        \begin{pmatrix} L & 0 \\ L_{21} & L_{22} \end{pmatrix}
+        \begin{pmatrix} L^T & L_{21}^T \\ 0 & L_{22}^T \end{pmatrix}
+
+    with :math:`L_{21} = B L^{-T}` and :math:`L_{22}` the Cholesky factor of
+    :math:`D - L_{21} L_{21}^T`. This costs :math:`O(n^2 k)` operations
+    instead of :math:`O(n^3)`, and only :math:`O(k^3)` if the new entries
+    are uncorrelated with the old ones.
+
+    **lower_factor** : `numpy.ndarray` of shape (`n`, `n`)
+        The lower Cholesky factor :math:`L` of the old matrix.
+
+    **cross_cov_mat** : `numpy.ndarray` of shape (`k`, `n`)
+        The covariances :math:`B` between the new and the old entries.
+
+    **new_cov_mat** : `numpy.ndarray` of shape (`k`, `k`)
+        The covariance matrix :math:`D` of the new entries.
+
+    returns : tuple of two `numpy.ndarray`
+        The new rows of the factor, :math:`L_{21}` and :math:`L_{22}`.
+        Raises `numpy.linalg.LinAlgError` if the extended matrix is not
+        positive definite.
+    '''
+    cross_cov_mat = np.asarray(cross_cov_mat, dtype=np.float64)
+    new_cov_mat = np.asarray(new_cov_mat, dtype=np.float64)
+
+    if cross_cov_mat.size and np.any(cross_cov_mat):
+        _cross_factor = solve_triangular(lower_factor, cross_cov_mat.T,
+                                         lower=True, check_finite=False).T
+        _schur_complement = new_cov_mat - _cross_factor.dot(_cross_factor.T)
+    else:
+        # new entries uncorrelated with the old ones: no solve needed
+        _cross_factor = np.zeros_like(cross_cov_mat)
+        _schur_complement = new_cov_mat
+
+    return _cross_factor, cholesky(_schur_complement, lower=True,
+                                   check_finite=False)
+
+
+def cholesky_update(lower_factor, update_vectors):
+    r'''
+    Updates the lower Cholesky factor :math:`L` of a matrix :math:`C = LL^T`
+    to the factor of :math:`C + VV^T` by a sequence of rank-one updates,
+    each costing :math:`O(n^2)` operations instead of the :math:`O(n^3)` of
+    a new factorization.
+
+    This is used for removing leading rows and columns from a factorized
+    matrix: if :math:`L_{21}` are the rows of the factor below the removed
+    ones, in the removed columns, the factor of the remaining matrix is the
+    update of :math:`L_{22}` by :math:`V = L_{21}`.
+
+    **lower_factor** : `numpy.ndarray` of shape (`n`, `n`)
+        The lower Cholesky factor :math:`L`. It is not modified.
+
+    **update_vectors** : `numpy.ndarray` of shape (`n`,) or (`n`, `k`)
+        The vector(s) :math:`V`.
+
+    returns : `numpy.ndarray`
+        The updated lower Cholesky factor.
+    '''
+    _factor = np.array(lower_factor, dtype=np.float64)
+    _vectors = np.array(update_vectors, dtype=np.float64).reshape(
+        len(_factor), -1)
+
+    for _vector in _vectors.T:
+        for k in range(len(_factor)):
+            if _vector[k] == 0.:
+                continue  # nothing to rotate
+            _radius = np.hypot(_factor[k, k], _vector[k])
+            _cos = _radius / _factor[k, k]
+            _sin = _vector[k] / _factor[k, k]
+            _factor[k, k] = _radius
+            _factor[k+1:, k] = (_factor[k+1:, k] + _sin * _vector[k+1:]) / _cos
+            _vector[k+1:] = _cos * _vector[k+1:] - _sin * _factor[k+1:, k]
+
+    return _factor
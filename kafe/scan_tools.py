@@ -0,0 +1,684 @@
+'''
+.. module:: scan_tools
+   :platform: Unix
+   :synopsis: A submodule for scanning the profiled :math:`\chi^2` of a `Fit`
+       over its parameters, as an alternative to the contour algorithm of
+       the minimizer.
+'''
+
+# -------------------------------------------------------------------------
+# Changes:
+# 18-Oct-26  initial version: contours of the profiled FCN from a
+#            refined 2D parameter grid, evaluated in worker processes
+#            added adaptive profile scan with warm starts
+#            data of the profiled FCN can be replaced, e.g. by a window
+# -------------------------------------------------------------------------
+
+from __future__ import print_function
+
+import logging
+import multiprocessing
+import numpy as np
+
+from scipy.interpolate import CubicSpline
+from scipy.linalg import LinAlgError, solve
+from scipy.linalg.lapack import dtrtrs
+from scipy.optimize import minimize
+
+from .fit import chi2
+
+# import main logger for kafe
+logger = logging.getLogger('kafe')
+
+# profiled FCN for the worker processes (inherited when forking)
+_scan_profiled_fcn = None
+
+# step size for the numerical derivatives, relative to the parameter errors
+_JACOBIAN_STEP = 1e-6
+# maximum number of Gauss-Newton iterations per profiled point
+_MAX_ITERATIONS = 100
+
+
+class ProfiledFCN(object):
+    '''
+    The `FCN` of a `Fit`, minimized with respect to all free parameters
+    except the scanned ones. For the default :math:`\chi^2` `FCN`, the
+    minimization is a nonlinear least-squares problem for the residuals
+    whitened with the Cholesky factor of the covariance matrix, with the
+    constraints as additional residuals. Other `FCN`\ s are minimized
+    directly.
+
+    Parameters
+    ----------
+
+    **fit** : :py:class:`~kafe.fit.Fit`
+        The fit. The covariance matrix is kept fixed at the one of the
+        last minimization.
+
+    **scan_ids** : list of int
+        The ids of the scanned parameters.
+    '''
+
+    def __init__(self, fit, scan_ids):
+        self.fit = fit
+        self.scan_ids = list(scan_ids)
+
+        _free = ~np.asarray(fit._fixed_parameters, dtype=bool)
+        _free[self.scan_ids] = False
+        #: ids of the parameters the FCN is minimized for
+        self.free_ids = np.flatnonzero(_free)
+
+        # parameter errors set the scale for the minimization
+        _errors = np.abs(np.asarray(fit.current_parameter_errors,
+                                    dtype=np.float64))
+        _errors[_errors == 0] = 1.
+        self._scale = _errors[self.free_ids]
+
+        self._least_squares = fit.external_fcn is chi2
+        if self._least_squares:
+            # use a single call of the fit function for all x, if possible
+            _values = np.asarray(fit.current_parameter_values, dtype=np.float64)
+            self._evaluate = fit.fit_function.evaluate
+            try:
+                _vectorized = np.broadcast_to(
+                    fit.fit_function(fit.xdata, *_values), fit.xdata.shape)
+            except Exception:
+                pass
+            else:
+                if np.allclose(_vectorized,
+                               fit.fit_function.evaluate(fit.xdata, _values),
+                               equal_nan=True):
+                    def _evaluate(x, values):
+                        _y = fit.fit_function(x, *values)
+                        if np.shape(_y) == x.shape:
+                            return _y
+                        return np.broadcast_to(_y, x.shape)
+                    self._evaluate = _evaluate
+
+            self.set_data(fit.xdata, fit.ydata, fit._get_cov_mat_cholesky())
+            self._constraints = list(fit._fcn_constraints.values())
+            # constant part of the constraint penalties
+            self._penalty_offset = sum(_constraint.penalty_offset
+                                       for _constraint in self._constraints)
+
+    def set_data(self, xdata, ydata, cov_mat_cholesky):
+        r'''
+        Replaces the data the default :math:`\chi^2` is calculated for, e.g.
+        by a window of the data of the fit.
+
+        Parameters
+        ----------
+
+        **xdata**, **ydata** : `numpy.ndarray`
+            The `x` and `y` data.
+
+        **cov_mat_cholesky** : tuple
+            The Cholesky factor of the covariance matrix of `ydata` and a
+            flag whether it is a lower triangular matrix, as returned by
+            `scipy.linalg.cho_factor`.
+        '''
+        self.xdata = xdata
+        self.ydata = ydata
+        self._cholesky = cov_mat_cholesky
+
+    def _residuals(self, parameter_values):
+        '''Returns the whitened residuals, including the constraints.'''
+        _cholesky, _lower = self._cholesky
+        # call LAPACK directly, which saves most of the time for small data
+        _whitened, _ = dtrtrs(
+            _cholesky,
+            self.ydata - self._evaluate(self.xdata, parameter_values),
+            lower=_lower)
+        if not self._constraints:
+            return _whitened
+        _residuals = [_whitened]
+        for _constraint in self._constraints:
+            _residuals.append(_constraint.whitening_matrix.dot(
+                parameter_values[_constraint.parameter_ids] - _constraint.centers))
+        return np.concatenate(_residuals)
+
+    def _minimize_least_squares(self, parameter_values):
+        '''
+        Minimizes the sum of squared residuals with respect to the free
+        parameters by damped Gauss-Newton (Levenberg-Marquardt) steps, which
+        converge in a few iterations from a nearby start point.
+        '''
+        _values = parameter_values
+        _residuals = self._residuals(_values)
+        _chi2 = _residuals.dot(_residuals)
+        _damping = 1e-3
+        for _iteration in range(_MAX_ITERATIONS):
+            _jacobian = self._jacobian(_values, _residuals)
+            _gradient = _jacobian.T.dot(_residuals)
+            _normal_matrix = _jacobian.T.dot(_jacobian)
+            _diagonal = np.diag(np.diag(_normal_matrix))
+
+            # increase the damping until the step improves chi2
+            while _damping < 1e10:
+                try:
+                    _delta = solve(_normal_matrix + _damping * _diagonal,
+                                   -_gradient, assume_a='pos')
+                except (LinAlgError, ValueError):
+                    _delta = None
+                if _delta is not None:
+                    _new_values = _values.copy()
+                    _new_values[self.free_ids] += _delta
+                    _new_residuals = self._residuals(_new_values)
+                    _new_chi2 = _new_residuals.dot(_new_residuals)
+                    if np.isfinite(_new_chi2) and _new_chi2 <= _chi2:
+                        break
+                _damping *= 10.
+            else:
+                break  # no further improvement possible
+
+            _converged = _chi2 - _new_chi2 <= 1e-10 * max(_new_chi2, 1.)
+            _values, _residuals, _chi2 = _new_values, _new_residuals, _new_chi2
+            _damping = max(_damping / 10., 1e-12)
+            if _converged:
+                break
+
+        return _values
+
+    def _jacobian(self, parameter_values, residuals):
+        '''
+        Returns the derivatives of the whitened residuals with respect to the
+        free parameters by forward differences.
+        '''
+        _jacobian = np.empty((len(residuals), len(self.free_ids)))
+        for k, par_id in enumerate(self.free_ids):
+            _step = _JACOBIAN_STEP * self._scale[k]
+            _shifted_values = parameter_values.copy()
+            _shifted_values[par_id] += _step
+            _jacobian[:, k] = (self._residuals(_shifted_values) - residuals) / _step
+        return _jacobian
+
+    def gauss_newton_cov_mat(self, parameter_values):
+        r'''
+        Returns the Gauss-Newton approximation of the covariance matrix of
+        the free parameters at `parameter_values`, for the default
+        :math:`\chi^2`. Rows and columns of the other parameters are zero.
+        '''
+        _jacobian = self._jacobian(parameter_values,
+                                   self._residuals(parameter_values))
+        _cov_mat = np.zeros((len(parameter_values), len(parameter_values)))
+        _cov_mat[np.ix_(self.free_ids, self.free_ids)] = np.linalg.pinv(
+            _jacobian.T.dot(_jacobian))
+        return _cov_mat
+
+    def __call__(self, scan_values, start_values):
+        '''
+        Minimizes the `FCN` for the scanned parameters set to `scan_values`,
+        starting from the parameter values `start_values`. Returns the
+        minimum and the parameter values at the minimum.
+        '''
+        _values = np.array(start_values, dtype=np.float64)
+        _values[self.scan_ids] = scan_values
+
+        if len(self.free_ids):
+            if self._least_squares:
+                _values = self._minimize_least_squares(_values)
+            else:
+                def _insert(scaled_free_values):
+                    _all_values = _values.copy()
+                    _all_values[self.free_ids] = scaled_free_values * self._scale
+                    return _all_values
+
+                _result = minimize(
+                    lambda p: self.fit._call_external_fcn(_insert(p)),
+                    _values[self.free_ids] / self._scale, method='BFGS')
+                _values = _insert(_result.x)
+
+        if self._least_squares:
+            # the data may differ from the ones of the fit
+            _residuals = self._residuals(_values)
+            return _residuals.dot(_residuals) + self._penalty_offset, _values
+
+        return self.fit._call_external_fcn(_values), _values
+
+
+def _profile_worker(jobs):
+    '''
+    Profiles the FCN for a list of jobs, each holding the values of the
+    scanned parameters and the start values for the minimization.
+    '''
+    return [_scan_profiled_fcn(_scan_values, _start_values)
+            for _scan_values, _start_values in jobs]
+
+
+def _profile_segment_worker(jobs):
+    '''
+    Scans the profiled FCN for a list of jobs, each describing one side of
+    the minimum (see :py:func:`_scan_profile_segment`).
+    '''
+    return [_scan_profile_segment(_scan_profiled_fcn, *_job) for _job in jobs]
+
+
+def map_profiled_fcn(profiled_fcn, jobs, processes=None,
+                     worker=_profile_worker):
+    '''
+    Evaluates the profiled `FCN` for a list of jobs `(scan_values,
+    start_values)` in a pool of worker processes. Returns the list of
+    results `(fcn, parameter_values)`.
+
+    If processes cannot be forked on this platform, or if `processes` is 1,
+    the jobs are done one after the other.
+
+    Other kinds of jobs can be processed by passing a different `worker`,
+    which gets a list of jobs and returns the list of their results.
+    '''
+    global _scan_profiled_fcn
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = min(processes, len(jobs))
+
+    _context = None
+    if processes > 1 and len(jobs) > 1 and len(profiled_fcn.free_ids):
+        try:
+            _context = multiprocessing.get_context('fork')
+        except AttributeError:
+            # Python 2: worker processes are always forked on Unix
+            _context = multiprocessing
+        except ValueError:
+            logger.info("Cannot fork processes. Profiling sequentially.")
+
+    # worker processes inherit the profiled FCN from this process
+    _scan_profiled_fcn = profiled_fcn
+    try:
+        if _context is not None:
+            _chunks = [jobs[i::processes] for i in range(processes)]
+            _pool = _context.Pool(processes)
+            try:
+                _chunk_results = _pool.map(worker, _chunks)
+            finally:
+                _pool.close()
+                _pool.join()
+            # restore the original order of the jobs
+            _results = [None] * len(jobs)
+            for i, _chunk_result in enumerate(_chunk_results):
+                _results[i::processes] = _chunk_result
+        else:
+            _results = worker(jobs)
+    finally:
+        _scan_profiled_fcn = None
+
+    return _results
+
+
+def _marching_squares(xs, ys, values, level):
+    '''
+    Extracts the lines where `values`, given on the grid spanned by `xs` and
+    `ys`, cross `level`. Grid cells with unknown (NaN) corners are skipped.
+    Returns a list of paths as arrays of shape (number of points, 2).
+    '''
+    _above = values >= level
+
+    def _crossing(i0, j0, i1, j1):
+        # linear interpolation along a grid edge
+        _v0, _v1 = values[i0, j0], values[i1, j1]
+        _t = (level - _v0) / (_v1 - _v0)
+        return (xs[i0] + _t * (xs[i1] - xs[i0]),
+                ys[j0] + _t * (ys[j1] - ys[j0]))
+
+    # the crossing points are identified by the grid edge they lie on
+    _points = {}
+    _neighbours = {}
+
+    def _add_segment(edge0, edge1):
+        for _edge, _other in ((edge0, edge1), (edge1, edge0)):
+            _neighbours.setdefault(_edge, []).append(_other)
+
+    for i in range(len(xs) - 1):
+        for j in range(len(ys) - 1):
+            _corners = values[i:i + 2, j:j + 2]
+            if np.isnan(_corners).any():
+                continue
+            _flags = _above[i:i + 2, j:j + 2]
+            if _flags.all() or not _flags.any():
+                continue
+
+            # edges of the cell in counter-clockwise order
+            _edges = [(('h', i, j), (i, j, i + 1, j)),
+                      (('v', i + 1, j), (i + 1, j, i + 1, j + 1)),
+                      (('h', i, j + 1), (i, j + 1, i + 1, j + 1)),
+                      (('v', i, j), (i, j, i, j + 1))]
+            _crossed = []
+            for _edge, (i0, j0, i1, j1) in _edges:
+                if _above[i0, j0] != _above[i1, j1]:
+                    if _edge not in _points:
+                        _points[_edge] = _crossing(i0, j0, i1, j1)
+                    _crossed.append(_edge)
+
+            if len(_crossed) == 2:
+                _add_segment(*_crossed)
+            else:
+                # saddle point: decide by the value in the cell center
+                if (np.mean(_corners) >= level) == _above[i, j]:
+                    _add_segment(_crossed[0], _crossed[3])
+                    _add_segment(_crossed[1], _crossed[2])
+                else:
+                    _add_segment(_crossed[0], _crossed[1])
+                    _add_segment(_crossed[2], _crossed[3])
+
+    # link the segments to paths
+    _paths = []
+    _unused = set(_neighbours)
+    while _unused:
+        _start = _unused.pop()
+        _path = [_start]
+        # walk in both directions from the start point
+        for _direction in range(2):
+            _current = _path[-1]
+            while True:
+                _next = [_edge for _edge in _neighbours[_current]
+                         if _edge in _unused]
+                if not _next:
+                    break
+                _current = _next[0]
+                _unused.discard(_current)
+                _path.append(_current)
+            _path.reverse()
+        _paths.append(np.array([_points[_edge] for _edge in _path]))
+
+    return _paths
+
+
+def _resample_closed_path(path, n_points, scale):
+    '''
+    Returns `n_points` points evenly spaced along a periodic spline through
+    the points of the closed `path`, where distances are measured in units
+    of `scale` for each coordinate.
+    '''
+    _closed = np.vstack((path, path[:1]))
+    _steps = np.sqrt(np.sum((np.diff(_closed, axis=0) / scale) ** 2, axis=1))
+    # drop duplicate points (crossings at grid points)
+    _keep = np.concatenate(([True], _steps > 1e-12 * np.sum(_steps)))
+    _keep[-1] = True
+    _closed = _closed[_keep]
+    _arc_length = np.concatenate(([0.], np.cumsum(_steps[_keep[1:]])))
+    _closed[-1] = _closed[0]
+    _spline = CubicSpline(_arc_length, _closed, bc_type='periodic')
+    _xs, _ys = _spline(np.linspace(0., _arc_length[-1], n_points,
+                                   endpoint=False)).T
+    return _xs, _ys
+
+
+def profile_contours(fit, parameter1, parameter2, dchi2_list, n_points=100,
+                     grid_points=17, refinements=2, processes=None):
+    r'''
+    Calculates contours of the profiled `FCN` of a `Fit` in the plane of two
+    parameters for several :math:`\Delta\chi^2` values at once.
+
+    The profiled `FCN` is computed on a grid around the minimum, whose range
+    is enlarged until all contours are enclosed. The grid is then refined
+    `refinements` times, each time halving the grid spacing in the cells
+    crossed by a contour. The minimizations for all new grid points of a step
+    are independent and done in a pool of worker processes. They start from
+    the parameter values expected from the parameter covariance matrix on the
+    first grid, and from those of the nearest known grid point later on.
+    All contours are extracted from the final grid with the marching squares
+    algorithm.
+
+    Parameters
+    ----------
+
+    **fit** : :py:class:`~kafe.fit.Fit`
+        A fit for which :py:meth:`~kafe.fit.Fit.do_fit` has been called.
+
+    **parameter1**, **parameter2** : int
+        The ids of the parameters.
+
+    **dchi2_list** : list of floats
+        The :math:`\Delta\chi^2` values of the contours.
+
+    Keyword Arguments
+    -----------------
+
+    n_points : int, optional
+        Number of points returned for each contour.
+
+    grid_points : int, optional
+        Number of points of the initial grid along each axis.
+
+    refinements : int, optional
+        Number of refinement steps of the grid.
+
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+
+    list of tuples
+        One tuple `(xs, ys)` of arrays with the contour points for each
+        value in `dchi2_list`.
+    '''
+    _ids = [parameter1, parameter2]
+    _center = np.asarray(fit.final_parameter_values, dtype=np.float64)
+    _errors = np.asarray(fit.final_parameter_errors, dtype=np.float64)[_ids]
+    if np.any(np.asarray(fit._fixed_parameters)[_ids]) or not np.all(_errors > 0):
+        raise ValueError("Cannot calculate contour for fixed parameters.")
+
+    _profiled_fcn = ProfiledFCN(fit, _ids)
+    _max_level = max(dchi2_list)
+
+    # linear prediction of the other parameters from the covariance matrix
+    _cov_mat = np.asarray(fit.par_cov_mat, dtype=np.float64)
+    _gain = _cov_mat[:, _ids].dot(np.linalg.inv(_cov_mat[np.ix_(_ids, _ids)]))
+
+    # scan a grid large enough to enclose all contours
+    _half_width = 1.3 * np.sqrt(_max_level) * _errors
+    for _attempt in range(5):
+        _xs = _center[parameter1] + np.linspace(-1., 1., grid_points) * _half_width[0]
+        _ys = _center[parameter2] + np.linspace(-1., 1., grid_points) * _half_width[1]
+        _nodes = [(i, j) for i in range(grid_points) for j in range(grid_points)]
+        _jobs = []
+        for i, j in _nodes:
+            _scan_values = np.array([_xs[i], _ys[j]])
+            _jobs.append((_scan_values, _center + _gain.dot(_scan_values - _center[_ids])))
+        _results = map_profiled_fcn(_profiled_fcn, _jobs, processes)
+
+        _fcn = np.empty((grid_points, grid_points))
+        _values = np.empty((grid_points, grid_points, len(_center)))
+        for (i, j), (_fcn_value, _parameter_values) in zip(_nodes, _results):
+            _fcn[i, j] = _fcn_value
+            _values[i, j] = _parameter_values
+
+        _minimum = min(fit.final_fcn, np.min(_fcn))
+        _boundary = np.concatenate((_fcn[0], _fcn[-1], _fcn[:, 0], _fcn[:, -1]))
+        if np.min(_boundary) - _minimum > _max_level:
+            break
+        _half_width *= 1.5
+        logger.debug("Contour not enclosed by grid. Enlarging grid to "
+                     "+-%s." % (_half_width,))
+    else:
+        logger.warning("Contours for parameters %d and %d are not closed within "
+                       "the scanned range." % (parameter1, parameter2))
+
+    # refine the grid in the cells crossed by a contour
+    for _refinement in range(refinements):
+        _size = 2 * len(_xs) - 1
+        _fine_xs = np.interp(np.arange(_size) / 2., np.arange(len(_xs)), _xs)
+        _fine_ys = np.interp(np.arange(_size) / 2., np.arange(len(_ys)), _ys)
+        _fine_fcn = np.full((_size, _size), np.nan)
+        _fine_fcn[::2, ::2] = _fcn
+        _fine_values = np.zeros((_size, _size, len(_center)))
+        _fine_values[::2, ::2] = _values
+
+        # cells with all corners known and a contour crossing them
+        _corners = np.stack((_fcn[:-1, :-1], _fcn[1:, :-1],
+                             _fcn[:-1, 1:], _fcn[1:, 1:])) - _minimum
+        _known = ~np.isnan(_corners).any(axis=0)
+        _low = np.where(_known, np.min(_corners, axis=0), np.inf)
+        _high = np.where(_known, np.max(_corners, axis=0), -np.inf)
+        _crossed = np.zeros(_low.shape, dtype=bool)
+        for _level in dchi2_list:
+            _crossed |= (_low <= _level) & (_high >= _level)
+        # include the neighbouring cells, in case a contour was missed there
+        _band = _crossed.copy()
+        _band[1:] |= _crossed[:-1]
+        _band[:-1] |= _crossed[1:]
+        _band[:, 1:] |= _crossed[:, :-1]
+        _band[:, :-1] |= _crossed[:, 1:]
+        _band &= _known
+
+        _needed = np.zeros((_size, _size), dtype=bool)
+        for i, j in zip(*np.nonzero(_band)):
+            _needed[2 * i:2 * i + 3, 2 * j:2 * j + 3] = True
+        _needed &= np.isnan(_fine_fcn)
+
+        # start from the nearest point of the previous grid
+        _nodes = list(zip(*np.nonzero(_needed)))
+        _jobs = [(np.array([_fine_xs[i], _fine_ys[j]]),
+                  _fine_values[i - i % 2, j - j % 2]) for i, j in _nodes]
+        _results = map_profiled_fcn(_profiled_fcn, _jobs, processes)
+        for (i, j), (_fcn_value, _parameter_values) in zip(_nodes, _results):
+            _fine_fcn[i, j] = _fcn_value
+            _fine_values[i, j] = _parameter_values
+
+        _xs, _ys, _fcn, _values = _fine_xs, _fine_ys, _fine_fcn, _fine_values
+        _minimum = min(_minimum, np.nanmin(_fcn))
+
+    # the square root of the FCN difference is nearly linear in the
+    # parameters, which makes the interpolation in the grid cells accurate
+    _distance = np.sqrt(np.maximum(_fcn - _minimum, 0.))
+    _contours = []
+    for _level in dchi2_list:
+        _paths = _marching_squares(_xs, _ys, _distance, np.sqrt(_level))
+        if not _paths:
+            raise ValueError("No contour found for dchi2 = %g." % (_level,))
+        if len(_paths) > 1:
+            logger.warning("Contour for dchi2 = %g consists of %d separate lines; "
+                           "using the longest one." % (_level, len(_paths)))
+        _path = max(_paths, key=len)
+        _contours.append(_resample_closed_path(_path, n_points, _errors))
+
+    return _contours
+
+
+def _scan_profile_segment(profiled_fcn, start_values, direction, step, error,
+                          minimum, dchi2_max, dchi2_levels):
+    r'''
+    Scans the profiled `FCN` on one side of the minimum, in the direction
+    given by the sign of `direction`. The points are placed at equal steps
+    `step` of :math:`\sqrt{\Delta\chi^2}`, predicted from the slope found
+    at the previous points, until :math:`\Delta\chi^2` exceeds `dchi2_max`.
+    Then, the crossings of the values in `dchi2_levels` are located by the
+    secant method. Each minimization starts from the result of the nearest
+    point. Returns the list of tuples (parameter value, `FCN`).
+    '''
+    _par_id = profiled_fcn.scan_ids[0]
+    _center = start_values[_par_id]
+    _points = [(_center, 0., start_values)]  # parameter value, distance, values
+    _slope = 1. / error  # sqrt(dchi2) per unit of the parameter
+    _output = []
+
+    for _step_number in range(_MAX_ITERATIONS):
+        _x, _distance, _values = _points[-1]
+        _new_x = _x + direction * step / _slope
+        _fcn, _new_values = profiled_fcn([_new_x], _values)
+        _new_distance = np.sqrt(max(_fcn - minimum, 0.))
+        _output.append((_new_x, _fcn))
+        if _new_distance > _distance:
+            # do not let the step size grow too fast in flat regions
+            _slope = max((_new_distance - _distance) / abs(_new_x - _x),
+                         0.25 * _slope)
+        else:
+            _slope *= 0.5
+        _points.append((_new_x, _new_distance, _new_values))
+        if _new_distance ** 2 >= dchi2_max:
+            break  # requested range is covered
+
+    # add points where the profile crosses the given levels
+    for _level in dchi2_levels:
+        _target = np.sqrt(_level)
+        for _lower, _upper in zip(_points[:-1], _points[1:]):
+            if _lower[1] < _target <= _upper[1]:
+                break
+        else:
+            continue  # level not reached
+        for _iteration in range(2):
+            (_x0, _d0, _values0), (_x1, _d1, _values1) = _lower, _upper
+            _x = _x0 + (_target - _d0) / (_d1 - _d0) * (_x1 - _x0)
+            _start = _values0 if abs(_x - _x0) < abs(_x - _x1) else _values1
+            _fcn, _values = profiled_fcn([_x], _start)
+            _distance = np.sqrt(max(_fcn - minimum, 0.))
+            _output.append((_x, _fcn))
+            if abs(_distance ** 2 - _level) < 1e-3 * _level:
+                break
+            if _distance < _target:
+                _lower = (_x, _distance, _values)
+            else:
+                _upper = (_x, _distance, _values)
+
+    return _output
+
+
+def profile_scan(fit, parameter, n_points=21, dchi2_max=9.,
+                 dchi2_levels=(1., 4.), processes=None):
+    r'''
+    Calculates the profile of the `FCN` of a `Fit` for one parameter, i.e.
+    the minimum of the `FCN` with respect to all other parameters as a
+    function of this parameter.
+
+    Both sides of the minimum are scanned independently, in two worker
+    processes, stepping outwards from the minimum until
+    :math:`\Delta\chi^2` exceeds `dchi2_max`. The step size is adapted to
+    the shape of the profile, and additional points are placed where the
+    profile crosses the values in `dchi2_levels`. Every minimization starts
+    from the result of the nearest point already calculated.
+
+    Parameters
+    ----------
+
+    **fit** : :py:class:`~kafe.fit.Fit`
+        A fit for which :py:meth:`~kafe.fit.Fit.do_fit` has been called.
+
+    **parameter** : int
+        The id of the parameter.
+
+    Keyword Arguments
+    -----------------
+
+    n_points : int, optional
+        Approximate number of points, without the ones added at the
+        crossings of `dchi2_levels`.
+
+    dchi2_max : float, optional
+        :math:`\Delta\chi^2` up to which the profile is scanned.
+
+    dchi2_levels : tuple of floats, optional
+        :math:`\Delta\chi^2` values whose crossings are located.
+
+    processes : int, optional
+        Number of worker processes. Defaults to the number of CPUs (but at
+        most two are used).
+
+    Returns
+    -------
+
+    tuple of arrays
+        The sorted parameter values and the corresponding values of the
+        `FCN`.
+    '''
+    _center_values = np.asarray(fit.final_parameter_values, dtype=np.float64)
+    _error = fit.final_parameter_errors[parameter]
+    if fit._fixed_parameters[parameter] or not _error > 0:
+        raise ValueError("Cannot calculate profile for fixed parameter %d."
+                         % (parameter,))
+
+    _profiled_fcn = ProfiledFCN(fit, [parameter])
+    _minimum = fit.final_fcn
+    _step = np.sqrt(dchi2_max) / max((n_points - 1) // 2, 1)
+    _levels = [_level for _level in dchi2_levels if _level < dchi2_max]
+
+    _jobs = [(_center_values, _direction, _step, _error, _minimum,
+              dchi2_max, _levels) for _direction in (-1., 1.)]
+    _segments = map_profiled_fcn(_profiled_fcn, _jobs, processes,
+                                 worker=_profile_segment_worker)
+
+    _points = dict([(_center_values[parameter], _minimum)])
+    for _segment in _segments:
+        _points.update(_segment)
+    _xs = np.array(sorted(_points))
+    return _xs, np.array([_points[_x] for _x in _xs])
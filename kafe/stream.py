@@ -2,16 +2,130 @@
 .. module:: stream
     :platform: Unix
     :synopsis: A submodule containing an object for simultaneous output to file
-        and to ``sys.stdout``.
+        and to ``sys.stdout``, and helpers for reading (compressed) input
+        files.
 ..  moduleauthor:: Daniel Savoiu <daniel.savoiu@cern.ch>
 '''
 
 import sys
 import os
+import io
+import bz2
+import gzip
 
 from contextlib import contextmanager
 from time import gmtime, strftime
 
+from . import config
+
+try:
+    import lzma
+except ImportError:
+    # Python 2 has no xz support
+    lzma = None
+
+# signatures and file extensions of the supported compression formats
+COMPRESSION_FORMATS = {
+    'gzip': (b'\x1f\x8b', ('.gz', '.gzip')),
+    'bz2': (b'BZh', ('.bz2',)),
+    'xz': (b'\xfd7zXZ\x00', ('.xz', '.lzma')),
+}
+
+
+def detect_compression(leading_bytes, file_path=None):
+    '''
+    Returns the compression format (``'gzip'``, ``'bz2'`` or ``'xz'``) of a
+    file, as determined from its leading bytes or, failing that, from its
+    file extension. Returns ``None`` for uncompressed files.
+    '''
+    for _format, (_signature, _extensions) in COMPRESSION_FORMATS.items():
+        if leading_bytes.startswith(_signature):
+            return _format
+    if file_path is not None:
+        for _format, (_signature, _extensions) in COMPRESSION_FORMATS.items():
+            if file_path.lower().endswith(_extensions):
+                return _format
+    return None
+
+
+def strip_compression_extension(file_path):
+    '''
+    Returns the file path without the extension of a compression format,
+    e.g. ``'data.dat'`` for ``'data.dat.gz'``.
+    '''
+    for _signature, _extensions in COMPRESSION_FORMATS.values():
+        for _extension in _extensions:
+            if file_path.lower().endswith(_extension):
+                return file_path[:-len(_extension)]
+    return file_path
+
+
+@contextmanager
+def open_text_input(file_like):
+    '''
+    Opens an input file for reading text. Files compressed with `gzip`,
+    `bzip2` or `xz` are recognized by their leading bytes or their extension
+    and decompressed while being read, so that they can be processed line by
+    line without decompressing them in full.
+
+    Parameters
+    ----------
+
+    **file_like** : string or file-like object
+        Path of the file, a binary file object or a text file object. Text
+        file objects, and file objects which do not implement the `io`
+        interface (like Python 2 `file` objects), are passed through
+        unchanged. File objects are not closed.
+    '''
+    if not hasattr(file_like, 'read'):
+        with io.open(file_like, 'rb') as _file:
+            with open_text_input(_file) as _text:
+                yield _text
+        return
+
+    if not hasattr(file_like, 'readable') or not isinstance(file_like.read(0), bytes):
+        # already a text stream, or not an `io' object (e.g. a Python 2 `file')
+        yield file_like
+        return
+
+    if hasattr(file_like, 'peek'):
+        _buffered = file_like
+    else:
+        _buffered = io.BufferedReader(file_like)
+    _name = getattr(file_like, 'name', None)
+    if not isinstance(_name, str):
+        # e.g. file descriptor
+        _name = None
+    _format = detect_compression(_buffered.peek(8), _name)
+    if _format == 'gzip':
+        _stream = gzip.GzipFile(fileobj=_buffered, mode='rb')
+    elif _format == 'bz2':
+        if sys.version_info[0] < 3:
+            # Python 2 `BZ2File' only accepts file names
+            raise ValueError("Cannot read bz2-compressed input with Python 2.")
+        _stream = bz2.BZ2File(_buffered, mode='rb')
+    elif _format == 'xz':
+        if lzma is None:
+            raise ValueError("Cannot read xz-compressed input: module "
+                             "`lzma' is not available.")
+        _stream = lzma.LZMAFile(_buffered, mode='rb')
+    else:
+        _stream = _buffered
+    if _stream is not _buffered and sys.version_info[0] < 3:
+        # Python 2 `GzipFile' does not implement `read1'
+        _stream = io.BufferedReader(_stream)
+
+    _text = io.TextIOWrapper(_stream)
+    try:
+        yield _text
+    finally:
+        # close the decompressors, but not the file object
+        _text.detach()
+        if _stream is not _buffered:
+            _stream.close()
+        if _buffered is not file_like:
+            _buffered.detach()
+
 
 @contextmanager
 def redirect_stdout_to(stream_with_fd):
@@ -75,7 +189,8 @@ class StreamDup(object):
 
     def close(self):
         for _file in self.out_file:
-            if not _file.closed:
+            # the shared null file is still used by other objects
+            if not _file.closed and _file is not config.DEV_NULL_FILE_OBJECT:
                 _file.close()
         self.closed = True
 
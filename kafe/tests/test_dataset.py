@@ -1,2 +1,241 @@
 from kafe import dataset
 
+import gzip
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import unittest
+
+
+class Dataset_Test_binary_format(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'dataset.kds')
+
+        _xdata = np.linspace(1., 5., 5)
+        self.dataset = dataset.Dataset(data=(_xdata, 2. * _xdata + 1.),
+                                       title="Test Dataset",
+                                       axis_labels=['$t$', '$U$'],
+                                       axis_units=['s', 'V'], basename='test')
+        self.dataset.add_error_source('x', 'simple', 0.1)
+        self.dataset.add_error_source('y', 'simple', [0.1, 0.2, 0.3, 0.2, 0.1])
+        self.dataset.add_error_source('y', 'simple', 0.05, relative=True,
+                                      correlated=True)
+        _removed = self.dataset.add_error_source('y', 'simple', 1.)
+        self.dataset.remove_error_source('y', _removed)
+        _cov_mat = np.matrix(0.01 * (np.eye(5) + 0.5))
+        _disabled = self.dataset.add_error_source('y', 'matrix', _cov_mat)
+        self.dataset.disable_error_source('y', _disabled)
+        self.dataset.add_error_source('y', 'matrix', 2. * _cov_mat)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        self.dataset.write_binary(self.file_path)
+
+        for _mmap_mode in ('r', 'c', None):
+            _dataset = dataset.Dataset()
+            _dataset.read_binary(self.file_path, mmap_mode=_mmap_mode)
+
+            assert _dataset.data_label == "Test Dataset"
+            assert _dataset.basename == 'test'
+            assert _dataset.axis_labels == ['$t$', '$U$']
+            assert _dataset.axis_units == ['s', 'V']
+            for _axis in range(2):
+                assert np.array_equal(_dataset.get_data(_axis),
+                                      self.dataset.get_data(_axis))
+                assert np.array_equal(_dataset.get_cov_mat(_axis),
+                                      self.dataset.get_cov_mat(_axis))
+                assert len(_dataset.err_src[_axis]) == \
+                    len(self.dataset.err_src[_axis])
+            assert _dataset.err_src[1][2] is None
+            assert not _dataset.error_source_is_enabled(1, 3)
+
+            # the error model is restored: it can be changed after reading
+            _dataset.enable_error_source('y', 3)
+            self.dataset.enable_error_source('y', 3)
+            _dataset.calc_cov_mats()
+            self.dataset.calc_cov_mats()
+            assert np.allclose(_dataset.get_cov_mat('y'),
+                               self.dataset.get_cov_mat('y'))
+            self.dataset.disable_error_source('y', 3)
+            self.dataset.calc_cov_mats()
+
+    def test_lazy_cov_mats(self):
+        _dataset = dataset.Dataset(data=(self.dataset.get_data('x'),
+                                         self.dataset.get_data('y')))
+        _cov_mat = np.matrix(0.01 * (np.eye(5) + 0.5))
+        _dataset.add_error_source('y', 'matrix', _cov_mat)
+        _dataset.write_binary(self.file_path)
+        _ref_size = os.path.getsize(self.file_path)
+
+        _dataset = dataset.Dataset()
+        _dataset.read_binary(self.file_path)
+        # the stored matrix is mapped, not recomputed
+        assert isinstance(_dataset.get_cov_mat('y').base, np.memmap)
+        assert np.array_equal(_dataset.get_cov_mat('y'), _cov_mat)
+        assert _dataset.cov_mat_is_regular('y')
+        assert _dataset.has_correlations('y')
+        assert not _dataset.has_errors('x')
+
+        # the matrix of a single error source is stored only once
+        _dataset.add_error_source('y', 'simple', 0.1)
+        _dataset.write_binary(self.file_path)
+        assert os.path.getsize(self.file_path) > _ref_size
+
+    def test_forced_cov_mat(self):
+        _cov_mat = np.matrix(np.diag([1., 2., 3., 4., 5.]))
+        self.dataset.set_cov_mat('y', _cov_mat)
+        self.dataset.write_binary(self.file_path)
+
+        _dataset = dataset.Dataset()
+        _dataset.read_binary(self.file_path)
+        assert np.array_equal(_dataset.get_cov_mat('y'), _cov_mat)
+        assert np.array_equal(_dataset.get_cov_mat('x'),
+                              self.dataset.get_cov_mat('x'))
+
+    def test_read_compressed_text_file(self):
+        _path = os.path.join(self.tmp_dir, 'dataset.dat.gz')
+        with gzip.open(_path, 'wt') as _file:
+            _file.write(self.dataset.get_formatted())
+
+        _dataset = dataset.Dataset()
+        _dataset.read_from_file(_path)
+        assert _dataset.basename == 'dataset'
+        assert np.allclose(_dataset.get_data('y'), self.dataset.get_data('y'))
+        assert np.allclose(_dataset.get_cov_mat('y'),
+                           self.dataset.get_cov_mat('y'), rtol=1e-5)
+
+    def test_invalid_file(self):
+        with open(self.file_path, 'w') as _file:
+            _file.write("1. 2.\n")
+        self.assertRaises(ValueError, dataset.Dataset().read_binary,
+                          self.file_path)
+
+
+
+class Dataset_Test_formatted_output(unittest.TestCase):
+
+    def setUp(self):
+        self.dataset = dataset.Dataset(data=([1., 2., 3.], [4., 5., 6.]),
+                                       axis_labels=['t', 'U'])
+        self.dataset.add_error_source('x', 'simple', 0.5)
+        self.dataset.add_error_source('y', 'simple', [0.3, 0.4, 0.5])
+        self.dataset.add_error_source('y', 'simple', 0.4, correlated=True)
+
+    def test_get_formatted(self):
+        _expected = (
+            "# axis 0: t\n"
+            "# datapoints,uncor. err.\n"
+            "1.00,0.50\n2.00,0.50\n3.00,0.50\n"
+            "\n"
+            "# axis 1: U\n"
+            "# datapoints,total err.,correlation coefficients\n"
+            "4.00,0.50\n"
+            "5.00,0.57,0.57\n"
+            "6.00,0.64,0.50,0.44\n"
+            "\n")
+        assert self.dataset.get_formatted('.2f', ',') == _expected
+        # format specifications without printf equivalent
+        assert " 6.00, 0.64, 0.50, 0.44\n" in \
+            self.dataset.get_formatted('>5.2f', ',')
+        assert self.dataset.get_formatted('.2f', '%') == \
+            _expected.replace(',', '%')
+
+    def test_write_formatted(self):
+        _tmp_dir = tempfile.mkdtemp()
+        try:
+            _path = os.path.join(_tmp_dir, 'dataset.dat')
+            self.dataset.write_formatted(_path, '.3e', ' ')
+            with open(_path) as _file:
+                assert _file.read() == self.dataset.get_formatted('.3e', ' ')
+
+            with open(_path, 'w') as _file:
+                self.dataset.write_formatted(_file)
+            _dataset = dataset.Dataset()
+            _dataset.read_from_file(_path)
+            assert np.allclose(_dataset.get_cov_mat('y'),
+                               self.dataset.get_cov_mat('y'), rtol=1e-5)
+        finally:
+            shutil.rmtree(_tmp_dir)
+
+
+class Dataset_Test_append_data(unittest.TestCase):
+
+    def setUp(self):
+        _rs = np.random.RandomState(0)
+        self.xdata = np.linspace(0., 1., 12)
+        self.ydata = 2. * self.xdata + _rs.normal(0., 0.1, 12)
+        self.yerrors = 0.1 + 0.01 * np.arange(12)
+
+    def make_dataset(self, size):
+        _dataset = dataset.Dataset(data=(self.xdata[:size],
+                                         self.ydata[:size]))
+        _dataset.add_error_source('x', 'simple', 0.01)
+        _dataset.add_error_source('y', 'simple', list(self.yerrors[:size]))
+        _dataset.add_error_source('y', 'simple', 0.05, relative=True,
+                                  correlated=True)
+        _dataset.add_error_source('y', 'simple', 0.02, correlated=True)
+        return _dataset
+
+    def test_append_data(self):
+        _ref_dataset = self.make_dataset(12)
+        _dataset = self.make_dataset(3)
+        _dataset.get_cov_mat_cholesky('y')
+        _dataset.append_data(self.xdata[3], self.ydata[3],
+                             y_errors={0: self.yerrors[3]})
+        for _start in range(4, 12, 3):
+            _stop = min(_start + 3, 12)
+            _dataset.append_data(self.xdata[_start:_stop],
+                                 self.ydata[_start:_stop],
+                                 y_errors={0: self.yerrors[_start:_stop]})
+
+        assert _dataset.get_size() == 12
+        for _axis in range(2):
+            assert np.array_equal(_dataset.get_data(_axis),
+                                  _ref_dataset.get_data(_axis))
+            assert np.allclose(_dataset.get_cov_mat(_axis),
+                               _ref_dataset.get_cov_mat(_axis))
+        assert _dataset.has_correlations('y')
+        assert not _dataset.has_correlations('x')
+        assert _dataset.cov_mat_is_regular('y')
+        _cholesky = _dataset.get_cov_mat_cholesky('y')
+        assert np.allclose(_cholesky.dot(_cholesky.T),
+                           _ref_dataset.get_cov_mat('y'))
+
+        # the error sources describe the appended points, too
+        _dataset.calc_cov_mats()
+        assert np.allclose(_dataset.get_cov_mat('y'),
+                           _ref_dataset.get_cov_mat('y'))
+
+    def test_append_to_empty_dataset(self):
+        _dataset = dataset.Dataset()
+        _dataset.add_error_source('y', 'simple', 0.1)
+        for _x, _y in zip(self.xdata, self.ydata):
+            _dataset.append_data(_x, _y)
+        assert np.array_equal(_dataset.get_data('y'), self.ydata)
+        assert np.allclose(_dataset.get_cov_mat('y'), 0.01 * np.eye(12))
+        assert _dataset.cov_mat_is_regular('y')
+        assert not _dataset.has_errors('x')
+
+    def test_invalid_append(self):
+        _dataset = self.make_dataset(3)
+        self.assertRaises(ValueError, _dataset.append_data, 1., 2.)
+        self.assertRaises(ValueError, _dataset.append_data, [1., 2.], 2.,
+                          y_errors={0: 0.1})
+        self.assertRaises(ValueError, _dataset.append_data, 1., 2.,
+                          y_errors={0: 0.1, 1: 0.1})
+        _dataset.add_error_source('x', 'matrix', np.eye(3))
+        self.assertRaises(ValueError, _dataset.append_data, 1., 2.,
+                          y_errors={0: 0.1})
+        # nothing was changed
+        assert _dataset.get_size() == 3
+        assert len(_dataset.err_src[1][0].error_value) == 3
+
+
+if __name__ == '__main__':
+    unittest.main()
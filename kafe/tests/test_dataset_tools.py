@@ -0,0 +1,81 @@
+"""
+Unit tests for submodule ``dataset_tools``
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from kafe import dataset_tools
+
+import unittest
+
+
+class Dataset_Tools_Test_histogram(unittest.TestCase):
+
+    def setUp(self):
+        self.events = np.random.RandomState(0).normal(0., 1., 10007)
+        # events on the outer bin edges
+        self.events[:2] = (-3., 3.)
+
+    def test_uniform_bins(self):
+        _ref_counts, _ref_edges = np.histogram(self.events, 20, (-3., 3.))
+        for _threads in (1, 3):
+            _dataset = dataset_tools.build_histogram_dataset(
+                self.events, 20, range=(-3., 3.), threads=_threads,
+                chunk_size=1000, title="Histogram")
+            assert _dataset.data_label == "Histogram"
+            assert np.allclose(_dataset.get_data('x'),
+                               0.5 * (_ref_edges[:-1] + _ref_edges[1:]))
+            assert np.array_equal(_dataset.get_data('y'), _ref_counts)
+            assert np.allclose(_dataset.get_cov_mat('y'),
+                               np.diag(np.maximum(_ref_counts, 1)))
+            assert not _dataset.has_errors('x')
+
+    def test_variable_bins_and_chunks(self):
+        _edges = [-4., -1., -0.5, 0., 0.2, 2.5]
+        _ref_counts = np.histogram(self.events, _edges)[0]
+        _builder = dataset_tools.HistogramBuilder(_edges)
+        _builder.fill(self.events[:10])
+        _builder.fill_chunks((self.events[_start:_start + 999]
+                              for _start in range(10, len(self.events), 999)),
+                             threads=2)
+        assert np.array_equal(_builder.counts, _ref_counts)
+        assert _builder.number_of_events == len(self.events)
+
+    def test_memory_mapped_events(self):
+        _tmp_dir = tempfile.mkdtemp()
+        try:
+            _path = os.path.join(_tmp_dir, 'events.bin')
+            self.events.astype(np.float32).tofile(_path)
+            _dataset = dataset_tools.build_histogram_dataset(
+                np.memmap(_path, dtype=np.float32, mode='r'), 10,
+                range=(-2., 2.), chunk_size=4096)
+            assert np.array_equal(
+                _dataset.get_data('y'),
+                np.histogram(self.events.astype(np.float32), 10, (-2., 2.))[0])
+        finally:
+            shutil.rmtree(_tmp_dir)
+
+    def test_pearson_errors(self):
+        _builder = dataset_tools.HistogramBuilder(5, range=(-1., 1.))
+        _builder.fill(self.events)
+        _expected = np.array([1000., 1100., 1200., 1100., 1000.])
+        _dataset = _builder.build_dataset('pearson', expected_counts=_expected)
+        assert np.allclose(_dataset.get_cov_mat('y'), np.diag(_expected))
+        self.assertRaises(ValueError, _builder.build_dataset, 'pearson')
+        self.assertRaises(ValueError, _builder.build_dataset, 'pearson',
+                          expected_counts=_expected[:4])
+        self.assertRaises(ValueError, _builder.build_dataset, 'neyman')
+
+    def test_invalid_bins(self):
+        self.assertRaises(ValueError, dataset_tools.HistogramBuilder, 10)
+        self.assertRaises(ValueError, dataset_tools.HistogramBuilder, 10,
+                          range=(1., 1.))
+        self.assertRaises(ValueError, dataset_tools.HistogramBuilder,
+                          [0., 2., 1.])
+
+
+if __name__ == '__main__':
+    unittest.main()
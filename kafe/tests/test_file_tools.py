@@ -0,0 +1,222 @@
+"""
+Unit tests for submodule ``file_tools``
+"""
+
+import bz2
+import gzip
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    import lzma
+except ImportError:
+    # Python 2 has no xz support
+    lzma = None
+
+import numpy as np
+from kafe import file_tools
+
+import unittest
+
+
+class File_Tools_Test_parse_column_data(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_comments_and_field_order(self):
+        _text = (u"# x  ignored  y  yabserr\n"
+                 u"1.  9.  2.  0.1 # comment\n"
+                 u"\n"
+                 u"   \n"
+                 u"# 5. 9. 5. 0.5\n"
+                 u"3.\t9.  4.  0.2  7.\n")
+        _path = os.path.join(self.tmp_dir, 'data.dat')
+        with open(_path, 'w') as _file:
+            _file.write(_text)
+
+        for _source in (io.StringIO(_text), _path):
+            _dataset = file_tools.parse_column_data(
+                _source, field_order='x,ignore,y,yabserr')
+            assert np.allclose(_dataset.get_data('x'), [1., 3.])
+            assert np.allclose(_dataset.get_data('y'), [2., 4.])
+            assert np.allclose(_dataset.get_cov_mat('y'), np.diag([0.01, 0.04]))
+
+    def test_delimiters(self):
+        for _text, _delimiter in ((u"1, 2\n 3 ,4 \n", ','),
+                                  (u"1::2::5\n3::4::6\n", '::')):
+            _dataset = file_tools.parse_column_data(
+                io.StringIO(_text), field_order='x,y', delimiter=_delimiter)
+            assert np.allclose(_dataset.get_data('x'), [1., 3.])
+            assert np.allclose(_dataset.get_data('y'), [2., 4.])
+
+        self.assertRaises(ValueError, file_tools.parse_column_data,
+                          io.StringIO(u"1, 2\n3, a\n"), delimiter=',')
+        self.assertRaises(IndexError, file_tools.parse_column_data,
+                          io.StringIO(u"1 2\n3\n"))
+
+    def test_compressed_files(self):
+        _text = b"# x y\n1. 2.\n3. 4.\n"
+        _formats = [(gzip.open, '.gz'), (bz2.BZ2File, '.bz2')]
+        if lzma is not None:
+            _formats.append((lzma.open, '.xz'))
+        for _open, _extension in _formats:
+            _path = os.path.join(self.tmp_dir, 'data.dat' + _extension)
+            with _open(_path, 'wb') as _file:
+                _file.write(_text)
+            # compression is recognized without the extension, too
+            _path_without_extension = os.path.join(self.tmp_dir, 'data')
+            shutil.copy(_path, _path_without_extension)
+
+            if _extension == '.bz2' and sys.version_info[0] < 3:
+                self.assertRaises(ValueError, file_tools.parse_column_data, _path)
+                continue
+
+            _dataset = file_tools.parse_column_data(_path)
+            assert _dataset.basename == 'data'
+            with open(_path_without_extension, 'rb') as _file:
+                _datasets = [_dataset,
+                             file_tools.parse_column_data(_file),
+                             file_tools.parse_column_data(_path_without_extension)]
+                assert not _file.closed
+            for _dataset in _datasets:
+                assert np.allclose(_dataset.get_data('x'), [1., 3.])
+                assert np.allclose(_dataset.get_data('y'), [2., 4.])
+
+    def test_cov_mat_files(self):
+        _cov_mats = [np.diag([1., 2., 3.]), 0.5 * np.ones((3, 3)),
+                     np.array([[1., 0.2, 0.], [0.2, 1., 0.1], [0., 0.1, 1.]])]
+        _paths = []
+        for _idx, _cov_mat in enumerate(_cov_mats):
+            if _idx == 1:
+                # also accept plain-text matrices
+                _path = os.path.join(self.tmp_dir, 'cov_mat_%d.dat' % (_idx,))
+                np.savetxt(_path, _cov_mat)
+            else:
+                _path = os.path.join(self.tmp_dir, 'cov_mat_%d.npy' % (_idx,))
+                np.save(_path, _cov_mat)
+            _paths.append(_path)
+
+        _text = u"1. 2.\n2. 4.\n3. 5.\n"
+        _dataset = file_tools.parse_column_data(
+            io.StringIO(_text), cov_mat_files=(_paths[0], _paths))
+        assert np.allclose(_dataset.get_cov_mat('x'), _cov_mats[0])
+        assert np.allclose(_dataset.get_cov_mat('y'), sum(_cov_mats))
+
+        # blockwise summation
+        assert np.array_equal(
+            file_tools.sum_matrices((np.load(_path, mmap_mode='r')
+                                     for _path in _paths[::2]), block_size=4),
+            _cov_mats[0] + _cov_mats[2])
+        self.assertRaises(ValueError, file_tools.sum_matrices,
+                          [np.eye(3), np.eye(2)])
+
+    def test_chunks(self):
+        _data = np.random.RandomState(0).rand(1001, 3)
+        _lines = ["# header\n"] + ["%r %r %r\n" % tuple(_row) for _row in _data]
+        for _max_rows in (None, len(_lines)):
+            _result = file_tools.parse_float_columns(
+                _lines, n_columns=2, max_rows=_max_rows, chunk_lines=100)
+            assert np.array_equal(_result, _data[:, :2])
+        self.assertRaises(ValueError, file_tools.parse_float_columns,
+                          ["1 2\n", "3 4 5\n"], chunk_lines=1)
+
+
+
+class File_Tools_Test_parse_general_inputfile(unittest.TestCase):
+
+    INPUT = """
+*yData_SCOV
+124.51   0.52    0.06
+125.60   0.40    0.20  0.06
+125.98   0.42    0.28  0.   0.
+124.70   0.31    0.15  0.   0.  0.15
+
+*FitFunction
+@FitFunction
+def fitf(x, av=1.0):
+    return av
+
+*InitialParameters
+120. 1.
+"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'input.dat')
+        with open(self.file_path, 'w') as _file:
+            _file.write(self.INPUT)
+        file_tools.clear_parse_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        file_tools.clear_parse_cache()
+
+    def test_decoders(self):
+        _syst = np.array([0.06, 0.2, 0.28, 0.15])
+        _ref_cov_mat = np.diag(_syst ** 2)
+        _ref_cov_mat[0, 1] = _ref_cov_mat[1, 0] = 0.06 ** 2
+        _ref_cov_mat[2, 3] = _ref_cov_mat[3, 2] = 0.15 ** 2
+        _cor = np.array([[1., 0.5, 0.], [0.5, 1., 0.2], [0., 0.2, 1.]])
+
+        for _key, _rows in (
+                ('SCOV', ["124.51 0.52 0.06", "125.60 0.40 0.20 0.06",
+                          "125.98 0.42 0.28 0. 0.",
+                          "124.70 0.31 0.15 0. 0. 0.15"]),
+                ('COV', ["124.51 0.52 0.0036", "125.60 0.40 0.0036 0.04",
+                         "125.98 0.42 0. 0. 0.0784",
+                         "124.70 0.31 0. 0. 0.0225 0.0225"])):
+            _kwargs, _ = file_tools.parse_general_inputfile(
+                io.StringIO(u"*yData_%s\n%s\n" % (_key, "\n".join(_rows))))
+            assert _kwargs['ydata'].dtype == np.float64
+            assert np.array_equal(_kwargs['ydata'],
+                                  [124.51, 125.60, 125.98, 124.70])
+            assert np.allclose(_kwargs['cov_mats'][1], _ref_cov_mat)
+
+        _kwargs, _ = file_tools.parse_general_inputfile(io.StringIO(
+            u"*xData_COR\n1. 0.1 0.1\n2. 0.1 0.2 0.5\n3. 0.1 0.3 0. 0.2\n"
+            u"*yData\n1. 0.1\n2. 0.1\n3. 0.1\n"))
+        _syst = np.array([0.1, 0.2, 0.3])
+        assert np.allclose(_kwargs['cov_mats'][0],
+                           _cor * np.outer(_syst, _syst))
+
+    def test_compressed_file(self):
+        _path = self.file_path + '.gz'
+        with gzip.open(_path, 'wb') as _file:
+            _file.write(self.INPUT.encode('ascii'))
+        _dataset_kwargs, _fit_kwargs = \
+            file_tools.parse_general_inputfile(_path)
+        assert _dataset_kwargs['basename'] == 'input'
+        assert len(_dataset_kwargs['ydata']) == 4
+        assert np.allclose(_fit_kwargs['initial_fit_parameters'][0], [120.])
+
+    def test_parse_cache(self):
+        _dataset_kwargs, _fit_kwargs = \
+            file_tools.parse_general_inputfile(self.file_path)
+        # modifying the result does not affect the cache
+        _dataset_kwargs['cov_mats'][1] += 1.
+        _cached_dataset_kwargs, _cached_fit_kwargs = \
+            file_tools.parse_general_inputfile(self.file_path)
+        assert _cached_fit_kwargs['fit_function'] is _fit_kwargs['fit_function']
+        assert np.allclose(_cached_dataset_kwargs['cov_mats'][1] + 1.,
+                           _dataset_kwargs['cov_mats'][1])
+
+        _fit = file_tools.buildFit_fromFile(self.file_path)
+        assert np.allclose(_fit.current_parameter_values, [120.])
+
+        # a modified file is parsed again
+        with open(self.file_path, 'w') as _file:
+            _file.write(self.INPUT.replace('120. 1.', '125. 1.'))
+        os.utime(self.file_path, (0, 0))
+        _, _fit_kwargs = file_tools.parse_general_inputfile(self.file_path)
+        assert np.allclose(_fit_kwargs['initial_fit_parameters'][0], [125.])
+
+
+if __name__ == '__main__':
+    unittest.main()
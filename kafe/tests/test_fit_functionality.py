@@ -4,6 +4,11 @@ Unit tests for basic fit functionality
 Most tests here are based on the standard kafe examples.
 """
 
+import io
+import os
+import shutil
+import tempfile
+
 import numpy as np
 import kafe
 import unittest
@@ -66,4 +71,317 @@ class Fit_Test_fit_functionality(unittest.TestCase):
         assert np.allclose(_pval, ref_pval)
         assert np.allclose(_perr, ref_perr)
 
+    def test_fix_and_release_parameters(self):
+        _xdata = np.arange(10.)
+        _ydata = np.array([
+            1.04, 2.91, 5.13, 7.02, 8.88, 11.10, 13.05, 14.92, 17.07, 18.95])
+
+        _dataset = kafe.Dataset(data=(_xdata, _ydata))
+        _dataset.add_error_source('y', 'simple', 0.1)
+
+        from kafe.function_library import linear_2par
+        _fit = kafe.Fit(_dataset, linear_2par, quiet=True)
+        _fit.do_fit(quiet=True)
+        _ref_pval = _fit.get_parameter_values()
+
+        # fixed parameter keeps its value, errordef is preserved
+        _fit.fix_parameters('slope', 'y_intercept')
+        assert _fit.number_of_fixed_parameters == 2
+        _fit.release_parameters('y_intercept')
+        _fit.do_fit(quiet=True)
+        assert _fit.parameter_is_fixed('slope')
+        assert np.allclose(_fit.get_parameter_values()[0], _ref_pval[0])
+        assert _fit.minimizer.get_fit_info('err_def') == 1.
+
+        # releasing all parameters recovers the original result
+        _fit.release_parameters()
+        assert _fit.number_of_fixed_parameters == 0
+        _fit.do_fit(quiet=True)
+        assert np.allclose(_fit.get_parameter_values(), _ref_pval)
+
+    def test_linear_parameters(self):
+        _xdata = np.linspace(-3., 3., 20)
+        _ydata = np.array([
+            0.05, 0.08, 0.17, 0.27, 0.45, 0.69, 0.93, 1.21, 1.42, 1.63,
+            1.66, 1.58, 1.41, 1.16, 0.92, 0.66, 0.46, 0.30, 0.17, 0.10])
+
+        _dataset = kafe.Dataset(data=(_xdata, _ydata))
+        _dataset.add_error_source('y', 'simple', 0.05)
+
+        from kafe.function_library import gauss
+        _fit = kafe.Fit(_dataset, gauss, quiet=True)
+        _fit.do_fit(quiet=True)
+        _ref_pval, _ref_perr = _fit.get_parameter_values(), _fit.get_parameter_errors()
+        _ref_cov_mat = _fit.par_cov_mat
+
+        _fit = kafe.Fit(_dataset, gauss, quiet=True)
+        self.assertRaises(ValueError, _fit.set_linear_parameters, 'sigma')
+        _fit.set_linear_parameters('scale')
+        _fit.do_fit(quiet=True)
+
+        # same result (within the minimizer tolerance), including the
+        # errors of the profiled parameter
+        assert np.all(np.abs(np.subtract(_fit.get_parameter_values(), _ref_pval))
+                      < 1e-2 * np.array(_ref_perr))
+        assert np.allclose(_fit.get_parameter_errors(), _ref_perr, rtol=1e-3)
+        assert np.allclose(_fit.par_cov_mat, _ref_cov_mat, rtol=1e-2, atol=1e-8)
+
+        # the profiled parameters are released if the fit fails
+        def failing_minimization(*args, **kwargs):
+            raise RuntimeError("minimization failed")
+        _fit = kafe.Fit(_dataset, gauss, quiet=True, minimizer_to_use='iminuit')
+        _fit.set_linear_parameters('scale')
+        _fit._minimize_iterating_x_errors = failing_minimization
+        self.assertRaises(RuntimeError, _fit.do_fit, quiet=True)
+        assert _fit._profiled_parameter_ids is None
+        assert np.all(np.array(_fit.get_parameter_errors()) > 0)
+
+    def test_linear_solver(self):
+        _xdata = np.linspace(-1., 3., 10)
+        _ydata = np.array([
+            -2.6, -0.4, 0.9, 1.7, 2.3, 2.6, 2.9, 3.1, 3.6, 4.2])
+
+        _dataset = kafe.Dataset(data=(_xdata, _ydata))
+        _dataset.add_error_source('y', 'simple', 0.2)
+
+        from kafe.function_library import poly3
+        from kafe.linear_solver import LinearSolver
+
+        # reference: weighted least squares with the normal equations
+        _basis = np.vander(_xdata, 4)
+        _cov_mat = np.linalg.inv(_basis.T.dot(_basis)) * 0.2 ** 2
+        _ref_pval = np.linalg.solve(_basis.T.dot(_basis), _basis.T.dot(_ydata))
+
+        _fit = kafe.Fit(_dataset, poly3, quiet=True)
+        assert isinstance(_fit.minimizer, LinearSolver)
+        # an explicitly requested minimizer is used
+        assert not isinstance(kafe.Fit(_dataset, poly3, quiet=True,
+                                       minimizer_to_use='iminuit').minimizer,
+                              LinearSolver)
+        _fit.do_fit(quiet=True)
+        assert np.allclose(_fit.get_parameter_values(), _ref_pval)
+        assert np.allclose(_fit.par_cov_mat, _cov_mat)
+        assert np.allclose(_fit.get_parameter_errors(), np.sqrt(np.diag(_cov_mat)))
+
+        # the chi2 profile is an exact parabola
+        _xs, _ys = _fit.minimizer.get_profile(0, 11)
+        assert np.allclose(_ys - _ys.min(),
+                           ((_xs - _ref_pval[0]) / np.sqrt(_cov_mat[0, 0])) ** 2)
+
+        # fixed parameters
+        _fit = kafe.Fit(_dataset, poly3, quiet=True)
+        _fit.set_parameters(coeff3=(0.1, 0.01), coeff2=(-0.5, 0.05))
+        _fit.fix_parameters('coeff3', 'coeff2')
+        _fit.do_fit(quiet=True)
+        _basis = np.vander(_xdata, 2)
+        _ydata = _ydata - 0.1 * _xdata ** 3 + 0.5 * _xdata ** 2
+        _ref_pval = np.linalg.solve(_basis.T.dot(_basis), _basis.T.dot(_ydata))
+        assert np.allclose(_fit.get_parameter_values()[:2], [0.1, -0.5])
+        assert np.allclose(_fit.get_parameter_values()[2:], _ref_pval)
+        assert np.allclose(_fit.get_parameter_errors()[:2], 0.)
+
+    def test_gauss_newton_covariance(self):
+        _xdata = np.linspace(-3., 3., 20)
+        _ydata = np.array([
+            0.05, 0.08, 0.17, 0.27, 0.45, 0.69, 0.93, 1.21, 1.42, 1.63,
+            1.66, 1.58, 1.41, 1.16, 0.92, 0.66, 0.46, 0.30, 0.17, 0.10])
+
+        _dataset = kafe.Dataset(data=(_xdata, _ydata))
+        _dataset.add_error_source('y', 'simple', 0.05)
+
+        from kafe.function_library import gauss
+        _fit = kafe.Fit(_dataset, gauss, quiet=True)
+        self.assertRaises(ValueError, _fit.set_covariance_method, 'newton')
+        _fit.set_covariance_method('both')
+        _fit.do_fit(quiet=True)
+        assert _fit.covariance_agreement['agree']
+        assert np.allclose(_fit.par_cov_mat, _fit.hesse_cov_mat)
+        assert np.allclose(np.diag(_fit.gauss_newton_cov_mat),
+                           np.diag(_fit.hesse_cov_mat), rtol=0.05)
+        _ref_pval, _ref_cov_mat = _fit.final_parameter_values, _fit.gauss_newton_cov_mat
+
+        _fit = kafe.Fit(_dataset, gauss, quiet=True)
+        _fit.set_covariance_method('gauss-newton')
+        _fit.do_fit(quiet=True)
+        assert _fit.hesse_cov_mat is None
+        assert np.allclose(_fit.final_parameter_values, _ref_pval, rtol=1e-3)
+        assert np.allclose(_fit.par_cov_mat, _ref_cov_mat, rtol=1e-2, atol=1e-8)
+        # MINOS is skipped, the errors are the Gauss-Newton ones
+        assert _fit.minos_errors is None and _fit.parabolic_errors
+        assert np.allclose(_fit.get_parameter_errors(),
+                           np.sqrt(np.diag(_fit.par_cov_mat)))
+        assert _fit.get_error_matrix() is _fit.par_cov_mat
+        assert np.allclose(_fit.final_parameter_errors,
+                           np.sqrt(np.diag(_ref_cov_mat)), rtol=1e-2)
+
+    def test_evaluate_chi2_batch(self):
+        _xdata = np.linspace(-3., 3., 20)
+        _ydata = np.array([
+            0.05, 0.08, 0.17, 0.27, 0.45, 0.69, 0.93, 1.21, 1.42, 1.63,
+            1.66, 1.58, 1.41, 1.16, 0.92, 0.66, 0.46, 0.30, 0.17, 0.10])
+
+        _dataset = kafe.Dataset(data=(_xdata, _ydata))
+        _dataset.add_error_source('y', 'simple', 0.05)
+        _dataset.add_error_source('y', 'simple', 0.02, correlated=True)
+
+        import math
+        from kafe.function_library import gauss
+
+        @kafe.FitFunction
+        def scalar_gauss(x, mean=0., sigma=1., scale=1.):
+            # not vectorizable: evaluated separately for each parameter set
+            return scale * math.exp(-0.5 * ((x - mean) / sigma) ** 2) \
+                / math.sqrt(2. * math.pi) / sigma
+
+        _parameter_array = np.array([[0., 1., 4.], [0.1, 0.9, 4.2],
+                                     [-0.2, 1.2, 3.5], [0.3, 1.1, 4.1],
+                                     [0., 0.8, 3.9]])
+        for _function in (gauss, scalar_gauss):
+            _fit = kafe.Fit(_dataset, _function, quiet=True)
+            _fit.constrain_parameters(['mean', 'sigma'], [0., 1.], [0.2, 0.1],
+                                      cor_mat=np.matrix([[1., 0.5], [0.5, 1.]]))
+            _fit.constrain_parameters(['scale'], [4.], [0.5])
+            _ref = [_fit.call_external_fcn(*_parameter_values)
+                    for _parameter_values in _parameter_array]
+            assert np.allclose(_fit.evaluate_chi2_batch(_parameter_array), _ref)
+            assert np.allclose(
+                _fit.evaluate_chi2_batch(_parameter_array, chunk_size=2), _ref)
+
+        self.assertRaises(ValueError, _fit.evaluate_chi2_batch, [[0., 1.]])
+
+    def test_combined_constraints(self):
+        from kafe.function_library import poly3
+
+        _dataset = kafe.Dataset(data=([0., 1., 2., 3., 4.],
+                                      [1.1, 2.9, 9.2, 28.1, 64.8]))
+        _dataset.add_error_source('y', 'simple', 0.5)
+        _fit = kafe.Fit(_dataset, poly3, quiet=True)
+        _fit.constrain_parameters(['coeff0', 'coeff2'], [1., 0.5], [0.1, 0.3],
+                                  cor_mat=np.matrix([[1., -0.4], [-0.4, 1.]]))
+        _fit.constrain_parameters(['coeff1'], [0.2], [0.4])
+
+        # explicit quadratic form of all constraints, in parameter order
+        _centers = np.array([0., 0.5, 0.2, 1.])
+        _errors = np.array([0.3, 0.4, 0.1])
+        _cov_mat = np.outer(_errors, _errors) * np.array([[1., 0., -0.4],
+                                                          [0., 1., 0.],
+                                                          [-0.4, 0., 1.]])
+        _cov_mat_inv = np.linalg.inv(_cov_mat)
+
+        _combined, = _fit._fcn_constraints.values()
+        assert list(_combined.parameter_ids) == [1, 2, 3]
+        assert np.allclose(_combined.cov_mat_inv, _cov_mat_inv)
+        for _parameter_values in ([0., 0.5, 0.2, 1.], [1., 0.2, -0.3, 1.4]):
+            _deviations = (np.array(_parameter_values) - _centers)[1:]
+            _ref = _deviations.dot(_cov_mat_inv).dot(_deviations)
+            assert np.isclose(_combined.calculate_chi2_penalty(_parameter_values), _ref)
+            assert np.isclose(sum(_constraint.calculate_chi2_penalty(_parameter_values)
+                                  for _constraint in _fit.constrain.values()), _ref)
+
+        # overlapping constraints are merged by their information
+        _overlapping = kafe.fit.GaussianConstraint(
+            [np.array([0., 0.8, 0., 0.]), np.array([0., 0.2, 0., 0.])])
+        _constraints = list(_fit.constrain.values()) + [_overlapping]
+        _combined = kafe.fit.GaussianConstraint.combine(_constraints)
+        assert list(_combined.parameter_ids) == [1, 2, 3]
+        for _parameter_values in ([0., 0.5, 0.2, 1.], [1., 0.2, -0.3, 1.4]):
+            _ref = sum(_constraint.calculate_chi2_penalty(_parameter_values)
+                       for _constraint in _constraints)
+            assert np.isclose(_combined.calculate_chi2_penalty(_parameter_values), _ref)
+            assert np.isclose(_combined.calculate_chi2_penalty_batch(
+                np.array([_parameter_values]))[0], _ref)
+        self.assertRaises(ValueError, _fit.constrain_parameters, ['coeff2'], [1.], [0.1])
+        self.assertRaises(ValueError, _fit.constrain_parameters, ['coeff3', 'coeff3'],
+                          [1., 1.], [0.1, 0.1])
+
+        # custom FCNs get the constraints as they were defined
+        _constraints_seen = []
+
+        def my_chi2(xdata, ydata, cov_mat, fit_function, parameter_values,
+                    constrain=None):
+            _constraints_seen.append(constrain)
+            return kafe.chi2(xdata, ydata, cov_mat, fit_function,
+                             parameter_values, constrain)
+
+        _fit_custom = kafe.Fit(_dataset, poly3, quiet=True, external_fcn=my_chi2,
+                               minimizer_to_use='iminuit')
+        _fit_custom.constrain_parameters(['coeff1'], [0.2], [0.4])
+        _fit_custom.call_external_fcn(0., 0.5, 0.2, 1.)
+        assert _constraints_seen[-1] is _fit_custom.constrain
+
+    def test_refit(self):
+        _rs = np.random.RandomState(2)
+        _xdata = np.linspace(0., 3., 60)
+        _ydata = 2. * np.exp(0.5 * _xdata) + _rs.normal(0., 0.3, 60)
+
+        def make_dataset(size):
+            _dataset = kafe.Dataset(data=(_xdata[:size], _ydata[:size]))
+            _dataset.add_error_source('y', 'simple', 0.3)
+            _dataset.add_error_source('y', 'simple', 0.1, correlated=True)
+            return _dataset
+
+        # a nonlinear model, so that the warm-started minimizer is used
+        from kafe.function_library import exp_2par
+
+        _dataset = make_dataset(20)
+        _fit = kafe.Fit(_dataset, exp_2par, quiet=True,
+                        minimizer_to_use='iminuit')
+        _fit.do_fit(quiet=True)
+        for _start in range(20, 60, 8):
+            _dataset.append_data(_xdata[_start:_start + 8],
+                                 _ydata[_start:_start + 8])
+            _fit.refit()
+
+        _ref_fit = kafe.Fit(make_dataset(60), exp_2par, quiet=True,
+                            minimizer_to_use='iminuit')
+        _ref_fit.set_covariance_method('gauss-newton')
+        _ref_fit.do_fit(quiet=True)
+        # both minimizations stop within the tolerance of the minimizer
+        assert np.all(np.abs(np.subtract(_fit.final_parameter_values,
+                                         _ref_fit.final_parameter_values)) <
+                      0.05 * np.asarray(_ref_fit.final_parameter_errors))
+        assert np.allclose(_fit.par_cov_mat, _ref_fit.par_cov_mat, rtol=1e-3)
+        assert np.isclose(_fit.final_fcn, _ref_fit.final_fcn, rtol=1e-4)
+
+    def test_fit_report(self):
+        try:
+            from contextlib import redirect_stdout
+        except ImportError:
+            self.skipTest("contextlib.redirect_stdout requires Python 3.4")
+
+        _dataset = kafe.Dataset(data=([1., 2., 3., 4.], [2.1, 3.9, 6.2, 7.8]),
+                                basename='report')
+        _dataset.add_error_source('y', 'simple', 0.2)
+
+        from kafe.function_library import linear_2par
+        _cwd, _tmp_dir = os.getcwd(), tempfile.mkdtemp()
+        try:
+            # log files are written to the working directory
+            os.chdir(_tmp_dir)
+            _stdout = io.StringIO()
+            with redirect_stdout(_stdout):
+                _fit = kafe.Fit(_dataset, linear_2par)
+                _fit.do_fit()
+            _fit.out_stream.close()
+            with open(os.path.join('.kafe', 'report.log')) as _file:
+                _log = _file.read()
+        finally:
+            os.chdir(_cwd)
+            shutil.rmtree(_tmp_dir)
+
+        assert _dataset.get_formatted() in _log
+        assert "# Final fit parameters #" in _log
+        assert "# Final fit parameters #" in _stdout.getvalue()
+
+    def test_close_quiet_fit(self):
+        _dataset = kafe.Dataset(data=([1., 2., 3.], [2.1, 3.9, 6.2]))
+        _dataset.add_error_source('y', 'simple', 0.2)
+
+        from kafe.function_library import linear_2par
+        _fit = kafe.Fit(_dataset, linear_2par, quiet=True)
+        kafe.Fit(_dataset, linear_2par, quiet=True).close()
+        # the null file shared by quiet fits is still open
+        _fit.do_fit(quiet=True)
+        assert not _fit.out_stream.out_file[0].closed
+
 #TODO: add more unit tests based on examples
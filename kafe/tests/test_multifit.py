@@ -89,6 +89,192 @@ class Multfit_Test_no_Minimizer(unittest.TestCase):
         self.Test_Multifit.set_parameter(parameter_values, parameter_errors)
         assert np.allclose(parameter_errors, self.Test_Multifit.current_parameter_errors_minuit, atol=1e-4)
 
+    def test_block_chi2_uncorrelated(self):
+        self.assertEqual([[0], [1]], self.Test_Multifit._cov_mat_groups)
+        _pvals = np.array(self.Test_Multifit.current_parameter_values_minuit)
+        _ydata = np.concatenate([fit.ydata for fit in self.Test_Multifit.fit_list])
+        _fdata = np.concatenate([fit.fit_function(fit.xdata, *fit.current_parameter_values)
+                                 for fit in self.Test_Multifit.fit_list])
+        _ref = kafe.multifit.chi2(np.asmatrix(_ydata).T,
+                                  self.Test_Multifit.current_cov_mat,
+                                  np.asmatrix(_fdata).T)
+        assert np.allclose(_ref, self.Test_Multifit._call_external_fcn(_pvals))
+
+    def test_block_chi2_correlated(self):
+        # fit the same dataset twice
+        _fit_list = self.Test_Multifit.fit_list
+        _multifit = kafe.Multifit([(_fit_list[1].dataset, _fit_list[0].fit_function),
+                                   (_fit_list[1].dataset, _fit_list[1].fit_function)],
+                                  minimizer_to_use=None, quiet=True)
+        self.assertEqual([[0], [1]], _multifit._cov_mat_groups)
+        _multifit.autolink_datasets()
+        self.assertEqual([[0, 1]], _multifit._cov_mat_groups)
+        self.assertEqual((6, 6), _multifit.current_cov_mat.shape)
+        # the covariance matrix of two linked datasets is singular
+        _pvals = np.array(_multifit.current_parameter_values_minuit)
+        self.assertRaises(np.linalg.LinAlgError, _multifit._call_external_fcn, _pvals)
+
+        # three linked datasets
+        _multifit = kafe.Multifit([(_fit_list[1].dataset, _fit_list[1].fit_function)] * 3,
+                                  minimizer_to_use=None, quiet=True)
+        _multifit.autolink_datasets()
+        self.assertEqual([[0, 1, 2]], _multifit._cov_mat_groups)
+        _pvals = np.array(_multifit.current_parameter_values_minuit)
+        _ydata = np.concatenate([fit.ydata for fit in _multifit.fit_list])
+        _fdata = np.concatenate([fit.fit_function(fit.xdata, *fit.current_parameter_values)
+                                 for fit in _multifit.fit_list])
+        _ref = kafe.multifit.chi2(np.asmatrix(_ydata).T, _multifit.current_cov_mat,
+                                  np.asmatrix(_fdata).T)
+        assert np.allclose(_ref, _multifit._call_external_fcn(_pvals))
+
+    def test_assign_cov_mat(self):
+        _cov_mat = self.Test_Multifit.current_cov_mat
+        # the assembled matrix is cached
+        assert self.Test_Multifit.current_cov_mat is _cov_mat
+        self.Test_Multifit.current_cov_mat = 2. * _cov_mat
+        assert np.allclose(self.Test_Multifit.current_cov_mat, 2. * _cov_mat)
+        self.Test_Multifit.first_cov_mat_y = 2. * _cov_mat
+        assert np.allclose(self.Test_Multifit.first_cov_mat_y, 2. * _cov_mat)
+        # correlations between datasets which are not linked
+        self.assertRaises(ValueError, setattr, self.Test_Multifit, 'current_cov_mat',
+                          _cov_mat + 1.)
+
+    def test_add_and_remove_fit(self):
+        @FitFunction
+        def linear(U, p4=0.9, p0=19.38):
+            return p4 * U + p0
+
+        _dataset = kafe.Dataset(data=([0.5, 1., 1.5, 2.], [20., 20.5, 21., 21.5]))
+        self.Test_Multifit.add_fit(_dataset, linear)
+        self.assertEqual(3, len(self.Test_Multifit.fit_list))
+        self.assertEqual([[0], [1], [2]], self.Test_Multifit._cov_mat_groups)
+        self.assertEqual((10, 10), self.Test_Multifit.current_cov_mat.shape)
+        self.assertEqual(10, len(self.Test_Multifit.current_parameter_values_minuit))
+
+        self.Test_Multifit.remove_fit(0)
+        self.assertEqual([[0], [1]], self.Test_Multifit._cov_mat_groups)
+        self.assertEqual((7, 7), self.Test_Multifit.current_cov_mat.shape)
+        self.assertEqual(['IUmodel.R0', 'IUmodel.alph', 'IUmodel.p5', 'IUmodel.p4',
+                          'IUmodel.p3', 'linear.p4', 'linear.p0'],
+                         self.Test_Multifit.parameter_names_minuit)
+
+    def test_prefit(self):
+        _fit = self.Test_Multifit.fit_list[0]
+        _reference = kafe.Fit(_fit.dataset, _fit.fit_function, quiet=True)
+        _reference.do_fit(quiet=True)
+        self.Test_Multifit.prefit(processes=1)
+        assert np.allclose(self.Test_Multifit.current_parameter_values_minuit[:3],
+                           _reference.get_parameter_values(), rtol=1e-3)
+        assert np.all(np.isfinite(self.Test_Multifit.current_parameter_values_minuit))
+
+    def test_remove_fit_fixed_parameters(self):
+        @FitFunction
+        def linear(U, p4=0.9, p0=19.38):
+            return p4 * U + p0
+
+        self.Test_Multifit.add_fit(kafe.Dataset(data=([0.5, 1., 1.5], [20., 20.5, 21.])), linear)
+        self.Test_Multifit.link_parameters("p0", "linear.p0")
+        self.Test_Multifit.fix_parameters(["p2", "p0"])
+        self.assertEqual(["quadric.p2", "quadric.p0"], self.Test_Multifit._fixed_parameter_names)
+        self.Test_Multifit.remove_fit(0)
+        # the linked parameter stays fixed, the other one is removed
+        self.assertEqual(["linear.p0"], self.Test_Multifit._fixed_parameter_names)
+
+    def test_prefit_fixed_parameters(self):
+        _values = [list(fit.current_parameter_values) for fit in self.Test_Multifit.fit_list]
+        self.Test_Multifit.fix_parameters(["R0"])
+        _id = self.Test_Multifit.parameter_space.get_parameter_ids(["R0"])[0]
+        _fixed_value = self.Test_Multifit.current_parameter_values_minuit[_id]
+        self.Test_Multifit.prefit(processes=1)
+        # the fits of the multifit are not changed
+        for fit, _old_values in zip(self.Test_Multifit.fit_list, _values):
+            assert np.allclose(fit.current_parameter_values, _old_values)
+        self.assertEqual(self.Test_Multifit.current_parameter_values_minuit[_id], _fixed_value)
+        assert np.all(np.isfinite(self.Test_Multifit.current_parameter_values_minuit))
+
+    def test_structured_gradient(self):
+        _values = np.array(self.Test_Multifit.current_parameter_values_minuit)
+        _gradient = self.Test_Multifit._call_external_gradient(_values)
+        _numerical = np.empty(len(_values))
+        for i in range(len(_values)):
+            _step = 1e-5 * max(abs(_values[i]), 1.)
+            _up, _down = _values.copy(), _values.copy()
+            _up[i] += _step
+            _down[i] -= _step
+            _numerical[i] = (self.Test_Multifit._call_external_fcn(_up) -
+                             self.Test_Multifit._call_external_fcn(_down)) / (2 * _step)
+        assert np.allclose(_gradient, _numerical, rtol=1e-4, atol=1e-4)
+
+    def test_structured_gradient_profiled(self):
+        @FitFunction
+        def decay_a(t, A=1., tau=1.):
+            return A * np.exp(-t / tau)
+
+        @FitFunction
+        def decay_b(t, B=1., tau=1.):
+            return B * np.exp(-t / tau)
+
+        _t = np.linspace(0., 3., 10)
+        _datasets = [kafe.Dataset(data=(_t, 5. * np.exp(-_t / 1.3))),
+                     kafe.Dataset(data=(_t, 2. * np.exp(-_t / 1.3) + 0.05))]
+        for _dataset in _datasets:
+            _dataset.add_error_source('y', 'simple', 0.1)
+        _multifit = kafe.Multifit([(_datasets[0], decay_a), (_datasets[1], decay_b)],
+                                  minimizer_to_use=None, quiet=True, structured=True)
+        _multifit.link_parameters("decay_a.tau", "decay_b.tau")
+        _multifit.set_linear_parameters(["A", "B"])
+        _multifit._profiled_parameter_ids = np.array(
+            _multifit.parameter_space.get_parameter_ids(["A", "B"]))
+
+        _values = np.array(_multifit.current_parameter_values_minuit)
+        _gradient = _multifit._call_external_gradient(_values)
+        _numerical = np.empty(len(_values))
+        for i in range(len(_values)):
+            _step = 1e-6 * max(abs(_values[i]), 1.)
+            _up, _down = _values.copy(), _values.copy()
+            _up[i] += _step
+            _down[i] -= _step
+            _numerical[i] = (_multifit._call_external_fcn(_up) -
+                             _multifit._call_external_fcn(_down)) / (2 * _step)
+        assert np.allclose(_gradient, _numerical, rtol=1e-4, atol=1e-4)
+        self.assertEqual(list(_gradient[_multifit._profiled_parameter_ids]), [0., 0.])
+
+    def test_gauss_newton_fit(self):
+        self.Test_Multifit.fix_parameters(["R0", "alph"])
+        _start = self.Test_Multifit._call_external_fcn(
+            np.array(self.Test_Multifit.current_parameter_values_minuit))
+        self.Test_Multifit.gauss_newton_fit()
+        _values = np.array(self.Test_Multifit.current_parameter_values_minuit)
+        # both quadratic models go through all three data points
+        self.assertLess(self.Test_Multifit._call_external_fcn(_values), 1e-6 * _start)
+        # fixed parameters are not changed
+        self.assertEqual(_values[3], 1.)
+        self.assertEqual(_values[4], 0.004)
+
+    def test_structured_fit_restores_strategy(self):
+        _datasets = [kafe.Dataset(data=([0.5, 1., 1.5, 2.], [20., 20.6, 21.5, 22.7])),
+                     kafe.Dataset(data=([0.5, 1., 1.5, 2.], [0.5, 0.9, 1.4, 2.1]))]
+        for _dataset in _datasets:
+            _dataset.add_error_source('y', 'simple', 0.1)
+        _multifit = kafe.Multifit([(_dataset, _fit.fit_function) for _dataset, _fit
+                                   in zip(_datasets, self.Test_Multifit.fit_list)],
+                                  minimizer_to_use='iminuit', quiet=True, structured=True)
+        _multifit.do_fit(quiet=True)
+        self.assertEqual(_multifit.minimizer.strategy, 1)
+
+    def test_solve_linear_parameters(self):
+        self.assertRaises(ValueError, self.Test_Multifit.set_linear_parameters, ["alph"])
+        self.Test_Multifit.set_linear_parameters(["p2", "p1", "p0"])
+        self.Test_Multifit._profiled_parameter_ids = np.array([0, 1, 2])
+        _values, _cov_mat = self.Test_Multifit._solve_linear_parameters(
+            self.Test_Multifit.current_parameter_values_minuit)
+        # the quadratic model goes through all three data points
+        _fit = self.Test_Multifit.fit_list[0]
+        assert np.allclose(_fit.fit_function.evaluate(_fit.xdata, _values[:3]), _fit.ydata)
+        assert np.allclose(_values[3:], self.Test_Multifit.current_parameter_values_minuit[3:])
+        self.assertEqual(_cov_mat.shape, (3, 3))
+
+
 class ParameterSpace_Test(unittest.TestCase):
 
     def setUp(self):
@@ -126,6 +312,35 @@ class ParameterSpace_Test(unittest.TestCase):
         dic = {"IUmodel.p4":"quadric.p4"}
         self.assertEqual(self.parameter_space.alias,dic)
 
+    def test_autolink_three_fits(self):
+        @FitFunction
+        def linear(U, p4=0.9, p0=19.38):
+            return p4 * U + p0
+
+        _fit3 = kafe.Fit(kafe.Dataset(data=([0.5, 1., 1.5], [20., 20.5, 21.])), linear, quiet=True)
+        _parameter_space = kafe.multifit._ParameterSpace(self.parameter_space.fit_list + [_fit3])
+        _parameter_space.autolink_parameters()
+        dic = {"IUmodel.p4": "quadric.p4", "linear.p4": "quadric.p4", "linear.p0": "quadric.p0"}
+        self.assertEqual(_parameter_space.alias, dic)
+        self.assertEqual(_parameter_space.total_number_of_parameters, 7)
+
+        # linking already linked parameters again changes nothing
+        _parameter_space.link_parameters("IUmodel.p4", "linear.p4")
+        self.assertEqual(_parameter_space.alias, dic)
+        self.assertEqual(_parameter_space.total_number_of_parameters, 7)
+
+    def test_remove_fit_keeps_links(self):
+        @FitFunction
+        def linear(U, p4=0.9, p0=19.38):
+            return p4 * U + p0
+
+        _fit3 = kafe.Fit(kafe.Dataset(data=([0.5, 1., 1.5], [20., 20.5, 21.])), linear, quiet=True)
+        self.parameter_space.add_fit(_fit3)
+        self.parameter_space.autolink_parameters()
+        self.parameter_space.remove_fit(self.parameter_space.fit_list[0])
+        self.assertEqual(self.parameter_space.alias, {"linear.p4": "IUmodel.p4"})
+        self.assertEqual(self.parameter_space.total_number_of_parameters, 6)
+
     def test_link_parameter_number_of_parameters(self):
         self.parameter_space.link_parameters("p5","p2")
         self.assertEqual(self.parameter_space.total_number_of_parameters, 7)
@@ -172,6 +387,16 @@ class ParameterSpace_Test(unittest.TestCase):
                                                                             self.parameter_space.fit_list[0].fit_function)
         self.assertEqual(current_quadric,[0,1,2])
 
+    def test_get_parameter_index_arrays_with_links(self):
+        self.parameter_space.link_parameters("p2", "p5")
+        ids = self.parameter_space.get_parameter_index_arrays()
+        self.assertEqual(ids[0].tolist(), [0, 1, 2])
+        self.assertEqual(ids[1].tolist(), [3, 4, 0, 5, 6])
+        values = np.arange(7.)
+        current_iumodel = self.parameter_space.get_current_parameter_values(values,
+                                                                            self.parameter_space.fit_list[1].fit_function)
+        assert np.all(current_iumodel == [3., 4., 0., 5., 6.])
+
     def test_fit_to_parameter_id(self):
         list = [0,1,2]
         ids = self.parameter_space.fit_to_parameter_id(self.parameter_space.fit_list[0])
@@ -79,3 +79,35 @@ class Fit_Test_numeric_tools_functionality(unittest.TestCase):
         Test of numeric_tools.cor_to_cov.
         """
         assert np.allclose(self.REF_ERR_LIST, numeric_tools.extract_statistical_errors(self.REF_COV_MAT))
+
+    def test_MinuitCov_to_cor(self):
+        """
+        Test of numeric_tools.MinuitCov_to_cor with a fixed parameter.
+        """
+        _cov = np.zeros((9, 9))
+        _cov[:8, :8] = self.REF_COV_MAT
+        _cor = numeric_tools.MinuitCov_to_cor(_cov)
+        assert _cor.dtype == np.float64
+        assert np.allclose(self.REF_COR_MAT, _cor[:8, :8])
+        assert np.all(_cor[8, :] == 0.) and np.all(_cor[:, 8] == 0.)
+
+    def test_cholesky_update_and_extend(self):
+        """
+        Test of numeric_tools.cholesky_update and cholesky_extend by removing
+        the first two rows of the reference matrix and appending them again.
+        """
+        _cov_mat = np.asarray(self.REF_COV_MAT)
+        _factor = np.linalg.cholesky(_cov_mat)
+        _factor_without = numeric_tools.cholesky_update(_factor[2:, 2:],
+                                                        _factor[2:, :2])
+        assert np.allclose(_factor_without, np.linalg.cholesky(_cov_mat[2:, 2:]))
+        # the input is not modified
+        assert np.allclose(_factor.dot(_factor.T), _cov_mat)
+
+        _order = np.r_[2:8, 0:2]
+        _cross_factor, _new_factor = numeric_tools.cholesky_extend(
+            _factor_without, _cov_mat[:2, 2:], _cov_mat[:2, :2])
+        _extended_factor = np.block([[_factor_without, np.zeros((6, 2))],
+                                     [_cross_factor, _new_factor]])
+        assert np.allclose(_extended_factor,
+                           np.linalg.cholesky(_cov_mat[np.ix_(_order, _order)]))
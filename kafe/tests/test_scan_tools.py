@@ -0,0 +1,108 @@
+"""
+Unit tests for the scans of the profiled chi2
+"""
+
+import numpy as np
+import kafe
+import unittest
+
+from kafe.function_library import gauss, quadratic_3par
+from kafe.scan_tools import profile_contours, profile_scan
+
+
+class Scan_Test_profile_contours(unittest.TestCase):
+
+    def setUp(self):
+        _xdata = np.linspace(-3., 3., 20)
+        _ydata = np.array([
+            0.05, 0.08, 0.17, 0.27, 0.45, 0.69, 0.93, 1.21, 1.42, 1.63,
+            1.66, 1.58, 1.41, 1.16, 0.92, 0.66, 0.46, 0.30, 0.17, 0.10])
+        self.dataset = kafe.Dataset(data=(_xdata, _ydata))
+        self.dataset.add_error_source('y', 'simple', 0.05)
+
+    def test_linear_model_ellipse(self):
+        # for a linear model, the contours are the error ellipses
+        _fit = kafe.Fit(self.dataset, quadratic_3par, quiet=True)
+        _fit.do_fit(quiet=True)
+        _center = np.array(_fit.final_parameter_values)[[0, 2]]
+        _cov_mat = np.asarray(_fit.par_cov_mat)[np.ix_([0, 2], [0, 2])]
+
+        for _processes in (1, 2):
+            _contours = profile_contours(_fit, 0, 2, [1., 4.], n_points=40,
+                                         processes=_processes)
+            for (_xs, _ys), _dchi2 in zip(_contours, [1., 4.]):
+                assert len(_xs) == len(_ys) == 40
+                _deviations = np.vstack((_xs - _center[0], _ys - _center[1]))
+                _dchi2_values = np.einsum('in,ij,jn->n', _deviations,
+                                          np.linalg.inv(_cov_mat), _deviations)
+                assert np.allclose(_dchi2_values, _dchi2, rtol=1e-2)
+
+    def test_compare_to_minimizer(self):
+        _fit = kafe.Fit(self.dataset, gauss, quiet=True)
+        _fit.do_fit(quiet=True)
+        _center = np.array(_fit.final_parameter_values)[[1, 2]]
+        _errors = np.array(_fit.final_parameter_errors)[[1, 2]]
+
+        def _polar(xs, ys):
+            _u, _v = (xs - _center[0]) / _errors[0], (ys - _center[1]) / _errors[1]
+            _angles = np.arctan2(_v, _u)
+            _order = np.argsort(_angles)
+            return _angles[_order], np.hypot(_u, _v)[_order]
+
+        _xs, _ys = profile_contours(_fit, 1, 2, [2.3], n_points=50, processes=1)[0]
+        _fit.minimizer.set_err(2.3)
+        _ref_angles, _ref_radii = _polar(*_fit.minimizer.get_contour(1, 2, 50))
+        _fit.minimizer.set_err(1.)
+
+        _angles, _radii = _polar(_xs, _ys)
+        assert np.allclose(np.interp(_ref_angles, _angles, _radii, period=2 * np.pi),
+                           _ref_radii, rtol=2e-2)
+
+    def test_fixed_parameter(self):
+        _fit = kafe.Fit(self.dataset, gauss, quiet=True)
+        _fit.fix_parameters('mean')
+        _fit.do_fit(quiet=True)
+        self.assertRaises(ValueError, profile_contours, _fit, 0, 1, [1.])
+
+
+class Scan_Test_profile_scan(unittest.TestCase):
+
+    def setUp(self):
+        _xdata = np.linspace(-3., 3., 20)
+        _ydata = np.array([
+            0.05, 0.08, 0.17, 0.27, 0.45, 0.69, 0.93, 1.21, 1.42, 1.63,
+            1.66, 1.58, 1.41, 1.16, 0.92, 0.66, 0.46, 0.30, 0.17, 0.10])
+        self.dataset = kafe.Dataset(data=(_xdata, _ydata))
+        self.dataset.add_error_source('y', 'simple', 0.05)
+
+    def test_linear_model_parabola(self):
+        # for a linear model, the profile is a parabola
+        _fit = kafe.Fit(self.dataset, quadratic_3par, quiet=True)
+        _fit.do_fit(quiet=True)
+        _value, _error = _fit.final_parameter_values[1], _fit.final_parameter_errors[1]
+
+        for _processes in (1, 2):
+            _xs, _fcn = profile_scan(_fit, 1, n_points=11, dchi2_max=4.,
+                                     processes=_processes)
+            assert np.all(np.diff(_xs) > 0)
+            assert np.allclose(_fcn - _fit.final_fcn,
+                               ((_xs - _value) / _error) ** 2, atol=1e-6)
+            # the requested range is covered on both sides
+            assert _fcn[0] - _fit.final_fcn >= 4. and _fcn[-1] - _fit.final_fcn >= 4.
+            # points at the crossings of dchi2 = 1
+            assert np.any(np.isclose(_xs, _value - _error, rtol=1e-4))
+            assert np.any(np.isclose(_xs, _value + _error, rtol=1e-4))
+
+    def test_compare_to_minos(self):
+        _fit = kafe.Fit(self.dataset, gauss, quiet=True)
+        _fit.do_fit(quiet=True)
+
+        for _par_id in range(3):
+            _xs, _fcn = profile_scan(_fit, _par_id, processes=1)
+            _dchi2 = _fcn - _fit.final_fcn
+            _value = _fit.final_parameter_values[_par_id]
+            _upper = _xs[np.argmin(np.abs(_dchi2 - 1.) + (_xs < _value))] - _value
+            _lower = _xs[np.argmin(np.abs(_dchi2 - 1.) + (_xs > _value))] - _value
+            _minos_upper, _minos_lower = _fit.minos_errors[_par_id][:2]
+            assert np.isclose(_upper, _minos_upper, rtol=1e-2)
+            assert np.isclose(_lower, _minos_lower, rtol=1e-2)
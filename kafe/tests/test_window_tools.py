@@ -0,0 +1,74 @@
+"""
+Unit tests for the sliding-window fits
+"""
+
+import numpy as np
+import kafe
+import unittest
+
+from kafe import window_tools
+from kafe.function_library import linear_2par
+from kafe.window_tools import sliding_window_fit
+
+
+class Window_Test_sliding_window_fit(unittest.TestCase):
+
+    def setUp(self):
+        _rs = np.random.RandomState(3)
+        self.xdata = np.linspace(0., 10., 40)
+        self.ydata = (1. + 0.05 * self.xdata) * self.xdata + \
+            _rs.normal(0., 0.3, 40)
+
+    def make_fit(self, start=0, stop=None):
+        _dataset = kafe.Dataset(data=(self.xdata[start:stop],
+                                      self.ydata[start:stop]))
+        _dataset.add_error_source('y', 'simple', 0.3)
+        _dataset.add_error_source('y', 'simple', 0.1, correlated=True)
+        return kafe.Fit(_dataset, linear_2par, quiet=True)
+
+    def test_compare_to_fits(self):
+        _fit = self.make_fit()
+        _fit.do_fit(quiet=True)
+        _starts, _values, _errors, _fcn_values = sliding_window_fit(
+            _fit, 12, step=3)
+        assert np.array_equal(_starts, np.arange(0, 29, 3))
+        assert _values.shape == _errors.shape == (10, 2)
+
+        for i in (0, 4, 9):
+            _window_fit = self.make_fit(_starts[i], _starts[i] + 12)
+            _window_fit.set_covariance_method('gauss-newton')
+            _window_fit.do_fit(quiet=True)
+            assert np.allclose(_values[i], _window_fit.final_parameter_values,
+                               rtol=1e-4)
+            assert np.allclose(_errors[i], _window_fit.final_parameter_errors,
+                               rtol=1e-4)
+            assert np.isclose(_fcn_values[i], _window_fit.final_fcn, rtol=1e-4)
+
+    def test_cholesky_updates(self):
+        _fit = self.make_fit()
+        _cov_mat = np.asarray(_fit.current_cov_mat)
+        _default_size = window_tools._MIN_UPDATE_WINDOW_SIZE
+        try:
+            for _min_update_size in (1, _default_size):
+                window_tools._MIN_UPDATE_WINDOW_SIZE = _min_update_size
+                _factor = None
+                for _start, _new_start in ((0, 0), (0, 1), (1, 4), (4, 20)):
+                    _factor = window_tools._slide_cholesky(
+                        _factor, _cov_mat, _start, _new_start, 15)
+                    _block = _cov_mat[_new_start:_new_start + 15,
+                                      _new_start:_new_start + 15]
+                    assert np.allclose(_factor, np.linalg.cholesky(_block))
+        finally:
+            window_tools._MIN_UPDATE_WINDOW_SIZE = _default_size
+
+    def test_invalid_arguments(self):
+        _fit = self.make_fit()
+        self.assertRaises(ValueError, sliding_window_fit, _fit, 41)
+        self.assertRaises(ValueError, sliding_window_fit, _fit, 10, step=0)
+        _fit = kafe.Fit(_fit.dataset, linear_2par, quiet=True,
+                        external_fcn=lambda *args: 0.)
+        self.assertRaises(ValueError, sliding_window_fit, _fit, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
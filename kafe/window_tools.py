@@ -0,0 +1,147 @@
+'''
+.. module:: window_tools
+   :platform: Unix
+   :synopsis: A submodule for fitting the model of a `Fit` to a window of
+       consecutive data points sliding over its data, e.g. for monitoring the
+       drift of the parameters over a long time series.
+'''
+
+# -------------------------------------------------------------------------
+# Changes:
+# 18-Oct-26  initial version: sliding-window fits, carrying the Cholesky
+#            factor of the covariance matrix over from window to window
+# -------------------------------------------------------------------------
+
+import logging
+import numpy as np
+
+from scipy.linalg import cholesky
+
+from .fit import chi2
+from .numeric_tools import cholesky_extend, cholesky_update
+from .scan_tools import ProfiledFCN
+
+# import main logger for kafe
+logger = logging.getLogger('kafe')
+
+# smallest window for which the rows of the points leaving the window are
+# removed from the Cholesky factor by rank-one updates. Smaller windows are
+# factorized anew, which is faster for them.
+_MIN_UPDATE_WINDOW_SIZE = 1000
+
+
+def _slide_cholesky(factor, cov_mat, start, new_start, window_size):
+    '''
+    Returns the lower Cholesky factor of the block of `cov_mat` for the window
+    of `window_size` points beginning at `new_start`, given the `factor` for
+    the window beginning at `start`. The rows of the points leaving the
+    window are removed by rank-one updates (unless they are uncorrelated
+    with the remaining points), and the rows of the points entering it are
+    appended by a bordered update.
+    '''
+    _shift = new_start - start
+    _stop = new_start + window_size
+    if factor is None or _shift >= window_size:
+        return cholesky(cov_mat[new_start:_stop, new_start:_stop], lower=True,
+                        check_finite=False)
+
+    _coupling = factor[_shift:, :_shift]
+    if not np.any(_coupling):
+        _kept_factor = factor[_shift:, _shift:]
+    elif window_size >= _MIN_UPDATE_WINDOW_SIZE:
+        _kept_factor = cholesky_update(factor[_shift:, _shift:], _coupling)
+    else:
+        return cholesky(cov_mat[new_start:_stop, new_start:_stop], lower=True,
+                        check_finite=False)
+
+    _old_stop = start + window_size
+    _cross_factor, _new_factor = cholesky_extend(
+        _kept_factor, cov_mat[_old_stop:_stop, new_start:_old_stop],
+        cov_mat[_old_stop:_stop, _old_stop:_stop])
+
+    _kept = window_size - _shift
+    _factor = np.zeros((window_size, window_size))
+    _factor[:_kept, :_kept] = _kept_factor
+    _factor[_kept:, :_kept] = _cross_factor
+    _factor[_kept:, _kept:] = _new_factor
+    return _factor
+
+
+def sliding_window_fit(fit, window_size, step=1):
+    r'''
+    Fits the model of a `Fit` to every window of `window_size` consecutive
+    data points, moving the window over the data by `step` points at a time.
+
+    The :math:`\chi^2` of each window is minimized by damped Gauss-Newton
+    steps (see :py:class:`~kafe.scan_tools.ProfiledFCN`), starting from the
+    result for the previous window. The covariance matrix of a window is the
+    corresponding block of the current covariance matrix of the fit. Its
+    Cholesky factor is carried over from window to window: the rows of the
+    points leaving the window are removed and the rows of the points
+    entering it are appended. Fixed parameters and constraints of the fit
+    apply to all windows. The parameter errors are calculated from the
+    Gauss-Newton approximation of the parameter covariance matrix.
+
+    Parameters
+    ----------
+
+    **fit** : :py:class:`~kafe.fit.Fit`
+        A fit with the default :math:`\chi^2` `FCN`. The first window starts
+        from its current parameter values, so
+        :py:meth:`~kafe.fit.Fit.do_fit` is usually called first. This also
+        projects `x` errors onto the covariance matrix.
+
+    **window_size** : int
+        The number of data points in a window.
+
+    Keyword Arguments
+    -----------------
+
+    step : int, optional
+        The number of points the window is moved by. Defaults to 1.
+
+    Returns
+    -------
+
+    tuple of arrays
+        The index of the first data point of each window, the parameter
+        values and errors for each window (arrays of shape (number of windows,
+        number of parameters)) and the minimum of :math:`\chi^2` for each
+        window.
+    '''
+    if fit.external_fcn is not chi2:
+        raise ValueError("Sliding-window fits are only possible for the "
+                         "default chi2 FCN.")
+    _size = len(fit.xdata)
+    if not 0 < window_size <= _size:
+        raise ValueError("Window size must be between 1 and the number of "
+                         "data points (%d), got %r." % (_size, window_size))
+    if step < 1:
+        raise ValueError("Step must be at least 1, got %r." % (step,))
+
+    _starts = np.arange(0, _size - window_size + 1, step)
+    _parameter_values = np.empty((len(_starts), fit.number_of_parameters))
+    _parameter_errors = np.empty_like(_parameter_values)
+    _fcn_values = np.empty(len(_starts))
+
+    _cov_mat = np.asarray(fit.current_cov_mat, dtype=np.float64)
+    _profiled_fcn = ProfiledFCN(fit, [])
+    _values = np.asarray(fit.current_parameter_values, dtype=np.float64)
+    _factor, _previous_start = None, 0
+    for i, _start in enumerate(_starts):
+        _factor = _slide_cholesky(_factor, _cov_mat, _previous_start, _start,
+                                  window_size)
+        _window = slice(_start, _start + window_size)
+        _profiled_fcn.set_data(fit.xdata[_window], fit.ydata[_window],
+                               (_factor, True))
+
+        # start from the result for the previous window
+        _fcn_values[i], _values = _profiled_fcn([], _values)
+        _parameter_values[i] = _values
+        _parameter_errors[i] = np.sqrt(np.diag(
+            _profiled_fcn.gauss_newton_cov_mat(_values)))
+        _previous_start = _start
+
+    logger.debug("Fitted %d windows of %d data points."
+                 % (len(_starts), window_size))
+    return _starts, _parameter_values, _parameter_errors, _fcn_values
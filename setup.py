@@ -37,7 +37,7 @@ setup(
         "NumPy >= 1.11.2",
         "SciPy >= 0.17.0",
         "matplotlib >= 1.5.0",
-        "iminuit >= 1.2",
+        "iminuit >= 1.3",
     ],
     test_suite='setup.discover_kafe_tests',
     keywords = "data analysis lab courses education students physics fitting minimization",